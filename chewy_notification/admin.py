@@ -3,7 +3,11 @@ from chewy_notification.models import (
     NotificationChannel,
     NotificationTemplate,
     NotificationTarget,
+    NotificationMessage,
     NotificationRecord,
+    NotificationStat,
+    NotificationTargetGroup,
+    NotificationTargetGroupMember,
 )
 
 
@@ -25,6 +29,14 @@ class NotificationChannelAdmin(admin.ModelAdmin):
             "fields": ("config",),
             "description": "JSON格式的渠道配置信息"
         }),
+        ("限流", {
+            "fields": ("rate_limit", "rate_burst"),
+            "description": "按渠道限制发送速率，所有进程共享"
+        }),
+        ("重复通知合并", {
+            "fields": ("coalesce_window",),
+            "description": "同一目标在窗口内收到的相同通知合并为一条发送，0 表示不合并"
+        }),
         ("时间信息", {
             "fields": ("create_time", "update_time"),
             "classes": ("collapse",)
@@ -78,6 +90,21 @@ class NotificationTargetAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(NotificationMessage)
+class NotificationMessageAdmin(admin.ModelAdmin):
+    """通知消息管理"""
+    
+    list_display = ["id", "title", "create_time"]
+    list_filter = ["create_time"]
+    search_fields = ["title", "content"]
+    ordering = ["-create_time"]
+    readonly_fields = ["title", "content", "params", "create_time", "update_time"]
+    
+    def has_add_permission(self, request):
+        """禁止手动添加消息"""
+        return False
+
+
 @admin.register(NotificationRecord)
 class NotificationRecordAdmin(admin.ModelAdmin):
     """通知记录管理"""
@@ -91,27 +118,32 @@ class NotificationRecordAdmin(admin.ModelAdmin):
         "send_time",
         "create_time"
     ]
-    list_filter = ["status", "channel__type", "create_time", "send_time"]
+    list_filter = ["status", "priority", "channel__type", "create_time", "send_time"]
     search_fields = ["template__name", "error_message"]
     ordering = ["-create_time"]
     readonly_fields = [
         "template",
+        "message",
         "channel",
         "target",
         "status",
+        "priority",
         "response",
         "send_time",
         "error_message",
+        "attempts",
+        "scheduled_at",
+        "next_attempt_at",
         "create_time",
         "update_time"
     ]
     
     fieldsets = (
         ("关联信息", {
-            "fields": ("template", "channel", "target")
+            "fields": ("template", "message", "channel", "target")
         }),
         ("发送状态", {
-            "fields": ("status", "send_time", "error_message")
+            "fields": ("status", "priority", "send_time", "error_message", "attempts", "scheduled_at", "next_attempt_at", "coalesced_count")
         }),
         ("响应信息", {
             "fields": ("response",),
@@ -142,3 +174,39 @@ class NotificationRecordAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """禁止修改记录"""
         return False
+
+
+@admin.register(NotificationStat)
+class NotificationStatAdmin(admin.ModelAdmin):
+    """发送统计（只读）"""
+    
+    list_display = ["hour", "channel", "status", "count", "latency_sum"]
+    list_filter = ["status", "channel", "hour"]
+    ordering = ["-hour"]
+    readonly_fields = ["channel", "hour", "status", "count", "latency_sum", "update_time"]
+    
+    def has_add_permission(self, request):
+        """统计由发送结果自动累加"""
+        return False
+
+
+@admin.register(NotificationTargetGroup)
+class NotificationTargetGroupAdmin(admin.ModelAdmin):
+    """目标分组管理"""
+    
+    list_display = ["name", "description", "create_time"]
+    search_fields = ["name", "description"]
+    ordering = ["name"]
+    readonly_fields = ["create_time", "update_time"]
+    fields = ["name", "description", "create_time", "update_time"]
+
+
+@admin.register(NotificationTargetGroupMember)
+class NotificationTargetGroupMemberAdmin(admin.ModelAdmin):
+    """分组成员管理（成员较多，不在分组页面内联显示）"""
+    
+    list_display = ["group", "target", "create_time"]
+    list_filter = ["group"]
+    search_fields = ["target__alias", "target__target_value"]
+    raw_id_fields = ["target"]
+    list_select_related = ["group", "target"]
@@ -0,0 +1,160 @@
+"""
+批量模板发送
+
+一次请求发送多条个性化通知（模板 + 目标 + 上下文）。条目按块处理：
+每块用两次查询加载全部模板和目标，批量创建记录，再加入发送队列或按渠道并发发送，
+模板编译结果在进程内缓存。每块处理完即逐条返回结果，客户端不必等待整批完成。
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from django.db import transaction
+
+from chewy_notification.conf import get_setting
+from chewy_notification.delivery import deliver_pending_records, insert_records, release_sync_lease, sync_lease
+from chewy_notification.models import NotificationRecord, NotificationTarget, NotificationTemplate
+from chewy_notification.tasks import enqueue_records
+
+
+def iter_ndjson_items(stream) -> Iterator[Any]:
+    """
+    逐行读取 NDJSON 请求体
+    
+    Yields:
+        每行解析后的条目，无法解析的行返回错误信息字符串
+    """
+    for line in stream:
+        line = line.decode("utf-8-sig") if isinstance(line, bytes) else line
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield "不是有效的 JSON"
+
+
+def send_items(items: Iterable[Any], async_send: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    按块处理批量发送条目
+    
+    Args:
+        items: 条目，每条为 {"template_id", "target_id", "context"}
+        async_send: 是否只加入发送队列
+    
+    Yields:
+        dict: 每个条目的结果，包含条目序号 index
+    """
+    chunk_size = get_setting("TASK_BATCH_SIZE")
+    chunk = []
+    for index, item in enumerate(items):
+        chunk.append((index, item))
+        if len(chunk) >= chunk_size:
+            yield from _send_chunk(chunk, async_send)
+            chunk = []
+    if chunk:
+        yield from _send_chunk(chunk, async_send)
+
+
+def _parse_item(item: Any) -> Tuple[Any, Any, Any]:
+    """
+    校验条目格式
+    
+    Returns:
+        (template_id, target_id, context)
+    
+    Raises:
+        ValueError: 条目格式错误
+    """
+    if isinstance(item, str):
+        raise ValueError(item)
+    if not isinstance(item, dict):
+        raise ValueError("条目必须是 JSON 对象")
+    template_id = item.get("template_id")
+    target_id = item.get("target_id")
+    context = item.get("context") or {}
+    if not isinstance(template_id, int) or not isinstance(target_id, int):
+        raise ValueError("template_id 和 target_id 必须是整数")
+    if not isinstance(context, dict):
+        raise ValueError("context 必须是 JSON 对象")
+    return template_id, target_id, context
+
+
+def _send_chunk(chunk: List[Tuple[int, Any]], async_send: bool) -> List[Dict[str, Any]]:
+    """处理一块条目：批量加载模板和目标、创建记录并发送"""
+    results = {}
+    parsed = []
+    for index, item in chunk:
+        try:
+            parsed.append((index, *_parse_item(item)))
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+    
+    templates = NotificationTemplate.objects.select_related("channel").in_bulk(
+        {template_id for _, template_id, _, _ in parsed}
+    )
+    targets = NotificationTarget.objects.in_bulk({target_id for _, _, target_id, _ in parsed})
+    
+    # 同步发送的记录带有租约，发送期间不会被发送进程领取
+    lease = {} if async_send else sync_lease()
+    records = []
+    indexes = []
+    for index, template_id, target_id, context in parsed:
+        template = templates.get(template_id)
+        target = targets.get(target_id)
+        if template is None or target is None:
+            error = "模板不存在" if template is None else "目标不存在"
+        elif template.channel is None or not template.channel.enabled:
+            error = "渠道未启用"
+        else:
+            records.append(NotificationRecord(
+                template=template,
+                channel=template.channel,
+                target=target,
+                status=NotificationRecord.Status.PENDING,
+                context=context,
+                **lease,
+            ))
+            indexes.append(index)
+            continue
+        results[index] = {"index": index, "status": "error", "error": error}
+    
+    records = insert_records(records)
+    record_ids = [record.id for record in records]
+    if async_send:
+        if record_ids:
+            transaction.on_commit(lambda: enqueue_records(record_ids))
+        statuses = {record_id: {"status": "queued"} for record_id in record_ids}
+    else:
+        try:
+            statuses = _deliver(record_ids) if record_ids else {}
+        finally:
+            release_sync_lease(record_ids)
+    
+    for index, record_id in zip(indexes, record_ids):
+        results[index] = {"index": index, "record_id": record_id, **statuses[record_id]}
+    return [results[index] for index, _ in chunk]
+
+
+def _deliver(record_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """同步发送一块记录，返回每条记录的结果"""
+    summary = deliver_pending_records(record_ids)
+    deferred = set(summary["deferred"])
+    if deferred:
+        # 渠道限流或熔断：记录保持待发送状态，等待后加入发送队列
+        retry_after = summary["retry_after"]
+        transaction.on_commit(lambda: enqueue_records(list(deferred), countdown=retry_after))
+    
+    statuses = {}
+    rows = NotificationRecord.objects.filter(id__in=record_ids).values_list(
+        "id", "status", "error_message", "next_attempt_at"
+    )
+    for record_id, status, error_message, next_attempt_at in rows:
+        if record_id in deferred:
+            statuses[record_id] = {"status": "deferred", "retry_after": summary["retry_after"]}
+        elif status == NotificationRecord.Status.SUCCESS:
+            statuses[record_id] = {"status": "success"}
+        elif status == NotificationRecord.Status.RETRY:
+            statuses[record_id] = {"status": "retry", "error": error_message, "next_attempt_at": next_attempt_at}
+        else:
+            statuses[record_id] = {"status": status, "error": error_message}
+    return statuses
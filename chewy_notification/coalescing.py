@@ -0,0 +1,196 @@
+"""
+重复通知合并
+
+渠道设置了合并窗口（coalesce_window）时，同一目标在窗口内收到的相同通知
+（标题、内容和参数的摘要相同）会被合并：
+
+- 窗口内第一条立即发送；
+- 之后的重复通知合并到一条延后到窗口结束时发送的记录中，只累加合并次数，
+  不再创建新记录，也不会调用服务商；
+- 正在发送中（带有租约）的记录不再接受合并，重复通知改为延后到窗口结束时发送；
+- 合并记录发送时 Bark 使用角标（badge）显示次数，其它渠道在标题后追加 “(×N)”。
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from chewy_notification.models import NotificationChannel, NotificationRecord
+
+
+def content_hash(title: str, content: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    计算通知内容摘要
+    
+    Args:
+        title: 通知标题
+        content: 通知内容
+        params: 扩展参数
+    
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    body = json.dumps([title, content, params or {}], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class CoalescePlan:
+    """一次发送中各目标的合并方式"""
+    
+    def __init__(self, digest: str):
+        self.digest = digest
+        # 立即发送的目标
+        self.immediate = []
+        # 延后到窗口结束发送的目标：[(target, send_at)]
+        self.delayed = []
+        # 合并到已有待发送记录的目标
+        self.merged_targets = []
+        # {target_id: 合并到的记录ID}
+        self.merged = {}
+    
+    @property
+    def new_targets(self) -> List:
+        """需要创建记录的目标（立即发送在前，延后发送在后）"""
+        return self.immediate + [target for target, _ in self.delayed]
+    
+    def apply(self, records: List[NotificationRecord]) -> Dict[int, List[int]]:
+        """
+        写入延后记录的发送时间（合并次数在 plan_coalescing 中已经累加）
+        
+        Args:
+            records: 按 new_targets 顺序创建的记录
+        
+        Returns:
+            dict: {延迟秒数: [记录ID]}，用于按延迟加入发送队列
+        """
+        now = timezone.now()
+        delayed_records = records[len(self.immediate):]
+        schedule = {}
+        for record, (_, send_at) in zip(delayed_records, self.delayed):
+            record.next_attempt_at = send_at
+            countdown = max(0, int((send_at - now).total_seconds()) + 1)
+            schedule.setdefault(countdown, []).append(record.id)
+        if delayed_records:
+            NotificationRecord.objects.bulk_update(delayed_records, ["next_attempt_at"])
+        return schedule
+
+
+def merge_into_pending(pending: Dict[int, int], now) -> Dict[int, int]:
+    """
+    将重复通知合并到已有的待发送记录（累加合并次数）
+    
+    锁定仍处于待发送状态且没有租约的记录后再累加；已被领取、正在发送或已经发送的记录不再合并。
+    
+    Args:
+        pending: {target_id: 待发送记录ID}
+        now: 当前时间
+    
+    Returns:
+        dict: 合并成功的 {target_id: 记录ID}
+    """
+    if not pending:
+        return {}
+    
+    with transaction.atomic():
+        mergeable = set(
+            NotificationRecord.objects.select_for_update()
+            .filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lte=now),
+                id__in=list(pending.values()),
+                status=NotificationRecord.Status.PENDING,
+            )
+            .values_list("id", flat=True)
+        )
+        updated = 0
+        if mergeable:
+            updated = NotificationRecord.objects.filter(
+                id__in=list(mergeable), status=NotificationRecord.Status.PENDING
+            ).update(coalesced_count=F("coalesced_count") + 1)
+        if updated != len(mergeable):
+            # 不支持行锁的数据库上记录可能在查询之后被领取，无法确定哪些记录已累加，全部改为延后发送
+            return {}
+    return {target_id: record_id for target_id, record_id in pending.items() if record_id in mergeable}
+
+
+def plan_coalescing(channel, targets, digest: str, now=None) -> CoalescePlan:
+    """
+    根据窗口内的已有记录决定每个目标的发送方式
+    
+    可以合并的目标在这里直接累加到已有记录的合并次数；目标记录已开始发送或已发送时改为延后发送。
+    
+    Args:
+        channel: 发送渠道
+        targets: 目标列表
+        digest: 通知内容摘要
+        now: 当前时间
+    
+    Returns:
+        CoalescePlan
+    """
+    plan = CoalescePlan(digest)
+    window = channel.coalesce_window
+    if not window or not targets:
+        plan.immediate = list(targets)
+        return plan
+    
+    now = now or timezone.now()
+    since = now - timedelta(seconds=window)
+    recent = (
+        NotificationRecord.objects.filter(
+            Q(create_time__gte=since) | Q(send_time__gte=since),
+            channel=channel,
+            target__in=[target.id for target in targets],
+            content_hash=digest,
+        )
+        .values_list("id", "target_id", "status", "locked_until", "create_time", "send_time")
+    )
+    
+    pending = {}
+    last_sent = {}
+    for record_id, target_id, status, locked_until, create_time, send_time in recent:
+        if status == NotificationRecord.Status.PENDING and locked_until is not None and locked_until > now:
+            # 同步发送或发送进程的租约：记录正在发送，视为刚刚发送
+            last_sent[target_id] = max(now, last_sent.get(target_id, now))
+        elif status == NotificationRecord.Status.PENDING:
+            pending[target_id] = record_id
+        elif status == NotificationRecord.Status.SCHEDULED:
+            # 定时发送的记录不参与合并
+            continue
+        else:
+            sent_at = send_time or create_time
+            last_sent[target_id] = max(sent_at, last_sent.get(target_id, sent_at))
+    
+    merged = merge_into_pending(pending, now)
+    for target in targets:
+        if target.id in merged:
+            plan.merged_targets.append(target)
+            plan.merged[target.id] = merged[target.id]
+        elif target.id in pending or target.id in last_sent:
+            # 待发送记录在合并前被领取或已发送时，按刚刚发送处理
+            plan.delayed.append((target, last_sent.get(target.id, now) + timedelta(seconds=window)))
+        else:
+            plan.immediate.append(target)
+    return plan
+
+
+def apply_coalesced_count(message: Dict[str, Any], channel_type: str, count: int) -> Dict[str, Any]:
+    """
+    在消息中体现合并次数
+    
+    Args:
+        message: resolve_message 返回的消息
+        channel_type: 渠道类型
+        count: 合并次数
+    
+    Returns:
+        dict: 新的消息
+    """
+    if count <= 1:
+        return message
+    if channel_type == NotificationChannel.ChannelType.BARK:
+        return {**message, "params": {**message["params"], "badge": count}}
+    return {**message, "title": f"{message['title']} (×{count})"}
@@ -0,0 +1,112 @@
+"""
+应用配置
+
+所有配置项都可以在 Django settings 中通过 ``CHEWY_NOTIFICATION`` 字典覆盖：
+
+    CHEWY_NOTIFICATION = {
+        "HTTP_POOL_MAXSIZE": 20,
+        "HTTP_MAX_RETRIES": 2,
+    }
+"""
+from typing import Any
+
+from django.conf import settings
+
+DEFAULTS = {
+    # HTTP 连接池（Bark / Ntfy / 飞书）
+    "HTTP_TIMEOUT": 10,
+    "HTTP_POOL_CONNECTIONS": 10,
+    "HTTP_POOL_MAXSIZE": 10,
+    "HTTP_POOL_KEEPALIVE": 60,
+    "HTTP_MAX_RETRIES": 2,
+    "HTTP_RETRY_BACKOFF": 0.3,
+    # 异步批量发送的默认并发数
+    "ASYNC_CONCURRENCY": 50,
+    # 同步批量发送：每个渠道同时进行的请求数（渠道配置 max_concurrency 优先）
+    "MAX_CONCURRENCY": 10,
+    # Bark 批量推送时单个请求包含的设备数（渠道配置 batch_size 优先），1 表示不合并
+    "BARK_BATCH_SIZE": 100,
+    # 批量写入数据库时每条语句包含的记录数
+    "DB_BATCH_SIZE": 500,
+    # 异步发送时每个批量任务处理的记录数
+    "TASK_BATCH_SIZE": 500,
+    # 快速发送接口单次请求的总耗时上限（秒），应小于 gunicorn 的 --timeout
+    "QUICK_SEND_DEADLINE": 90,
+    # 渠道限流：发送前等待令牌的最长时间（秒），超过则延后发送
+    "RATE_LIMIT_MAX_WAIT": 5,
+    # 渠道限流：每次从共享令牌桶预留令牌的时间窗口（秒），减少数据库访问
+    "RATE_LIMIT_LEASE_WINDOW": 0.2,
+    # 失败重试：暂时性失败最多尝试的次数（含首次发送）
+    "RETRY_MAX_ATTEMPTS": 5,
+    # 失败重试：指数退避的基数和上限（秒）
+    "RETRY_BACKOFF_BASE": 30,
+    "RETRY_BACKOFF_MAX": 3600,
+    # 失败重试：每次领取到期重试记录的数量上限
+    "RETRY_BATCH_LIMIT": 1000,
+    # 渠道熔断：是否启用
+    "CIRCUIT_BREAKER_ENABLED": True,
+    # 渠道熔断：统计失败率的时间窗口（秒）和窗口内最少请求数
+    "CIRCUIT_WINDOW": 60,
+    "CIRCUIT_MIN_REQUESTS": 20,
+    # 渠道熔断：失败（含慢请求）比例达到该值时熔断
+    "CIRCUIT_ERROR_RATE": 0.5,
+    # 渠道熔断：耗时超过该秒数的请求计为慢请求
+    "CIRCUIT_SLOW_CALL": 5,
+    # 渠道熔断：熔断持续时间（秒），之后放行一个探测请求
+    "CIRCUIT_OPEN_SECONDS": 30,
+    # 渠道熔断：读取共享熔断状态的最小间隔（秒）
+    "CIRCUIT_CHECK_INTERVAL": 1,
+    # 异步发送方式：auto（有 Celery 用 Celery，否则使用数据库队列）/ celery / thread / database
+    # database 表示由 run_notification_worker 命令从数据库领取待发送记录；
+    # thread 在当前进程的后台线程池中发送，进程重启时未发送的任务会丢失，仅适合开发环境
+    "DELIVERY_BACKEND": "auto",
+    # thread 方式的后台线程数
+    "THREAD_BACKEND_WORKERS": 4,
+    # 数据库发送进程：并发线程数、每次领取的记录数、空闲时轮询间隔（秒）
+    "WORKER_CONCURRENCY": 1,
+    "WORKER_BATCH_SIZE": 100,
+    "WORKER_POLL_INTERVAL": 1,
+    # 数据库发送进程：领取记录的租约时长（秒），进程异常退出后记录在租约过期后被重新领取
+    "WORKER_LEASE_SECONDS": 300,
+    # 发送接口幂等键的保留时间（秒）
+    "IDEMPOTENCY_TTL": 86400,
+    # 幂等键占位行的处理租约（秒）：首次请求超过该时间仍未完成时（例如进程被杀），允许重试请求接手，
+    # 应大于 QUICK_SEND_DEADLINE 和 gunicorn 的 --timeout
+    "IDEMPOTENCY_LEASE_SECONDS": 300,
+    # 记录保留：{状态: 保留天数}，例如 {"success": 30, "failed": 90}，未列出的状态不清理
+    "RETENTION_DAYS": {},
+    # 记录保留：归档目录，清理前将记录写入 gzip 压缩的 JSONL 文件，为空时不归档
+    "RETENTION_ARCHIVE_DIR": None,
+    # 记录保留：每批删除的记录数（每批一个短事务）
+    "RETENTION_BATCH_SIZE": 1000,
+    # 记录导出：每次从数据库游标读取的行数
+    "EXPORT_CHUNK_SIZE": 2000,
+    # 定时发送：每次领取到期定时记录的数量
+    "SCHEDULE_BATCH_LIMIT": 1000,
+    # 定时发送：同一批到期记录在该时间窗口（秒）内均匀错开入队，0 表示立即全部入队
+    "SCHEDULE_SPREAD_SECONDS": 0,
+    # 优先级：{level: Celery 队列名}，例如 {"critical": "notify-critical", "passive": "notify-bulk"}，
+    # 未列出的优先级使用 Celery 默认队列，为空时不按优先级分队列
+    "PRIORITY_QUEUES": {},
+    # 优先级：数据库发送进程中记录每等待该秒数提升一级优先级（最高到 timeSensitive），
+    # 避免低优先级记录一直得不到发送，0 表示不提升
+    "PRIORITY_AGING_SECONDS": 300,
+    # 数据库发送进程：额外为 critical 通知预留的线程数，这些线程只领取 critical 记录
+    "WORKER_CRITICAL_CONCURRENCY": 1,
+}
+
+
+def get_setting(name: str) -> Any:
+    """
+    读取配置项
+    
+    Args:
+        name: 配置项名称
+    
+    Returns:
+        用户配置的值，未配置时返回默认值
+    """
+    user_settings = getattr(settings, "CHEWY_NOTIFICATION", None) or {}
+    if name in user_settings:
+        return user_settings[name]
+    return DEFAULTS[name]
@@ -0,0 +1,312 @@
+"""
+批量投递
+
+批量发送的公共流程：批量创建待发送记录、通过渠道服务批量发送、
+批量回写发送结果。数据库写入次数与目标数量按批次增长，而不是逐条增长。
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import connection
+from django.utils import timezone
+
+from chewy_notification.coalescing import apply_coalesced_count
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationRecord
+from chewy_notification.rendering import render_template
+from chewy_notification.retry import schedule_retry
+from chewy_notification.services import get_service_for_channel
+from chewy_notification.stats import record_stats
+
+logger = logging.getLogger(__name__)
+
+# 发送成功/失败/等待重试时需要回写的字段
+SUCCESS_FIELDS = ["status", "response", "attempts", "send_time", "update_time"]
+FAILURE_FIELDS = ["status", "error_message", "attempts", "send_time", "update_time"]
+RETRY_FIELDS = ["status", "error_message", "attempts", "next_attempt_at", "send_time", "update_time"]
+
+# 同步发送的记录在请求处理期间由该标识持有
+SYNC_LOCK = "sync-request"
+
+
+def sync_lease() -> Dict[str, Any]:
+    """
+    同步发送的记录在创建时即带有的租约字段
+    
+    请求发送期间数据库发送进程不会领取这些记录；处理请求的进程异常退出时，
+    记录在 WORKER_LEASE_SECONDS 后租约过期，由发送进程接手发送。
+    
+    Returns:
+        dict: locked_by / locked_until
+    """
+    return {
+        "locked_by": SYNC_LOCK,
+        "locked_until": timezone.now() + timedelta(seconds=get_setting("WORKER_LEASE_SECONDS")),
+    }
+
+
+def release_sync_lease(record_ids: List[int]):
+    """同步发送结束后释放租约，延后或等待重试的记录之后可以被发送进程领取"""
+    NotificationRecord.objects.filter(id__in=record_ids, locked_by=SYNC_LOCK).update(
+        locked_by="", locked_until=None
+    )
+
+
+def create_pending_records(channel, targets, **fields) -> List[NotificationRecord]:
+    """
+    批量创建待发送记录
+    
+    Args:
+        channel: 发送渠道
+        targets: 目标列表
+        **fields: 记录的其它字段（如 template），status 默认为待发送，
+            priority 默认由消息的 level 决定
+    
+    Returns:
+        list: 已保存（带主键）的记录，顺序与 targets 一致
+    """
+    from chewy_notification.priority import priority_for_params
+    
+    fields.setdefault("status", NotificationRecord.Status.PENDING)
+    if "priority" not in fields:
+        message = fields.get("message")
+        fields["priority"] = priority_for_params(message.params if message else None)
+    return insert_records([
+        NotificationRecord(channel=channel, target=target, **fields)
+        for target in targets
+    ])
+
+
+def insert_records(records: List[NotificationRecord]) -> List[NotificationRecord]:
+    """
+    批量插入记录
+    
+    Args:
+        records: 未保存的记录
+    
+    Returns:
+        list: 已保存（带主键）的记录，顺序不变
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # 数据库不支持批量插入后返回主键，只能逐条创建
+        for record in records:
+            record.save()
+        return records
+    
+    return NotificationRecord.objects.bulk_create(
+        records, batch_size=get_setting("DB_BATCH_SIZE")
+    )
+
+
+def apply_outcome(record: NotificationRecord, outcome: Dict[str, Any], now=None):
+    """
+    将单个发送结果写入记录（不保存）
+    
+    延后发送（限流或熔断）的结果不修改记录，记录保持待发送状态；
+    暂时性失败且未超过重试次数的记录进入重试状态。
+    
+    Args:
+        record: 通知记录
+        outcome: send_batch 返回的单个结果
+        now: 发送时间，默认当前时间
+    """
+    if outcome.get("deferred"):
+        return
+    
+    now = now or timezone.now()
+    record.send_time = now
+    record.update_time = now
+    record.attempts += 1
+    
+    if outcome["success"]:
+        record.status = NotificationRecord.Status.SUCCESS
+        record.response = outcome["response"]
+    else:
+        record.error_message = outcome["error"]
+        if not schedule_retry(record, outcome, now):
+            record.status = NotificationRecord.Status.FAILED
+
+
+def save_outcomes(records: List[NotificationRecord]):
+    """
+    批量回写发送结果，成功、失败和等待重试的记录分别只更新各自变化的字段，并累加发送统计
+    
+    Args:
+        records: 已调用 apply_outcome 的记录
+    """
+    batch_size = get_setting("DB_BATCH_SIZE")
+    groups = (
+        (NotificationRecord.Status.SUCCESS, SUCCESS_FIELDS),
+        (NotificationRecord.Status.FAILED, FAILURE_FIELDS),
+        (NotificationRecord.Status.RETRY, RETRY_FIELDS),
+    )
+    for status, fields in groups:
+        changed = [r for r in records if r.status == status]
+        if changed:
+            NotificationRecord.objects.bulk_update(changed, fields, batch_size=batch_size)
+    record_stats(records)
+
+
+def resolve_message(record: NotificationRecord) -> Dict[str, Any]:
+    """
+    根据记录得到待发送的消息（快速发送使用保存的消息，模板发送渲染模板）
+    
+    Args:
+        record: 通知记录（需已加载 message/template/channel/target）
+    
+    Returns:
+        dict: {"target": ..., "title": ..., "content": ..., "params": {...}}
+    
+    Raises:
+        ValueError: 记录缺少目标或消息内容
+    """
+    if record.target is None:
+        raise ValueError("通知目标不存在")
+    
+    if record.message is not None:
+        title = record.message.title
+        content = record.message.content
+        params = record.message.params
+    elif record.template is not None:
+        title, content = render_template(record.template, record.context or {})
+        params = {}
+    else:
+        raise ValueError("通知模板不存在")
+    
+    message = {
+        "target": record.target.target_value,
+        "title": title,
+        "content": content,
+        "params": params,
+    }
+    if record.coalesced_count > 1 and record.channel is not None:
+        # 合并了重复通知的记录：在消息中体现合并次数
+        message = apply_coalesced_count(message, record.channel.type, record.coalesced_count)
+    return message
+
+
+def send_records(
+    channel,
+    records: List[NotificationRecord],
+    messages: List[Dict[str, Any]],
+    deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    通过同一个渠道发送一组记录，并把结果写入记录（不保存）
+    
+    Args:
+        channel: 发送渠道
+        records: 待发送记录
+        messages: 与 records 一一对应的消息，格式同 send_many()
+        deadline: 整批发送的时间上限（秒）
+    
+    Returns:
+        list: 与 records 顺序一致的发送结果
+    """
+    if not records:
+        return []
+    
+    try:
+        service = get_service_for_channel(channel)
+        outcomes = service.send_many(messages, deadline=deadline)
+    except Exception as e:
+        logger.error(f"渠道 {channel} 批量发送失败: {str(e)}")
+        outcomes = [{"success": False, "error": str(e)} for _ in records]
+    
+    now = timezone.now()
+    for record, outcome in zip(records, outcomes):
+        apply_outcome(record, outcome, now)
+        if outcome.get("deferred"):
+            logger.info(f"发送到 {record.target} 被延后，{outcome['retry_after']:.1f} 秒后重试: {outcome['error']}")
+        elif record.status == NotificationRecord.Status.RETRY:
+            logger.warning(f"发送到 {record.target} 失败，将于 {record.next_attempt_at} 重试: {outcome['error']}")
+        elif not outcome["success"]:
+            logger.error(f"发送到 {record.target} 失败: {outcome['error']}")
+    
+    return outcomes
+
+
+def deliver_records(
+    channel,
+    records: List[NotificationRecord],
+    title: str,
+    content: str,
+    params: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    将同一条通知发送给一组记录对应的目标，并批量回写结果
+    
+    Args:
+        channel: 发送渠道
+        records: 待发送记录（需已加载 target）
+        title: 通知标题
+        content: 通知内容
+        params: 传给服务的扩展参数
+        deadline: 整批发送的时间上限（秒）
+    
+    Returns:
+        list: 与 records 顺序一致的发送结果
+    """
+    messages = [
+        {"target": record.target.target_value, "title": title, "content": content, "params": params or {}}
+        for record in records
+    ]
+    outcomes = send_records(channel, records, messages, deadline=deadline)
+    save_outcomes(records)
+    return outcomes
+
+
+def deliver_pending_records(record_ids: List[int]) -> Dict[str, Any]:
+    """
+    发送一批待发送记录（模板发送和快速发送均可）
+    
+    一次查询加载全部记录，按渠道分组后每个渠道复用一个服务实例发送，
+    最后批量回写结果。非待发送状态的记录会被跳过，被限流或熔断延后的记录保持待发送状态。
+    
+    Args:
+        record_ids: 通知记录ID列表
+    
+    Returns:
+        dict: {"total": 处理数, "succeeded": 成功数,
+               "deferred": 延后发送的记录ID列表, "retry_after": 建议重试等待秒数}
+    """
+    records = list(
+        NotificationRecord.objects.select_related("template", "message", "channel", "target")
+        .filter(id__in=record_ids, status=NotificationRecord.Status.PENDING)
+        .order_by("id")
+    )
+    
+    by_channel = {}
+    now = timezone.now()
+    for record in records:
+        try:
+            if record.channel is None:
+                raise ValueError("发送渠道不存在")
+            message = resolve_message(record)
+        except Exception as e:
+            apply_outcome(record, {"success": False, "error": str(e)}, now)
+            continue
+        group = by_channel.setdefault(record.channel_id, (record.channel, [], []))
+        group[1].append(record)
+        group[2].append(message)
+    
+    deferred = []
+    retry_after = 0.0
+    for channel, channel_records, messages in by_channel.values():
+        outcomes = send_records(channel, channel_records, messages)
+        for record, outcome in zip(channel_records, outcomes):
+            if outcome.get("deferred"):
+                deferred.append(record.id)
+                retry_after = max(retry_after, outcome["retry_after"])
+    
+    save_outcomes(records)
+    
+    succeeded = sum(1 for record in records if record.status == NotificationRecord.Status.SUCCESS)
+    return {
+        "total": len(records),
+        "succeeded": succeeded,
+        "deferred": deferred,
+        "retry_after": retry_after,
+    }
@@ -0,0 +1,94 @@
+"""
+发送记录导出
+
+导出不经过序列化器和分页：以 .values() 读取需要的字段，服务端游标分块（.iterator(chunk_size)）
+逐行生成 CSV 或 NDJSON 并通过 StreamingHttpResponse 发送，内存占用不随导出行数增长。
+"""
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from chewy_notification.conf import get_setting
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+
+# 导出的字段（列名即 .values() 的字段名）
+EXPORT_FIELDS = [
+    "id",
+    "create_time",
+    "status",
+    "channel_id",
+    "channel__name",
+    "template_id",
+    "template__name",
+    "target_id",
+    "target__alias",
+    "target__target_value",
+    "message__title",
+    "send_time",
+    "attempts",
+    "coalesced_count",
+    "error_message",
+    "response",
+]
+
+CONTENT_TYPES = {
+    CSV: "text/csv; charset=utf-8",
+    NDJSON: "application/x-ndjson; charset=utf-8",
+}
+
+
+class _Echo:
+    """csv.writer 的写入目标，直接返回写入的行"""
+    
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """逐行生成 CSV（首行为表头，带 BOM 便于 Excel 识别编码）"""
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[field]) for field in EXPORT_FIELDS])
+
+
+def _csv_value(value: Any) -> Any:
+    """CSV 单元格的值：JSON 字段序列化为字符串，时间使用 ISO 8601"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """逐行生成 NDJSON"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder) + "\n"
+
+
+def export_records(queryset, file_format: str = CSV) -> StreamingHttpResponse:
+    """
+    以流的形式导出记录
+    
+    Args:
+        queryset: 已筛选和排序的记录查询
+        file_format: csv 或 ndjson
+    
+    Returns:
+        StreamingHttpResponse
+    """
+    rows = queryset.values(*EXPORT_FIELDS).iterator(chunk_size=get_setting("EXPORT_CHUNK_SIZE"))
+    lines = iter_csv(rows) if file_format == CSV else iter_ndjson(rows)
+    
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[file_format])
+    filename = f"notification-records-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
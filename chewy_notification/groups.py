@@ -0,0 +1,63 @@
+"""
+目标分组
+
+按分组广播时，分组成员在服务端通过 (group, target) 索引一次解析，
+再按目标主键分块读取，每块创建记录并加入发送队列，
+十万级的分组也不需要客户端传入目标ID列表，也不会一次把所有目标加载到内存。
+"""
+from typing import Iterator, List, Optional
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import (
+    NotificationTarget,
+    NotificationTargetGroup,
+    NotificationTargetGroupMember,
+)
+
+
+def group_targets(names: List[str], target_type: Optional[str] = None):
+    """
+    属于任一分组的目标（同时属于多个分组的目标只出现一次）
+    
+    Args:
+        names: 分组名称列表
+        target_type: 只返回该类型的目标
+    
+    Returns:
+        QuerySet
+    """
+    member_ids = NotificationTargetGroupMember.objects.filter(group__name__in=names).values("target_id")
+    queryset = NotificationTarget.objects.filter(id__in=member_ids)
+    if target_type:
+        queryset = queryset.filter(target_type=target_type)
+    return queryset
+
+
+def missing_groups(names: List[str]) -> List[str]:
+    """不存在的分组名称"""
+    existing = set(NotificationTargetGroup.objects.filter(name__in=names).values_list("name", flat=True))
+    return [name for name in names if name not in existing]
+
+
+def iter_target_chunks(queryset, chunk_size: Optional[int] = None) -> Iterator[List[NotificationTarget]]:
+    """
+    按主键分块读取目标
+    
+    每块是一条 id > 上一块最后一个 id 的查询，不使用长时间打开的游标，
+    读取过程中可以在同一事务内写入记录。
+    
+    Args:
+        queryset: 目标查询
+        chunk_size: 每块的目标数，默认使用 TASK_BATCH_SIZE
+    
+    Yields:
+        list: 一块目标
+    """
+    chunk_size = chunk_size or get_setting("TASK_BATCH_SIZE")
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by("id")[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
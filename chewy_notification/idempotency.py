@@ -0,0 +1,166 @@
+"""
+发送接口幂等
+
+客户端在请求头 ``Idempotency-Key``（或请求体 ``idempotency_key`` 字段）中传入幂等键后，
+同一个键在 IDEMPOTENCY_TTL 内的重复请求不会再次创建记录和发送，而是直接返回首次请求的响应。
+
+首次请求开始处理前先插入占位行，唯一约束保证并发的重复请求中只有一个能继续执行，
+其余请求在首次请求完成前得到 409，完成后得到保存的响应。
+处理请求的进程异常退出（例如 gunicorn 超时被杀）时占位行不会被删除，
+超过 IDEMPOTENCY_LEASE_SECONDS 仍未完成的占位行由相同内容的重试请求接手处理。
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationIdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_FIELD = "idempotency_key"
+
+
+def get_idempotency_key(request):
+    """从请求头或请求体中读取幂等键，未传入时返回 None"""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key and hasattr(request.data, "get"):
+        key = request.data.get(IDEMPOTENCY_FIELD)
+    return str(key)[:255] if key else None
+
+
+def _request_hash(request) -> str:
+    """请求内容摘要（不含幂等键字段）"""
+    data = request.data
+    if hasattr(data, "dict"):
+        data = data.dict()
+    if isinstance(data, dict):
+        data = {name: value for name, value in data.items() if name != IDEMPOTENCY_FIELD}
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _replay(entry):
+    """返回首次请求保存的响应"""
+    response = Response(entry.response, status=entry.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claim(endpoint: str, key: str, request_hash: str):
+    """
+    插入占位行
+    
+    Returns:
+        (entry, created)：created 为 False 时 entry 是已存在的记录（并发冲突时可能为 None）；
+            接手处理超时的占位行时 created 为 True
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=get_setting("IDEMPOTENCY_LEASE_SECONDS"))
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                entry = NotificationIdempotencyKey.objects.create(
+                    endpoint=endpoint,
+                    key=key,
+                    request_hash=request_hash,
+                    expire_time=now + timedelta(seconds=get_setting("IDEMPOTENCY_TTL")),
+                )
+            return entry, True
+        except IntegrityError:
+            entry = NotificationIdempotencyKey.objects.filter(endpoint=endpoint, key=key).first()
+            if entry is None:
+                # 其它请求刚刚删除了占位行（处理失败），重新尝试
+                continue
+            if entry.expire_time > now:
+                if (
+                    entry.status_code is None
+                    and entry.request_hash == request_hash
+                    and entry.update_time <= stale_before
+                    and _take_over(entry, now)
+                ):
+                    logger.warning(f"幂等键 {endpoint}:{key} 的首次请求未完成，由重试请求接手处理")
+                    return entry, True
+                return entry, False
+            # 已过期的键视为新请求
+            NotificationIdempotencyKey.objects.filter(pk=entry.pk, expire_time__lte=now).delete()
+    return None, False
+
+
+def _take_over(entry, now) -> bool:
+    """
+    接手处理超时的占位行（条件更新保证并发的重试请求中只有一个能接手）
+    
+    Returns:
+        bool: 是否接手成功
+    """
+    taken = NotificationIdempotencyKey.objects.filter(
+        pk=entry.pk, status_code__isnull=True, update_time=entry.update_time
+    ).update(update_time=now)
+    entry.update_time = now
+    return bool(taken)
+
+
+def idempotent(endpoint: str):
+    """
+    为发送接口的 post 方法添加幂等支持
+    
+    Args:
+        endpoint: 接口名称，不同接口的幂等键互不影响
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = get_idempotency_key(request)
+            if key is None:
+                return method(view, request, *args, **kwargs)
+            
+            request_hash = _request_hash(request)
+            entry, created = _claim(endpoint, key, request_hash)
+            if not created:
+                if entry is not None and entry.request_hash != request_hash:
+                    return Response(
+                        {"error": "Idempotency-Key 已用于内容不同的请求"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                if entry is None or entry.status_code is None:
+                    return Response(
+                        {"error": "相同 Idempotency-Key 的请求正在处理中"},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                return _replay(entry)
+            
+            try:
+                response = method(view, request, *args, **kwargs)
+            except Exception:
+                # 处理失败时删除占位行，允许客户端使用同一个键重试
+                NotificationIdempotencyKey.objects.filter(pk=entry.pk).delete()
+                raise
+            
+            entry.status_code = response.status_code
+            entry.response = response.data
+            entry.save(update_fields=["status_code", "response", "update_time"])
+            return response
+        
+        return wrapper
+    
+    return decorator
+
+
+def purge_expired_keys() -> int:
+    """
+    删除过期的幂等键
+    
+    Returns:
+        int: 删除的数量
+    """
+    deleted, _ = NotificationIdempotencyKey.objects.filter(expire_time__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chewy_notification.models import NotificationTarget
+from chewy_notification.target_import import FORMATS, detect_format, import_targets, iter_rows
+
+
+class Command(BaseCommand):
+    """从 CSV / NDJSON 文件批量导入通知目标"""
+    
+    help = "按流读取 CSV 或 NDJSON 文件并分块导入通知目标，已存在的目标跳过"
+    
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="文件路径")
+        parser.add_argument(
+            "--input-format",
+            choices=FORMATS,
+            default=None,
+            help="文件格式，默认根据扩展名判断"
+        )
+        parser.add_argument(
+            "--target-type",
+            choices=NotificationTarget.TargetType.values,
+            default=None,
+            help="行中没有 target_type 时使用的目标类型"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="每块写入的行数，默认使用 DB_BATCH_SIZE 配置"
+        )
+    
+    def handle(self, *args, **options):
+        file_format = options["input_format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("无法根据扩展名判断文件格式，请通过 --input-format 指定")
+        
+        try:
+            with open(options["path"], "rb") as stream:
+                summary = import_targets(
+                    iter_rows(stream, file_format),
+                    default_type=options["target_type"],
+                    batch_size=options["batch_size"],
+                )
+        except OSError as e:
+            raise CommandError(f"无法读取文件: {str(e)}")
+        
+        self.stdout.write(
+            f"共 {summary['total']} 行，新增 {summary['inserted']}，"
+            f"重复 {summary['duplicates']}，无效 {summary['invalid']}"
+        )
+        for error in summary["errors"]:
+            self.stdout.write(f"第 {error['line']} 行: {error['error']}")
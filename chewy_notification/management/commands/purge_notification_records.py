@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chewy_notification.conf import get_setting
+from chewy_notification.idempotency import purge_expired_keys
+from chewy_notification.models import NotificationRecord
+from chewy_notification.retention import purge_records
+
+
+class Command(BaseCommand):
+    """归档并删除超过保留期的通知记录"""
+    
+    help = "按 RETENTION_DAYS 归档并分批删除超过保留期的通知记录，同时清理过期的幂等键"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            action="append",
+            default=None,
+            metavar="STATUS=DAYS",
+            help="按状态设置保留天数（可重复，例如 --days success=30 --days failed=90），默认使用 RETENTION_DAYS 配置"
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=None,
+            help="归档目录，默认使用 RETENTION_ARCHIVE_DIR 配置"
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="不归档，直接删除"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="每批删除的记录数，默认使用 RETENTION_BATCH_SIZE 配置"
+        )
+    
+    def handle(self, *args, **options):
+        retention = self._parse_days(options["days"]) if options["days"] else get_setting("RETENTION_DAYS")
+        if not retention:
+            self.stdout.write("未配置保留天数（RETENTION_DAYS），不清理通知记录")
+        
+        summary = purge_records(
+            retention=retention,
+            archive_dir="" if options["no_archive"] else options["archive_dir"],
+            batch_size=options["batch_size"],
+        )
+        for status in retention:
+            self.stdout.write(f"{status}: 删除 {summary[status]} 条记录")
+        if summary.get("archive"):
+            self.stdout.write(f"归档文件: {summary['archive']}")
+        self.stdout.write(f"删除 {purge_expired_keys()} 个过期幂等键")
+    
+    def _parse_days(self, values):
+        """解析 STATUS=DAYS 参数"""
+        retention = {}
+        for value in values:
+            status, _, days = value.partition("=")
+            if status not in NotificationRecord.Status.values or not days.isdigit():
+                raise CommandError(f"无效的保留天数: {value}，格式应为 STATUS=DAYS")
+            retention[status] = int(days)
+        return retention
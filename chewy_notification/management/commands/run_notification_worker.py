@@ -0,0 +1,70 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chewy_notification.tasks import get_delivery_backend
+from chewy_notification.worker import NotificationWorker
+
+
+class Command(BaseCommand):
+    """从数据库领取待发送记录并发送（不依赖 Celery）"""
+    
+    help = "启动数据库发送进程：循环领取待发送和到期重试的通知记录并发送"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="并发线程数，默认使用 WORKER_CONCURRENCY 配置"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="每次领取的记录数，默认使用 WORKER_BATCH_SIZE 配置"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="没有待发送记录时的轮询间隔（秒），默认使用 WORKER_POLL_INTERVAL 配置"
+        )
+        parser.add_argument(
+            "--critical-concurrency",
+            type=int,
+            default=None,
+            help="只发送 critical 通知的预留线程数，默认使用 WORKER_CRITICAL_CONCURRENCY 配置"
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="只处理一批记录后退出（适合 cron 调度）"
+        )
+    
+    def handle(self, *args, **options):
+        backend = get_delivery_backend()
+        if backend != "database":
+            # 其它发送方式下记录入队时已经交给 Celery 或线程发送，发送进程再领取会重复发送
+            raise CommandError(
+                f"当前发送方式为 {backend}，发送进程只能在 DELIVERY_BACKEND 为 database 时运行"
+            )
+        
+        worker = NotificationWorker(
+            concurrency=options["concurrency"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            critical_concurrency=options["critical_concurrency"],
+        )
+        
+        if options["once"]:
+            processed = worker.run_once()
+            self.stdout.write(f"已处理 {processed} 条通知记录")
+            return
+        
+        # 收到 SIGTERM 时处理完当前批次再退出
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+        self.stdout.write(
+            f"通知发送进程启动，并发线程数: {worker.concurrency}，critical 预留线程数: {worker.critical_concurrency}"
+        )
+        worker.run()
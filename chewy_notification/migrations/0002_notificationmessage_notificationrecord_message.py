@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('title', models.CharField(help_text='通知标题', max_length=200, verbose_name='标题')),
+                ('content', models.TextField(help_text='通知内容', verbose_name='内容')),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Bark 扩展参数（subtitle、level、badge 等）', verbose_name='扩展参数')),
+            ],
+            options={
+                'verbose_name': '通知消息',
+                'verbose_name_plural': '通知消息',
+                'db_table': 'chewy_notify_message',
+                'ordering': ['-create_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='message',
+            field=models.ForeignKey(blank=True, help_text='无模板发送时的标题、内容和扩展参数', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='chewy_notification.notificationmessage', verbose_name='消息内容'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0002_notificationmessage_notificationrecord_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='context',
+            field=models.JSONField(blank=True, default=dict, help_text='渲染模板时使用的变量上下文', verbose_name='模板变量'),
+        ),
+    ]
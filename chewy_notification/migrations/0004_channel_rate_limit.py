@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0003_notificationrecord_context'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='NotificationChannelState',
+            fields=[
+                ('channel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='chewy_notification.notificationchannel', verbose_name='渠道')),
+                ('rate_tat', models.FloatField(default=0, help_text='令牌桶（GCRA）的理论到达时间，Unix 时间戳', verbose_name='限流时间戳')),
+            ],
+            options={
+                'verbose_name': '渠道状态',
+                'verbose_name_plural': '渠道状态',
+                'db_table': 'chewy_notify_channel_state',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationchannel',
+            name='rate_burst',
+            field=models.PositiveIntegerField(default=1, help_text='允许瞬时连续发送的请求数', verbose_name='突发上限'),
+        ),
+        migrations.AddField(
+            model_name='notificationchannel',
+            name='rate_limit',
+            field=models.FloatField(blank=True, help_text='每秒最多发送的请求数，留空表示不限制', null=True, verbose_name='速率限制'),
+        ),
+    ]
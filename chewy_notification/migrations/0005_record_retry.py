@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0004_channel_rate_limit'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='已经尝试发送的次数', verbose_name='尝试次数'),
+        ),
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='重试中的记录下一次发送的时间', null=True, verbose_name='下次重试时间'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='chewy_notif_status_4d6974_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0005_record_retry'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationchannelstate',
+            name='circuit_open_until',
+            field=models.FloatField(default=0, help_text='熔断结束、允许探测的时间，Unix 时间戳', verbose_name='熔断截止时间'),
+        ),
+        migrations.AddField(
+            model_name='notificationchannelstate',
+            name='circuit_state',
+            field=models.CharField(default='closed', help_text='closed（正常）/ open（熔断）/ half_open（探测中）', max_length=20, verbose_name='熔断状态'),
+        ),
+    ]
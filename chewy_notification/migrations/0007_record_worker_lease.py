@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0006_channel_circuit_breaker'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='locked_by',
+            field=models.CharField(blank=True, default='', help_text='领取该记录的发送进程标识', max_length=64, verbose_name='处理进程'),
+        ),
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='发送进程异常退出后，记录在该时间之后可被重新领取', null=True, verbose_name='领取过期时间'),
+        ),
+        migrations.AlterField(
+            model_name='notificationrecord',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='重试中或延后发送的记录下一次发送的时间', null=True, verbose_name='下次发送时间'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:11
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0007_record_worker_lease'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='NotificationIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('endpoint', models.CharField(help_text='幂等键所属的接口', max_length=50, verbose_name='接口')),
+                ('key', models.CharField(help_text='客户端传入的 Idempotency-Key', max_length=255, verbose_name='幂等键')),
+                ('request_hash', models.CharField(help_text='请求内容的 SHA-256，用于识别相同键的不同请求', max_length=64, verbose_name='请求摘要')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='为空表示首次请求仍在处理中', null=True, verbose_name='响应状态码')),
+                ('response', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='响应内容')),
+                ('expire_time', models.DateTimeField(db_index=True, verbose_name='过期时间')),
+            ],
+            options={
+                'verbose_name': '幂等键',
+                'verbose_name_plural': '幂等键',
+                'db_table': 'chewy_notify_idempotency_key',
+                'constraints': [models.UniqueConstraint(fields=('endpoint', 'key'), name='chewy_notify_idempotency_unique')],
+            },
+        ),
+    ]
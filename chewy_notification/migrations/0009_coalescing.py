@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0008_idempotency_key'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationchannel',
+            name='coalesce_window',
+            field=models.PositiveIntegerField(default=0, help_text='窗口（秒）内发送给同一目标的相同通知合并为一次发送，0 表示不合并', verbose_name='合并窗口'),
+        ),
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='coalesced_count',
+            field=models.PositiveIntegerField(default=1, help_text='合并到该记录中的通知数量', verbose_name='合并次数'),
+        ),
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='标题、内容和参数的 SHA-256，用于合并重复通知', max_length=64, verbose_name='内容摘要'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['target', 'content_hash', 'create_time'], name='chewy_notif_target__5a5084_idx'),
+        ),
+    ]
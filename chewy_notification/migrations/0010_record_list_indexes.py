@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0009_coalescing'),
+    ]
+    
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['channel', 'status', 'create_time'], name='chewy_notif_channel_bf3bc3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['target', 'create_time'], name='chewy_notif_target__76e99b_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0010_record_list_indexes'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='NotificationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='发送时间所在小时的开始时间（UTC）', verbose_name='统计小时')),
+                ('status', models.CharField(choices=[('pending', '待发送'), ('success', '发送成功'), ('failed', '发送失败'), ('retry', '重试中')], help_text='发送后的状态，retry 表示暂时性失败后等待重试', max_length=20, verbose_name='发送状态')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='发送次数')),
+                ('latency_sum', models.FloatField(default=0, help_text='从创建记录到发送完成的耗时之和（秒）', verbose_name='总耗时')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='chewy_notification.notificationchannel', verbose_name='发送渠道')),
+            ],
+            options={
+                'verbose_name': '发送统计',
+                'verbose_name_plural': '发送统计',
+                'db_table': 'chewy_notify_stat',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='chewy_notif_hour_8e4218_idx')],
+                'constraints': [models.UniqueConstraint(fields=('channel', 'hour', 'status'), name='chewy_notify_stat_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0011_delivery_stats'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='NotificationTargetGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('name', models.CharField(help_text='发送时通过分组名称选择目标', max_length=100, unique=True, verbose_name='分组名称')),
+                ('description', models.CharField(blank=True, default='', max_length=500, verbose_name='描述')),
+            ],
+            options={
+                'verbose_name': '目标分组',
+                'verbose_name_plural': '目标分组',
+                'db_table': 'chewy_notify_target_group',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationTargetGroupMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='加入时间')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='chewy_notification.notificationtargetgroup', verbose_name='分组')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_members', to='chewy_notification.notificationtarget', verbose_name='目标')),
+            ],
+            options={
+                'verbose_name': '分组成员',
+                'verbose_name_plural': '分组成员',
+                'db_table': 'chewy_notify_target_group_member',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationtargetgroup',
+            name='targets',
+            field=models.ManyToManyField(blank=True, related_name='target_groups', through='chewy_notification.NotificationTargetGroupMember', to='chewy_notification.notificationtarget', verbose_name='目标'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationtargetgroupmember',
+            constraint=models.UniqueConstraint(fields=('group', 'target'), name='chewy_notify_group_member_unique'),
+        ),
+    ]
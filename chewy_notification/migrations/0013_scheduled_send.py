@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0012_target_groups'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, help_text='定时发送的记录计划发送的时间', null=True, verbose_name='定时发送时间'),
+        ),
+        migrations.AlterField(
+            model_name='notificationrecord',
+            name='status',
+            field=models.CharField(choices=[('pending', '待发送'), ('success', '发送成功'), ('failed', '发送失败'), ('retry', '重试中'), ('scheduled', '定时发送')], default='pending', max_length=20, verbose_name='发送状态'),
+        ),
+        migrations.AlterField(
+            model_name='notificationstat',
+            name='status',
+            field=models.CharField(choices=[('pending', '待发送'), ('success', '发送成功'), ('failed', '发送失败'), ('retry', '重试中'), ('scheduled', '定时发送')], help_text='发送后的状态，retry 表示暂时性失败后等待重试', max_length=20, verbose_name='发送状态'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['status', 'scheduled_at'], name='chewy_notif_status_36f36f_idx'),
+        ),
+    ]
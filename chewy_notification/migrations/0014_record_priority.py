@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0013_scheduled_send'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notificationrecord',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, '紧急（critical）'), (1, '时效性（timeSensitive）'), (2, '普通（active）'), (3, '静默（passive）')], default=2, help_text='由消息的 level 决定，异步发送时优先发送数值小的记录', verbose_name='优先级'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(fields=['priority', 'status', 'next_attempt_at'], name='chewy_notif_priorit_826ccb_idx'),
+        ),
+    ]
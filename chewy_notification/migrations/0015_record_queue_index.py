@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chewy_notification', '0014_record_priority'),
+    ]
+    
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationrecord',
+            name='chewy_notif_priorit_826ccb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecord',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'retry'])), fields=['priority', 'id'], name='chewy_notify_record_queue_idx'),
+        ),
+    ]
@@ -2,12 +2,23 @@ from .base import BaseModel
 from .channel import NotificationChannel
 from .template import NotificationTemplate
 from .target import NotificationTarget
+from .message import NotificationMessage
 from .record import NotificationRecord
+from .state import NotificationChannelState
+from .idempotency import NotificationIdempotencyKey
+from .stat import NotificationStat
+from .group import NotificationTargetGroup, NotificationTargetGroupMember
 
 __all__ = [
     "BaseModel",
     "NotificationChannel",
     "NotificationTemplate",
     "NotificationTarget",
+    "NotificationMessage",
     "NotificationRecord",
+    "NotificationChannelState",
+    "NotificationIdempotencyKey",
+    "NotificationStat",
+    "NotificationTargetGroup",
+    "NotificationTargetGroupMember",
 ]
@@ -32,6 +32,22 @@ class NotificationChannel(BaseModel):
         verbose_name="是否启用",
         help_text="是否启用该渠道"
     )
+    rate_limit = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name="速率限制",
+        help_text="每秒最多发送的请求数，留空表示不限制"
+    )
+    rate_burst = models.PositiveIntegerField(
+        default=1,
+        verbose_name="突发上限",
+        help_text="允许瞬时连续发送的请求数"
+    )
+    coalesce_window = models.PositiveIntegerField(
+        default=0,
+        verbose_name="合并窗口",
+        help_text="窗口（秒）内发送给同一目标的相同通知合并为一次发送，0 表示不合并"
+    )
     
     class Meta:
         db_table = "chewy_notify_channel"
@@ -39,5 +55,18 @@ class NotificationChannel(BaseModel):
         verbose_name_plural = verbose_name
         ordering = ["-create_time"]
     
+    # 渠道类型对应的目标类型
+    TARGET_TYPES = {
+        ChannelType.BARK: "bark_token",
+        ChannelType.EMAIL: "email",
+        ChannelType.NTFY: "ntfy_topic",
+        ChannelType.FEISHU: "feishu_webhook",
+    }
+    
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
+    
+    @property
+    def target_type(self):
+        """该渠道可以发送的目标类型"""
+        return self.TARGET_TYPES.get(self.type)
@@ -0,0 +1,71 @@
+from django.db import models
+from django.utils import timezone
+from .base import BaseModel
+from .target import NotificationTarget
+
+
+class NotificationTargetGroup(BaseModel):
+    """通知目标分组（标签），用于按分组广播"""
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="分组名称",
+        help_text="发送时通过分组名称选择目标"
+    )
+    description = models.CharField(
+        max_length=500,
+        blank=True,
+        default="",
+        verbose_name="描述"
+    )
+    targets = models.ManyToManyField(
+        NotificationTarget,
+        through="NotificationTargetGroupMember",
+        related_name="target_groups",
+        blank=True,
+        verbose_name="目标"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_target_group"
+        verbose_name = "目标分组"
+        verbose_name_plural = verbose_name
+        ordering = ["name"]
+    
+    def __str__(self):
+        return self.name
+
+
+class NotificationTargetGroupMember(models.Model):
+    """分组成员"""
+    
+    group = models.ForeignKey(
+        NotificationTargetGroup,
+        on_delete=models.CASCADE,
+        related_name="members",
+        verbose_name="分组"
+    )
+    target = models.ForeignKey(
+        NotificationTarget,
+        on_delete=models.CASCADE,
+        related_name="group_members",
+        verbose_name="目标"
+    )
+    create_time = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name="加入时间"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_target_group_member"
+        verbose_name = "分组成员"
+        verbose_name_plural = verbose_name
+        constraints = [
+            # 同时作为按分组查找成员的索引（group, target）
+            models.UniqueConstraint(fields=["group", "target"], name="chewy_notify_group_member_unique"),
+        ]
+    
+    def __str__(self):
+        return f"{self.group_id} -> {self.target_id}"
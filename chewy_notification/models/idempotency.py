@@ -0,0 +1,50 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from .base import BaseModel
+
+
+class NotificationIdempotencyKey(BaseModel):
+    """发送接口的幂等键（相同键的重复请求直接返回首次请求的响应）"""
+    
+    endpoint = models.CharField(
+        max_length=50,
+        verbose_name="接口",
+        help_text="幂等键所属的接口"
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="幂等键",
+        help_text="客户端传入的 Idempotency-Key"
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        verbose_name="请求摘要",
+        help_text="请求内容的 SHA-256，用于识别相同键的不同请求"
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="响应状态码",
+        help_text="为空表示首次请求仍在处理中"
+    )
+    response = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="响应内容"
+    )
+    expire_time = models.DateTimeField(
+        db_index=True,
+        verbose_name="过期时间"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_idempotency_key"
+        verbose_name = "幂等键"
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=["endpoint", "key"], name="chewy_notify_idempotency_unique"),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint}:{self.key}"
@@ -0,0 +1,31 @@
+from django.db import models
+from .base import BaseModel
+
+
+class NotificationMessage(BaseModel):
+    """通知消息模型（无模板发送时保存一次，由多条发送记录共享）"""
+    
+    title = models.CharField(
+        max_length=200,
+        verbose_name="标题",
+        help_text="通知标题"
+    )
+    content = models.TextField(
+        verbose_name="内容",
+        help_text="通知内容"
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="扩展参数",
+        help_text="Bark 扩展参数（subtitle、level、badge 等）"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_message"
+        verbose_name = "通知消息"
+        verbose_name_plural = verbose_name
+        ordering = ["-create_time"]
+    
+    def __str__(self):
+        return self.title
@@ -3,6 +3,7 @@ from .base import BaseModel
 from .channel import NotificationChannel
 from .template import NotificationTemplate
 from .target import NotificationTarget
+from .message import NotificationMessage
 
 
 class NotificationRecord(BaseModel):
@@ -13,6 +14,14 @@ class NotificationRecord(BaseModel):
         SUCCESS = "success", "发送成功"
         FAILED = "failed", "发送失败"
         RETRY = "retry", "重试中"
+        SCHEDULED = "scheduled", "定时发送"
+    
+    class Priority(models.IntegerChoices):
+        """发送优先级，对应 Bark 的 level，数值越小越优先"""
+        CRITICAL = 0, "紧急（critical）"
+        TIME_SENSITIVE = 1, "时效性（timeSensitive）"
+        ACTIVE = 2, "普通（active）"
+        PASSIVE = 3, "静默（passive）"
     
     template = models.ForeignKey(
         NotificationTemplate,
@@ -32,6 +41,15 @@ class NotificationRecord(BaseModel):
         verbose_name="发送渠道",
         help_text="使用的发送渠道"
     )
+    message = models.ForeignKey(
+        NotificationMessage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="records",
+        verbose_name="消息内容",
+        help_text="无模板发送时的标题、内容和扩展参数"
+    )
     target = models.ForeignKey(
         NotificationTarget,
         on_delete=models.SET_NULL,
@@ -47,6 +65,18 @@ class NotificationRecord(BaseModel):
         default=Status.PENDING,
         verbose_name="发送状态"
     )
+    priority = models.PositiveSmallIntegerField(
+        choices=Priority.choices,
+        default=Priority.ACTIVE,
+        verbose_name="优先级",
+        help_text="由消息的 level 决定，异步发送时优先发送数值小的记录"
+    )
+    context = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="模板变量",
+        help_text="渲染模板时使用的变量上下文"
+    )
     response = models.JSONField(
         default=dict,
         verbose_name="响应信息",
@@ -64,6 +94,48 @@ class NotificationRecord(BaseModel):
         verbose_name="错误信息",
         help_text="发送失败时的错误信息"
     )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="尝试次数",
+        help_text="已经尝试发送的次数"
+    )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="下次发送时间",
+        help_text="重试中或延后发送的记录下一次发送的时间"
+    )
+    scheduled_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="定时发送时间",
+        help_text="定时发送的记录计划发送的时间"
+    )
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        verbose_name="处理进程",
+        help_text="领取该记录的发送进程标识"
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        verbose_name="内容摘要",
+        help_text="标题、内容和参数的 SHA-256，用于合并重复通知"
+    )
+    coalesced_count = models.PositiveIntegerField(
+        default=1,
+        verbose_name="合并次数",
+        help_text="合并到该记录中的通知数量"
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="领取过期时间",
+        help_text="发送进程异常退出后，记录在该时间之后可被重新领取"
+    )
     
     class Meta:
         db_table = "chewy_notify_record"
@@ -73,6 +145,18 @@ class NotificationRecord(BaseModel):
         indexes = [
             models.Index(fields=["-create_time"]),
             models.Index(fields=["status"]),
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["status", "scheduled_at"]),
+            # 数据库发送进程按优先级逐个队列领取（只索引待发送和重试中的记录）
+            models.Index(
+                fields=["priority", "id"],
+                condition=models.Q(status__in=["pending", "retry"]),
+                name="chewy_notify_record_queue_idx",
+            ),
+            models.Index(fields=["target", "content_hash", "create_time"]),
+            # 记录列表的筛选条件加游标分页的排序
+            models.Index(fields=["channel", "status", "create_time"]),
+            models.Index(fields=["target", "create_time"]),
         ]
     
     def __str__(self):
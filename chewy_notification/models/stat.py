@@ -0,0 +1,52 @@
+from django.db import models
+from .channel import NotificationChannel
+from .record import NotificationRecord
+
+
+class NotificationStat(models.Model):
+    """按渠道、状态和小时汇总的发送统计（随发送结果增量更新）"""
+    
+    channel = models.ForeignKey(
+        NotificationChannel,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="发送渠道"
+    )
+    hour = models.DateTimeField(
+        verbose_name="统计小时",
+        help_text="发送时间所在小时的开始时间（UTC）"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=NotificationRecord.Status.choices,
+        verbose_name="发送状态",
+        help_text="发送后的状态，retry 表示暂时性失败后等待重试"
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="发送次数"
+    )
+    latency_sum = models.FloatField(
+        default=0,
+        verbose_name="总耗时",
+        help_text="从创建记录到发送完成的耗时之和（秒）"
+    )
+    update_time = models.DateTimeField(
+        auto_now=True,
+        verbose_name="更新时间"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_stat"
+        verbose_name = "发送统计"
+        verbose_name_plural = verbose_name
+        ordering = ["-hour"]
+        constraints = [
+            models.UniqueConstraint(fields=["channel", "hour", "status"], name="chewy_notify_stat_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["hour"]),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel_id} {self.hour:%Y-%m-%d %H:00} {self.status}: {self.count}"
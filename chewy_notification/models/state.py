@@ -0,0 +1,38 @@
+from django.db import models
+from .channel import NotificationChannel
+
+
+class NotificationChannelState(models.Model):
+    """渠道运行状态（在多个进程之间共享）"""
+    
+    channel = models.OneToOneField(
+        NotificationChannel,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="state",
+        verbose_name="渠道"
+    )
+    rate_tat = models.FloatField(
+        default=0,
+        verbose_name="限流时间戳",
+        help_text="令牌桶（GCRA）的理论到达时间，Unix 时间戳"
+    )
+    circuit_state = models.CharField(
+        max_length=20,
+        default="closed",
+        verbose_name="熔断状态",
+        help_text="closed（正常）/ open（熔断）/ half_open（探测中）"
+    )
+    circuit_open_until = models.FloatField(
+        default=0,
+        verbose_name="熔断截止时间",
+        help_text="熔断结束、允许探测的时间，Unix 时间戳"
+    )
+    
+    class Meta:
+        db_table = "chewy_notify_channel_state"
+        verbose_name = "渠道状态"
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.channel_id}"
@@ -0,0 +1,120 @@
+"""
+发送记录的游标分页
+
+页码分页每页都要 COUNT(*)，翻到后面的页还要 OFFSET 扫过前面所有行，记录表很大时越翻越慢。
+游标分页按 (create_time, id) 排序，游标保存上一页最后一条记录的位置，
+下一页通过索引直接定位，第 5000 页和第 1 页的开销相同，也不统计总数。
+"""
+import base64
+from datetime import datetime
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    按 (create_time, id) 的键集分页
+    
+    默认按创建时间倒序，传入 ordering=create_time 时正序。
+    """
+    
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = "无效的游标"
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.descending = request.query_params.get("ordering") != "create_time"
+        
+        if self.descending:
+            queryset = queryset.order_by("-create_time", "-id")
+        else:
+            queryset = queryset.order_by("create_time", "id")
+        
+        position = self.decode_cursor(request)
+        if position is not None:
+            create_time, pk = position
+            if self.descending:
+                queryset = queryset.filter(create_time__lte=create_time).filter(
+                    Q(create_time__lt=create_time) | Q(id__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(create_time__gte=create_time).filter(
+                    Q(create_time__gt=create_time) | Q(id__gt=pk)
+                )
+        
+        # 多取一条用于判断是否还有下一页
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = (results[-1].create_time, results[-1].id) if self.has_next else None
+        return results
+    
+    def get_page_size(self, request) -> int:
+        """读取每页数量"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+    
+    def decode_cursor(self, request):
+        """
+        解析游标
+        
+        Returns:
+            (create_time, id)，未传入游标时返回 None
+        
+        Raises:
+            NotFound: 游标格式错误
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            querystring = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            return datetime.fromisoformat(tokens["t"][0]), int(tokens["i"][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def encode_cursor(self, position) -> str:
+        """生成指向 position 之后的游标链接"""
+        create_time, pk = position
+        querystring = parse.urlencode({"t": create_time.isoformat(), "i": pk})
+        encoded = base64.urlsafe_b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+    
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "first": self.get_first_link(),
+            "results": data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "first": {"type": "string", "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,105 @@
+"""
+发送优先级
+
+记录创建时按消息的 level（critical / timeSensitive / active / passive）确定优先级，
+异步发送按优先级分道：
+
+- Celery：配置 PRIORITY_QUEUES 后不同优先级的记录投递到不同队列，且不会混在同一个批量任务中，
+  为紧急队列单独启动 worker 即可保证告警不排在大批量广播之后；
+- 数据库发送进程：按优先级逐个队列领取（每次只领取一个优先级，批次不会混合），
+  WORKER_CRITICAL_CONCURRENCY 个线程只领取 critical 记录；等待超过 PRIORITY_AGING_SECONDS 的记录
+  由定期执行的 UPDATE 逐级提升优先级，低优先级记录不会一直得不到发送。
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationRecord
+
+logger = logging.getLogger(__name__)
+
+Priority = NotificationRecord.Priority
+
+# Bark level 与优先级的对应关系
+LEVEL_PRIORITIES = {
+    "critical": Priority.CRITICAL,
+    "timeSensitive": Priority.TIME_SENSITIVE,
+    "active": Priority.ACTIVE,
+    "passive": Priority.PASSIVE,
+}
+PRIORITY_LEVELS = {priority: level for level, priority in LEVEL_PRIORITIES.items()}
+
+
+def priority_for_params(params: Optional[Dict[str, Any]]) -> int:
+    """
+    根据消息扩展参数中的 level 得到优先级
+    
+    Args:
+        params: 消息扩展参数
+    
+    Returns:
+        int: 优先级，未指定或无法识别的 level 为 active
+    """
+    level = (params or {}).get("level")
+    return LEVEL_PRIORITIES.get(level, Priority.ACTIVE)
+
+
+def priority_queue(priority: int) -> Optional[str]:
+    """优先级对应的 Celery 队列名，未配置时返回 None（使用默认队列）"""
+    return get_setting("PRIORITY_QUEUES").get(PRIORITY_LEVELS.get(priority))
+
+
+def group_by_priority(record_ids: List[int]) -> List[Tuple[int, List[int]]]:
+    """
+    按优先级分组记录
+    
+    Args:
+        record_ids: 记录ID列表
+    
+    Returns:
+        list: [(优先级, 记录ID列表)]，优先级高的在前，组内保持原顺序
+    """
+    priorities = dict(
+        NotificationRecord.objects.filter(id__in=record_ids).values_list("id", "priority")
+    )
+    groups = {}
+    for record_id in record_ids:
+        groups.setdefault(priorities.get(record_id, Priority.ACTIVE), []).append(record_id)
+    return sorted(groups.items())
+
+
+def promote_waiting_records(now=None) -> int:
+    """
+    提升等待过久的记录的优先级
+    
+    待发送或已到期重试、且超过 PRIORITY_AGING_SECONDS 没有变化的记录提升一级（最高提升到 timeSensitive，
+    不占用为 critical 预留的线程），提升时刷新 update_time，每个周期最多提升一级。
+    由数据库发送进程定期执行，领取时按优先级逐个队列查询即可，无需对积压记录排序。
+    
+    Args:
+        now: 当前时间
+    
+    Returns:
+        int: 提升的记录数
+    """
+    aging = get_setting("PRIORITY_AGING_SECONDS")
+    if not aging:
+        return 0
+    
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=aging)
+    waiting = NotificationRecord.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=cutoff),
+        status__in=[NotificationRecord.Status.PENDING, NotificationRecord.Status.RETRY],
+        update_time__lte=cutoff,
+    )
+    promoted = 0
+    for priority in range(Priority.TIME_SENSITIVE + 1, Priority.PASSIVE + 1):
+        promoted += waiting.filter(priority=priority).update(priority=priority - 1, update_time=now)
+    if promoted:
+        logger.info(f"{promoted} 条等待超过 {aging} 秒的记录已提升优先级")
+    return promoted
@@ -0,0 +1,120 @@
+"""
+模板渲染
+
+模板使用 {{variable}} 语法。模板字符串只解析一次，编译结果被缓存，
+之后每次渲染只需单次遍历拼接，与上下文变量数量无关。
+"""
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+_PLACEHOLDER = re.compile(r"\{\{([^{}]*)\}\}")
+
+# 模板对象缓存：template_id -> (update_time, (title, content))
+_template_cache = {}
+_template_cache_lock = threading.Lock()
+
+
+class CompiledTemplate:
+    """编译后的模板"""
+    
+    __slots__ = ("source", "_segments", "_tail")
+    
+    def __init__(self, source: str):
+        """
+        解析模板字符串
+        
+        Args:
+            source: 模板字符串
+        """
+        self.source = source
+        segments = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            segments.append((source[position:match.start()], match.group(1)))
+            position = match.end()
+        self._segments = tuple(segments)
+        self._tail = source[position:]
+    
+    def render(self, context: Dict[str, Any]) -> str:
+        """
+        渲染模板，上下文中不存在的变量保持原样
+        
+        Args:
+            context: 变量字典
+        
+        Returns:
+            渲染后的字符串
+        """
+        parts = []
+        for literal, name in self._segments:
+            parts.append(literal)
+            if name in context:
+                parts.append(str(context[name]))
+            else:
+                parts.append(f"{{{{{name}}}}}")
+        parts.append(self._tail)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> CompiledTemplate:
+    """
+    编译模板字符串（按内容缓存）
+    
+    Args:
+        source: 模板字符串
+    
+    Returns:
+        CompiledTemplate
+    """
+    return CompiledTemplate(source)
+
+
+def get_compiled_template(template) -> Tuple[CompiledTemplate, CompiledTemplate]:
+    """
+    获取通知模板编译后的标题和内容
+    
+    已保存的模板按 (id, update_time) 缓存，模板更新后自动重新编译。
+    
+    Args:
+        template: NotificationTemplate 实例
+    
+    Returns:
+        (标题模板, 内容模板)
+    """
+    if template.pk is None:
+        return compile_template(template.title), compile_template(template.content)
+    
+    with _template_cache_lock:
+        cached = _template_cache.get(template.pk)
+        if cached is not None and cached[0] == template.update_time:
+            return cached[1]
+    
+    compiled = (CompiledTemplate(template.title), CompiledTemplate(template.content))
+    with _template_cache_lock:
+        _template_cache[template.pk] = (template.update_time, compiled)
+    return compiled
+
+
+def render_template(template, context: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    渲染通知模板
+    
+    Args:
+        template: NotificationTemplate 实例
+        context: 变量字典
+    
+    Returns:
+        (标题, 内容)
+    """
+    title, content = get_compiled_template(template)
+    return title.render(context), content.render(context)
+
+
+def clear_template_cache():
+    """清空模板缓存"""
+    with _template_cache_lock:
+        _template_cache.clear()
+    compile_template.cache_clear()
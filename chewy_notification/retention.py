@@ -0,0 +1,155 @@
+"""
+发送记录保留与归档
+
+发送记录表会随发送量无限增长。按 RETENTION_DAYS 为每种状态设置保留天数后，
+purge_records 会把超过保留期的记录（可选）归档到 gzip 压缩的 JSONL 文件，
+再按主键分批删除。每批在独立的短事务中完成，SQLite 和 PostgreSQL 上都不会长时间锁表。
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationMessage, NotificationRecord
+
+logger = logging.getLogger(__name__)
+
+# 归档的字段：记录本身的字段加上目标和消息内容，归档文件不依赖其它表即可阅读
+ARCHIVE_FIELDS = [
+    "id",
+    "create_time",
+    "update_time",
+    "status",
+    "channel_id",
+    "template_id",
+    "target_id",
+    "target__target_value",
+    "message__title",
+    "message__content",
+    "message__params",
+    "context",
+    "response",
+    "send_time",
+    "error_message",
+    "attempts",
+    "coalesced_count",
+]
+
+
+def expired_records(status: str, days: int, now=None):
+    """
+    超过保留期的记录
+    
+    Args:
+        status: 记录状态
+        days: 保留天数
+        now: 当前时间
+    
+    Returns:
+        QuerySet
+    """
+    now = now or timezone.now()
+    return NotificationRecord.objects.filter(status=status, create_time__lt=now - timedelta(days=days))
+
+
+def archive_path(archive_dir: str, now=None) -> str:
+    """本次清理使用的归档文件路径"""
+    now = now or timezone.now()
+    return os.path.join(archive_dir, f"records-{now:%Y%m%d-%H%M%S}.jsonl.gz")
+
+
+def _archive(path: str, record_ids: List[int]):
+    """将一批记录追加写入归档文件"""
+    rows = NotificationRecord.objects.filter(id__in=record_ids).order_by("id").values(*ARCHIVE_FIELDS)
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            archive.write("\n")
+
+
+def purge_records(
+    retention: Optional[Dict[str, int]] = None,
+    archive_dir: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    now=None
+) -> Dict[str, int]:
+    """
+    归档并删除超过保留期的记录
+    
+    Args:
+        retention: {状态: 保留天数}，默认使用 RETENTION_DAYS，未列出的状态不清理
+        archive_dir: 归档目录，默认使用 RETENTION_ARCHIVE_DIR，为空字符串时不归档直接删除
+        batch_size: 每批删除的记录数，默认使用 RETENTION_BATCH_SIZE
+        now: 当前时间
+    
+    Returns:
+        dict: {状态: 删除数量}，另含 messages（删除的无引用消息数）和 archive（归档文件路径）
+    """
+    retention = get_setting("RETENTION_DAYS") if retention is None else retention
+    archive_dir = get_setting("RETENTION_ARCHIVE_DIR") if archive_dir is None else archive_dir
+    batch_size = batch_size or get_setting("RETENTION_BATCH_SIZE")
+    now = now or timezone.now()
+    
+    path = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        path = archive_path(archive_dir, now)
+    
+    summary = {}
+    for status, days in retention.items():
+        deleted = 0
+        queryset = expired_records(status, days, now)
+        while True:
+            record_ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+            if not record_ids:
+                break
+            if path:
+                # 先写归档再删除，删除失败时重复归档的记录可以按 id 去重
+                _archive(path, record_ids)
+            with transaction.atomic():
+                NotificationRecord.objects.filter(id__in=record_ids).delete()
+            deleted += len(record_ids)
+        summary[status] = deleted
+        if deleted:
+            logger.info(f"已清理 {deleted} 条超过 {days} 天的 {status} 记录")
+    
+    if retention:
+        summary["messages"] = purge_orphan_messages(min(retention.values()), batch_size, now)
+    summary["archive"] = path if path and os.path.exists(path) else None
+    return summary
+
+
+def purge_orphan_messages(days: int, batch_size: Optional[int] = None, now=None) -> int:
+    """
+    分批删除没有记录引用且超过保留期的消息内容
+    
+    Args:
+        days: 保留天数
+        batch_size: 每批删除的数量
+        now: 当前时间
+    
+    Returns:
+        int: 删除的数量
+    """
+    batch_size = batch_size or get_setting("RETENTION_BATCH_SIZE")
+    now = now or timezone.now()
+    queryset = NotificationMessage.objects.filter(
+        create_time__lt=now - timedelta(days=days), records__isnull=True
+    )
+    
+    deleted = 0
+    while True:
+        message_ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not message_ids:
+            break
+        with transaction.atomic():
+            NotificationMessage.objects.filter(id__in=message_ids, records__isnull=True).delete()
+        deleted += len(message_ids)
+    return deleted
@@ -0,0 +1,112 @@
+"""
+失败重试
+
+暂时性失败（超时、连接失败、429、5xx 等）的记录进入重试状态，
+按指数退避加随机抖动计算下一次发送时间，避免某个服务商故障恢复时
+所有记录同时重试。到期的记录通过 (status, next_attempt_at) 索引查询。
+"""
+import logging
+import random
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationRecord
+
+logger = logging.getLogger(__name__)
+
+
+def compute_backoff(attempts: int, retry_after: Optional[float] = None) -> float:
+    """
+    计算第 attempts 次失败后的重试等待时间
+    
+    等待时间为 min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2^(attempts-1))，
+    并在其一半到全部之间随机取值；服务端返回 Retry-After 时不早于该时间。
+    
+    Args:
+        attempts: 已尝试的次数（从 1 开始）
+        retry_after: 服务端建议的等待秒数
+    
+    Returns:
+        float: 等待秒数
+    """
+    ceiling = min(
+        get_setting("RETRY_BACKOFF_MAX"),
+        get_setting("RETRY_BACKOFF_BASE") * 2 ** max(0, attempts - 1),
+    )
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def schedule_retry(record: NotificationRecord, outcome: Dict[str, Any], now=None) -> bool:
+    """
+    对暂时性失败的记录安排重试（不保存）
+    
+    Args:
+        record: 已递增 attempts 的通知记录
+        outcome: 失败结果
+        now: 当前时间
+    
+    Returns:
+        bool: 是否安排了重试；不可重试或次数用尽时返回 False
+    """
+    if not outcome.get("retryable") or record.attempts >= get_setting("RETRY_MAX_ATTEMPTS"):
+        return False
+    
+    now = now or timezone.now()
+    delay = compute_backoff(record.attempts, outcome.get("retry_after"))
+    record.status = NotificationRecord.Status.RETRY
+    record.next_attempt_at = now + timedelta(seconds=delay)
+    return True
+
+
+def claim_due_retries(limit: Optional[int] = None) -> List[int]:
+    """
+    领取到期的重试记录并将其恢复为待发送状态
+    
+    支持 SKIP LOCKED 的数据库上多个进程同时领取也不会重复，
+    其它数据库上通过按状态条件更新和领取标识保证同一条记录只被领取一次。
+    
+    Args:
+        limit: 最多领取的记录数，默认使用 RETRY_BATCH_LIMIT
+    
+    Returns:
+        list: 领取到的记录ID
+    """
+    limit = limit or get_setting("RETRY_BATCH_LIMIT")
+    now = timezone.now()
+    
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    token = f"retry-{uuid.uuid4().hex}"
+    with transaction.atomic():
+        due = NotificationRecord.objects.filter(
+            status=NotificationRecord.Status.RETRY,
+            next_attempt_at__lte=now,
+        ).order_by("next_attempt_at")
+        if skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        record_ids = list(due.values_list("id", flat=True)[:limit])
+        if not record_ids:
+            return []
+        
+        NotificationRecord.objects.filter(
+            id__in=record_ids, status=NotificationRecord.Status.RETRY
+        ).update(
+            status=NotificationRecord.Status.PENDING,
+            next_attempt_at=None,
+            locked_by="" if skip_locked else token,
+            update_time=now,
+        )
+    
+    if not skip_locked:
+        # 不支持行锁的数据库上只保留本次条件更新成功的记录
+        claimed = NotificationRecord.objects.filter(id__in=record_ids, locked_by=token)
+        record_ids = list(claimed.order_by("id").values_list("id", flat=True))
+        claimed.update(locked_by="")
+    return record_ids
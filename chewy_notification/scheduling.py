@@ -0,0 +1,135 @@
+"""
+定时发送
+
+发送接口传入 scheduled_at 时，记录以 scheduled 状态保存。定时任务（或数据库发送进程）
+通过 (status, scheduled_at) 索引分批领取到期记录，恢复为待发送状态后加入发送队列。
+同一时刻到期的大量记录（例如早上 9 点的日报）会在 SCHEDULE_SPREAD_SECONDS 内均匀错开发送，
+避免同一秒集中请求服务商。
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationRecord
+
+logger = logging.getLogger(__name__)
+
+
+def parse_scheduled_at(value) -> Optional[datetime]:
+    """
+    解析请求中的定时发送时间
+    
+    Args:
+        value: ISO 8601 时间字符串，未传入时为 None
+    
+    Returns:
+        datetime: 晚于当前时间的发送时间；未传入或不晚于当前时间时返回 None（立即发送）
+    
+    Raises:
+        ValueError: 时间格式错误
+    """
+    if value in (None, ""):
+        return None
+    scheduled_at = parse_datetime(str(value))
+    if scheduled_at is None:
+        raise ValueError("scheduled_at 不是有效的时间")
+    if timezone.is_naive(scheduled_at):
+        scheduled_at = timezone.make_aware(scheduled_at)
+    return scheduled_at if scheduled_at > timezone.now() else None
+
+
+def due_scheduled_records(now=None):
+    """到期的定时记录"""
+    return NotificationRecord.objects.filter(
+        status=NotificationRecord.Status.SCHEDULED,
+        scheduled_at__lte=now or timezone.now(),
+    )
+
+
+def claim_due_scheduled(limit: Optional[int] = None, now=None) -> List[int]:
+    """
+    领取到期的定时记录并将其恢复为待发送状态
+    
+    支持 SKIP LOCKED 的数据库上多个进程同时领取也不会重复，
+    其它数据库上通过按状态条件更新保证同一条记录只被领取一次。
+    
+    Args:
+        limit: 最多领取的记录数，默认使用 SCHEDULE_BATCH_LIMIT
+        now: 当前时间
+    
+    Returns:
+        list: 领取到的记录ID
+    """
+    limit = limit or get_setting("SCHEDULE_BATCH_LIMIT")
+    now = now or timezone.now()
+    
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    token = f"scheduler-{uuid.uuid4().hex}"
+    with transaction.atomic():
+        due = due_scheduled_records(now).order_by("scheduled_at", "id")
+        if skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        record_ids = list(due.values_list("id", flat=True)[:limit])
+        if not record_ids:
+            return []
+        
+        NotificationRecord.objects.filter(
+            id__in=record_ids, status=NotificationRecord.Status.SCHEDULED
+        ).update(
+            status=NotificationRecord.Status.PENDING,
+            locked_by="" if skip_locked else token,
+            update_time=now,
+        )
+    
+    if not skip_locked:
+        # 不支持行锁的数据库上只保留本次条件更新成功的记录
+        claimed = NotificationRecord.objects.filter(id__in=record_ids, locked_by=token)
+        record_ids = list(claimed.order_by("scheduled_at", "id").values_list("id", flat=True))
+        claimed.update(locked_by="")
+    return record_ids
+
+
+def dispatch_scheduled(limit: Optional[int] = None, spread: Optional[float] = None, now=None) -> int:
+    """
+    分批领取全部到期的定时记录，在错开窗口内均匀加入发送队列
+    
+    Args:
+        limit: 每批领取的记录数，默认使用 SCHEDULE_BATCH_LIMIT
+        spread: 错开窗口（秒），默认使用 SCHEDULE_SPREAD_SECONDS，0 表示立即全部入队
+        now: 当前时间
+    
+    Returns:
+        int: 加入队列的记录数
+    """
+    from chewy_notification.tasks import enqueue_records
+    
+    spread = get_setting("SCHEDULE_SPREAD_SECONDS") if spread is None else spread
+    now = now or timezone.now()
+    # 按本次到期的总数计算每条记录的间隔
+    total = due_scheduled_records(now).count() if spread else 0
+    
+    dispatched = 0
+    while True:
+        record_ids = claim_due_scheduled(limit, now)
+        if not record_ids:
+            break
+        
+        buckets = {}
+        for position, record_id in enumerate(record_ids, start=dispatched):
+            countdown = int(spread * position / max(total, position + 1)) if spread else 0
+            buckets.setdefault(countdown, []).append(record_id)
+        for countdown, bucket in buckets.items():
+            transaction.on_commit(
+                lambda bucket=bucket, countdown=countdown: enqueue_records(bucket, countdown=countdown or None)
+            )
+        dispatched += len(record_ids)
+    
+    if dispatched:
+        logger.info(f"{dispatched} 条定时通知已到期，在 {spread} 秒内加入发送队列")
+    return dispatched
@@ -2,10 +2,13 @@ from .channel import NotificationChannelSerializer
 from .template import NotificationTemplateSerializer
 from .target import NotificationTargetSerializer
 from .record import NotificationRecordSerializer
+from .group import NotificationTargetGroupSerializer, GroupMembersSerializer
 
 __all__ = [
     "NotificationChannelSerializer",
     "NotificationTemplateSerializer",
     "NotificationTargetSerializer",
     "NotificationRecordSerializer",
+    "NotificationTargetGroupSerializer",
+    "GroupMembersSerializer",
 ]
@@ -16,11 +16,20 @@ class NotificationChannelSerializer(serializers.ModelSerializer):
             "type_display",
             "config",
             "enabled",
+            "rate_limit",
+            "rate_burst",
+            "coalesce_window",
             "create_time",
             "update_time",
         ]
         read_only_fields = ["id", "create_time", "update_time"]
     
+    def validate_rate_limit(self, value):
+        """验证速率限制"""
+        if value is not None and value <= 0:
+            raise serializers.ValidationError("速率限制必须大于0")
+        return value
+    
     def validate_config(self, value):
         """验证渠道配置"""
         channel_type = self.initial_data.get("type")
@@ -0,0 +1,27 @@
+from rest_framework import serializers
+from chewy_notification.models import NotificationTargetGroup
+
+
+class NotificationTargetGroupSerializer(serializers.ModelSerializer):
+    """目标分组序列化器"""
+    
+    class Meta:
+        model = NotificationTargetGroup
+        fields = [
+            "id",
+            "name",
+            "description",
+            "create_time",
+            "update_time",
+        ]
+        read_only_fields = ["id", "create_time", "update_time"]
+
+
+class GroupMembersSerializer(serializers.Serializer):
+    """分组成员变更请求"""
+    
+    target_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000
+    )
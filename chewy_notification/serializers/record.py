@@ -16,24 +16,37 @@ class NotificationRecordSerializer(serializers.ModelSerializer):
             "id",
             "template",
             "template_name",
+            "message",
             "channel",
             "channel_name",
             "target",
             "target_alias",
             "status",
             "status_display",
+            "priority",
+            "context",
             "response",
             "send_time",
             "error_message",
+            "attempts",
+            "coalesced_count",
+            "scheduled_at",
+            "next_attempt_at",
             "create_time",
             "update_time",
         ]
         read_only_fields = [
             "id",
             "status",
+            "priority",
+            "context",
             "response",
             "send_time",
             "error_message",
+            "attempts",
+            "coalesced_count",
+            "scheduled_at",
+            "next_attempt_at",
             "create_time",
             "update_time",
         ]
@@ -2,6 +2,28 @@ from rest_framework import serializers
 from chewy_notification.models import NotificationTarget
 import re
 
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def validate_target_value(target_type, target_value):
+    """
+    验证目标值格式
+    
+    Returns:
+        str: 错误信息，格式正确时返回 None
+    """
+    if target_type == NotificationTarget.TargetType.EMAIL:
+        # 验证邮箱格式
+        if not EMAIL_PATTERN.match(target_value):
+            return "邮箱格式不正确"
+    
+    elif target_type == NotificationTarget.TargetType.FEISHU_WEBHOOK:
+        # 验证webhook URL格式
+        if not target_value.startswith("https://"):
+            return "飞书Webhook必须以https://开头"
+    
+    return None
+
 
 class NotificationTargetSerializer(serializers.ModelSerializer):
     """通知目标序列化器"""
@@ -23,18 +45,7 @@ class NotificationTargetSerializer(serializers.ModelSerializer):
     
     def validate(self, attrs):
         """验证目标值格式"""
-        target_type = attrs.get("target_type")
-        target_value = attrs.get("target_value")
-        
-        if target_type == NotificationTarget.TargetType.EMAIL:
-            # 验证邮箱格式
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, target_value):
-                raise serializers.ValidationError({"target_value": "邮箱格式不正确"})
-        
-        elif target_type == NotificationTarget.TargetType.FEISHU_WEBHOOK:
-            # 验证webhook URL格式
-            if not target_value.startswith("https://"):
-                raise serializers.ValidationError({"target_value": "飞书Webhook必须以https://开头"})
-        
+        error = validate_target_value(attrs.get("target_type"), attrs.get("target_value"))
+        if error:
+            raise serializers.ValidationError({"target_value": error})
         return attrs
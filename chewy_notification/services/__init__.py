@@ -1,11 +1,22 @@
+import threading
+
+from chewy_notification.conf import get_setting
+
 from .bark_service import BarkService
 from .ntfy_service import NtfyService
 from .email_service import EmailService
 from .feishu_service import FeishuService
+from .exceptions import NotificationDeferred, RateLimitExceeded, CircuitOpenError
+from .rate_limit import TokenBucket
+from .circuit_breaker import CircuitBreaker
 
+# 进程内服务实例缓存：channel_id -> (update_time, service)
+_service_cache = {}
+_service_cache_lock = threading.Lock()
 
-def get_service_for_channel(channel):
-    """根据渠道类型获取对应的服务实例"""
+
+def _build_service(channel):
+    """根据渠道类型创建服务实例，并附加渠道的熔断器和限流器"""
     from chewy_notification.models import NotificationChannel
     
     service_map = {
@@ -19,7 +30,40 @@ def get_service_for_channel(channel):
     if not service_class:
         raise ValueError(f"不支持的渠道类型: {channel.type}")
     
-    return service_class(channel.config)
+    service = service_class(channel.config)
+    if channel.pk is not None:
+        if get_setting("CIRCUIT_BREAKER_ENABLED"):
+            service.circuit_breaker = CircuitBreaker(channel.pk)
+        if channel.rate_limit:
+            service.rate_limiter = TokenBucket(channel.pk, channel.rate_limit, channel.rate_burst)
+    return service
+
+
+def get_service_for_channel(channel):
+    """
+    根据渠道类型获取对应的服务实例
+    
+    已保存的渠道按 (id, update_time) 缓存实例，渠道更新后自动重建；
+    未保存的渠道每次都创建新实例。
+    """
+    if channel.pk is None:
+        return _build_service(channel)
+    
+    with _service_cache_lock:
+        cached = _service_cache.get(channel.pk)
+        if cached is not None and cached[0] == channel.update_time:
+            return cached[1]
+    
+    service = _build_service(channel)
+    with _service_cache_lock:
+        _service_cache[channel.pk] = (channel.update_time, service)
+    return service
+
+
+def clear_service_cache():
+    """清空服务实例缓存"""
+    with _service_cache_lock:
+        _service_cache.clear()
 
 
 __all__ = [
@@ -27,5 +71,11 @@ __all__ = [
     "NtfyService",
     "EmailService",
     "FeishuService",
+    "NotificationDeferred",
+    "RateLimitExceeded",
+    "CircuitOpenError",
+    "CircuitBreaker",
+    "TokenBucket",
     "get_service_for_channel",
+    "clear_service_cache",
 ]
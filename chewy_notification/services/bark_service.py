@@ -1,6 +1,8 @@
-import requests
 import logging
+from functools import partial
+from chewy_notification.conf import get_setting
 from .base_service import BaseNotificationService
+from .http_pool import HTTP_ERRORS, to_send_error
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +16,13 @@ class BarkService(BaseNotificationService):
         
         配置示例:
         {
-            "server_url": "https://api.day.app"
+            "server_url": "https://api.day.app",
+            "batch_size": 100  # 可选，单个请求推送的设备数，1 表示不合并
         }
         """
         super().__init__(config)
         self.server_url = config.get("server_url", "https://api.day.app")
+        self.batch_size = config.get("batch_size", get_setting("BARK_BATCH_SIZE"))
     
     def _send_implementation(self, payload):
         """
@@ -37,6 +41,85 @@ class BarkService(BaseNotificationService):
         Returns:
             dict: 发送结果
         """
+        try:
+            response = self._http_post(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"Bark发送失败: {str(e)}", e)
+    
+    async def _send_implementation_async(self, payload):
+        """Bark 的异步发送实现"""
+        try:
+            response = await self._http_post_async(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"Bark发送失败: {str(e)}", e)
+    
+    def _batch_jobs(self, targets, title, content, params):
+        """
+        按 batch_size 合并设备
+        
+        使用 Bark 的 device_keys 参数，每 batch_size 个设备合并为一个请求，
+        各请求之间按 max_concurrency 并发，返回结果仍然按设备区分。
+        batch_size 为 1 时每个设备单独推送。
+        """
+        if self.batch_size <= 1:
+            return super()._batch_jobs(targets, title, content, params)
+        
+        chunks = [
+            targets[start:start + self.batch_size]
+            for start in range(0, len(targets), self.batch_size)
+        ]
+        return [(chunk, partial(self._send_chunk, chunk, title, content, params)) for chunk in chunks]
+    
+    def _send_chunk(self, device_keys, title, content, params):
+        """用一个请求推送到多个设备，返回每个设备的结果"""
+        request = self._build_request(self._build_payload(device_keys[0], title, content, params))
+        request["json"].pop("device_key")
+        request["json"]["device_keys"] = list(device_keys)
+        
+        def post():
+            try:
+                return self._parse_response(self._http_post(**request))
+            except HTTP_ERRORS as e:
+                logger.error(f"BarkService 批量推送失败: {str(e)}")
+                raise to_send_error(f"Bark发送失败: {str(e)}", e)
+        
+        result = self._observe(post)
+        
+        logger.info(f"BarkService 批量推送完成: {len(device_keys)} 个设备")
+        
+        # Bark 服务端在 data 中逐个返回设备的推送结果
+        items = result["response"].get("data") if isinstance(result["response"], dict) else None
+        per_device = {}
+        if isinstance(items, list):
+            per_device = {
+                item.get("device_key"): item for item in items if isinstance(item, dict)
+            }
+        
+        outcomes = []
+        for device_key in device_keys:
+            item = per_device.get(device_key)
+            if item is None or item.get("code", 200) == 200:
+                outcomes.append({
+                    "target": device_key,
+                    "success": True,
+                    "response": {**result, "response": item} if item is not None else result,
+                })
+            else:
+                code = item.get("code")
+                outcomes.append({
+                    "target": device_key,
+                    "success": False,
+                    "error": f"Bark发送失败: {item.get('message', code)}",
+                    "retryable": isinstance(code, int) and (code == 429 or code >= 500),
+                })
+        return outcomes
+    
+    def _build_request(self, payload):
+        """构建 Bark 推送请求参数"""
         url = f"{self.server_url}/push"
         
         # 构建 Bark API payload
@@ -66,20 +149,18 @@ class BarkService(BaseNotificationService):
             if param_key in payload:
                 bark_payload[bark_key] = payload[param_key]
         
-        try:
-            response = requests.post(
-                url, 
-                json=bark_payload,
-                headers={'Content-Type': 'application/json; charset=utf-8'},
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            return {
-                "success": True,
-                "status_code": response.status_code,
-                "response": response.json() if response.text else {}
-            }
+        return {
+            "url": url,
+            "json": bark_payload,
+            "headers": {'Content-Type': 'application/json; charset=utf-8'},
+        }
+    
+    def _parse_response(self, response):
+        """解析 Bark 响应"""
+        response.raise_for_status()
         
-        except requests.RequestException as e:
-            raise Exception(f"Bark发送失败: {str(e)}")
+        return {
+            "success": True,
+            "status_code": response.status_code,
+            "response": response.json() if response.text else {}
+        }
@@ -1,6 +1,13 @@
+import asyncio
+import json
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chewy_notification.conf import get_setting
+from .http_pool import HTTPX_AVAILABLE, get_async_client, get_session
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +23,47 @@ class BaseNotificationService(ABC):
             config: 渠道配置
         """
         self.config = config
+        self.timeout = config.get("timeout", get_setting("HTTP_TIMEOUT"))
+        self.max_concurrency = config.get("max_concurrency", get_setting("MAX_CONCURRENCY"))
+        # 渠道限流器（TokenBucket）和熔断器（CircuitBreaker），由 get_service_for_channel 设置
+        self.rate_limiter = None
+        self.circuit_breaker = None
+    
+    def _http_post(self, url: str, **kwargs):
+        """
+        通过共享连接池发送 POST 请求
+        
+        Args:
+            url: 请求地址
+            **kwargs: 透传给 requests 的参数
+            
+        Returns:
+            requests.Response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return get_session(url).post(url, **kwargs)
+    
+    async def _http_post_async(self, url: str, **kwargs):
+        """
+        异步发送 POST 请求
+        
+        已安装 httpx 时使用事件循环共享的 AsyncClient，否则在线程中执行同步请求。
+        参数与 _http_post 相同，返回的响应对象同样提供 status_code、text、
+        json() 和 raise_for_status()。
+        """
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self._http_post, url, **kwargs)
+        
+        kwargs.setdefault("timeout", self.timeout)
+        if isinstance(kwargs.get("data"), bytes):
+            kwargs["content"] = kwargs.pop("data")
+        if "headers" in kwargs:
+            # requests 按 latin-1 编码请求头，httpx 默认只接受 ASCII，这里保持一致
+            kwargs["headers"] = {
+                key: value.encode("latin-1") if isinstance(value, str) else value
+                for key, value in kwargs["headers"].items()
+            }
+        return await get_async_client().post(url, **kwargs)
     
     @abstractmethod
     def _send_implementation(self, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -30,6 +78,20 @@ class BaseNotificationService(ABC):
         """
         pass
     
+    async def _send_implementation_async(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        异步发送实现，子类可覆盖为原生异步实现
+        
+        默认在线程中执行同步的 _send_implementation。
+        
+        Args:
+            payload: 已处理的参数字典
+            
+        Returns:
+            dict: 发送结果
+        """
+        return await asyncio.to_thread(self._send_implementation, payload)
+    
     def send(
         self,
         target: str,
@@ -74,41 +136,298 @@ class BaseNotificationService(ABC):
         Returns:
             dict: 发送结果
         """
-        # 构建参数字典
-        params = {
-            "target": target,
-            "title": title,
-            "content": content,
-        }
+        payload = self._build_payload(
+            target,
+            title,
+            content,
+            {
+                "subtitle": subtitle,
+                "level": level,
+                "badge": badge,
+                "sound": sound,
+                "icon": icon,
+                "group": group,
+                "url": url,
+                "copy": copy,
+                "auto_copy": auto_copy,
+                "call": call,
+                "is_archive": is_archive,
+                **kwargs,
+            },
+        )
         
-        # 添加可选参数（只添加非 None 的）
-        optional_params = {
-            "subtitle": subtitle,
-            "level": level,
-            "badge": badge,
-            "sound": sound,
-            "icon": icon,
-            "group": group,
-            "url": url,
-            "copy": copy,
-            "auto_copy": auto_copy,
-            "call": call,
-            "is_archive": is_archive,
-        }
+        probe = self._admit()
+        try:
+            return self._deliver(payload)
+        finally:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release_probe(probe)
+                self.circuit_breaker.flush()
+    
+    def _deliver(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        执行一次发送（不经过限流）
         
-        for key, value in optional_params.items():
-            if value is not None:
-                params[key] = value
+        Args:
+            payload: 已处理的参数字典
+            
+        Returns:
+            dict: 发送结果
+        """
+        try:
+            # 调用子类的具体实现
+            result = self._observe(self._send_implementation, payload)
+            logger.info(f"{self.__class__.__name__} 通知发送成功")
+            return result
+        
+        except Exception as e:
+            logger.error(f"{self.__class__.__name__} 通知发送失败: {str(e)}")
+            raise
+    
+    def _observe(self, func: Callable, *args, **kwargs):
+        """
+        执行一次请求，并把结果和耗时报告给熔断器
         
-        # 添加额外的 kwargs
-        params.update(kwargs)
+        只有暂时性失败（超时、5xx 等）计为失败，4xx 等说明服务商仍在正常响应。
+        """
+        if self.circuit_breaker is None:
+            return func(*args, **kwargs)
         
+        started = time.monotonic()
         try:
-            # 调用子类的具体实现
-            result = self._send_implementation(params)
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.circuit_breaker.record(not getattr(e, "retryable", False), time.monotonic() - started)
+            raise
+        self.circuit_breaker.record(True, time.monotonic() - started)
+        return result
+    
+    def _admit(self):
+        """
+        发送前按渠道限流获取发送令牌并检查渠道熔断状态
+        
+        先获取令牌再检查熔断，避免领取了半开探测资格后因限流而没有发出探测请求。
+        
+        Returns:
+            object: 熔断器的探测令牌（不是探测请求时为 None），发送结束后需要用 release_probe() 归还
+        
+        Raises:
+            CircuitOpenError: 渠道处于熔断中
+            RateLimitExceeded: 等待时间超过 RATE_LIMIT_MAX_WAIT
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.circuit_breaker is not None:
+            return self.circuit_breaker.allow()
+        return None
+    
+    def send_batch(
+        self,
+        targets: List[str],
+        title: str,
+        content: str,
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        **params
+    ) -> List[Dict[str, Any]]:
+        """
+        将同一条通知发送到多个目标
+        
+        默认按目标并发调用 send()，子类可通过 _batch_jobs 使用渠道自身的批量能力。
+        单个目标失败不会影响其它目标。
+        
+        Args:
+            targets: 目标列表
+            title: 通知标题
+            content: 通知内容
+            concurrency: 最大并发数，默认使用渠道配置 max_concurrency
+            deadline: 整批发送的时间上限（秒），超时未完成的目标记为失败
+            **params: 与 send() 相同的可选参数
+            
+        Returns:
+            list: 与 targets 顺序一致的结果列表，每项为
+                {"target": ..., "success": True, "response": {...}} 或
+                {"target": ..., "success": False, "error": "..."}
+        """
+        return self.send_many(
+            [
+                {"target": target, "title": title, "content": content, "params": params}
+                for target in targets
+            ],
+            concurrency=concurrency,
+            deadline=deadline,
+        )
+    
+    def send_many(
+        self,
+        messages: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量发送多条（内容可以不同的）通知
+        
+        标题、内容和参数相同的消息会合并交给 _batch_jobs，所有任务在同一个
+        受 concurrency 和 deadline 约束的调度中执行。
+        
+        Args:
+            messages: 消息列表，每项为
+                {"target": ..., "title": ..., "content": ..., "params": {...}}
+            concurrency: 最大并发数，默认使用渠道配置 max_concurrency
+            deadline: 整批发送的时间上限（秒）
+            
+        Returns:
+            list: 与 messages 顺序一致的结果列表，格式同 send_batch()
+        """
+        from .dispatch import run_batch_jobs
+        
+        groups = {}
+        for index, message in enumerate(messages):
+            params = message.get("params") or {}
+            key = (message["title"], message["content"], json.dumps(params, sort_keys=True, default=str))
+            group = groups.setdefault(key, {"params": params, "indexes": []})
+            group["indexes"].append(index)
+        
+        jobs = []
+        order = []
+        for (title, content, _), group in groups.items():
+            targets = [messages[index]["target"] for index in group["indexes"]]
+            jobs.extend(self._batch_jobs(targets, title, content, group["params"]))
+            order.extend(group["indexes"])
+        
+        outcomes = [None] * len(messages)
+        flattened = run_batch_jobs(
+            jobs,
+            concurrency=concurrency or self.max_concurrency,
+            deadline=deadline,
+            limiter=self.rate_limiter,
+            breaker=self.circuit_breaker,
+        )
+        if self.circuit_breaker is not None:
+            # 熔断器在发送线程中记录的状态变化由调用线程写入共享状态
+            self.circuit_breaker.flush()
+        for index, outcome in zip(order, flattened):
+            outcomes[index] = outcome
+        return outcomes
+    
+    def _batch_jobs(
+        self,
+        targets: List[str],
+        title: str,
+        content: str,
+        params: Dict[str, Any]
+    ) -> List[Tuple[List[str], Callable]]:
+        """
+        将同一条通知拆分为可并发执行的发送任务
+        
+        默认每个目标一个任务。子类可覆盖为按渠道批量接口合并目标。
+        熔断检查和限流由调度器在提交每个任务前处理，任务内部不应再次检查，
+        但实际请求应通过 _observe 执行以便熔断器统计。
+        
+        Returns:
+            list: (targets, func) 列表，func() 返回与 targets 顺序一致的结果列表
+        """
+        def send_one(target):
+            result = self._deliver(self._build_payload(target, title, content, params))
+            return [{"target": target, "success": True, "response": result}]
+        
+        return [([target], partial(send_one, target)) for target in targets]
+    
+    async def send_async(
+        self,
+        target: str,
+        title: str,
+        content: str,
+        **params
+    ) -> Dict[str, Any]:
+        """
+        异步发送通知，参数与 send() 相同
+        
+        Returns:
+            dict: 发送结果
+        """
+        payload = self._build_payload(target, title, content, params)
+        
+        probe = None
+        if self.rate_limiter is not None or self.circuit_breaker is not None:
+            probe = await asyncio.to_thread(self._admit)
+        
+        started = time.monotonic()
+        try:
+            result = await self._send_implementation_async(payload)
             logger.info(f"{self.__class__.__name__} 通知发送成功")
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(True, time.monotonic() - started)
             return result
         
         except Exception as e:
             logger.error(f"{self.__class__.__name__} 通知发送失败: {str(e)}")
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(not getattr(e, "retryable", False), time.monotonic() - started)
             raise
+        
+        finally:
+            if self.circuit_breaker is not None:
+                # 任务被取消时探测结果不会被记录，归还探测资格
+                self.circuit_breaker.release_probe(probe)
+                # 状态变化写入共享状态（数据库访问放到线程中执行）
+                await asyncio.to_thread(self.circuit_breaker.flush)
+    
+    async def send_batch_async(
+        self,
+        targets: List[str],
+        title: str,
+        content: str,
+        concurrency: Optional[int] = None,
+        **params
+    ) -> List[Dict[str, Any]]:
+        """
+        异步并发地将同一条通知发送到多个目标
+        
+        Args:
+            targets: 目标列表
+            title: 通知标题
+            content: 通知内容
+            concurrency: 最大并发数，默认使用 ASYNC_CONCURRENCY 配置
+            **params: 与 send() 相同的可选参数
+            
+        Returns:
+            list: 与 targets 顺序一致的结果列表，格式同 send_batch()
+        """
+        from .dispatch import send_many_async
+        
+        return await send_many_async(
+            [(self, target, title, content, params) for target in targets],
+            concurrency=concurrency,
+        )
+    
+    def _build_payload(
+        self,
+        target: str,
+        title: str,
+        content: str,
+        options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        构建传给 _send_implementation 的参数字典（忽略值为 None 的可选参数）
+        
+        Args:
+            target: 目标
+            title: 通知标题
+            content: 通知内容
+            options: 可选参数
+            
+        Returns:
+            dict: 参数字典
+        """
+        payload = {
+            "target": target,
+            "title": title,
+            "content": content,
+        }
+        
+        for key, value in options.items():
+            if value is not None:
+                payload[key] = value
+        
+        return payload
@@ -0,0 +1,203 @@
+"""
+渠道熔断
+
+服务商故障（超时、5xx）时每次发送都要等满超时时间，同步接口会占满所有 worker。
+熔断器按渠道统计最近一段时间内的失败率和慢请求比例，超过阈值后熔断（open），
+熔断期间发送立即被拒绝并延后；熔断时间结束后只放行一个探测请求（half-open），
+探测成功则恢复（closed），失败则继续熔断。探测请求没有发出（限流、取消等）时由调用方归还探测资格，
+超过 CIRCUIT_OPEN_SECONDS 仍没有结果的探测视为丢失，重新争取探测资格。
+
+熔断状态保存在 NotificationChannelState 表中，所有进程共享；
+统计在进程内进行，状态变化只在调用线程（allow / flush）中写入数据库。
+"""
+import threading
+import time
+from collections import deque
+
+from chewy_notification.conf import get_setting
+from .exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 归还未使用的探测资格后，等待该秒数再重新探测
+PROBE_RELEASE_DELAY = 1.0
+
+
+class CircuitBreaker:
+    """跨进程共享的渠道熔断器"""
+    
+    def __init__(self, channel_id: int):
+        """
+        Args:
+            channel_id: 渠道ID
+        """
+        self.channel_id = channel_id
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._state = CLOSED
+        self._open_until = 0.0
+        # 当前进程持有的探测令牌，None 表示没有进行中的探测
+        self._probing = None
+        self._checked_at = 0.0
+        self._pending = None
+    
+    @property
+    def state(self) -> str:
+        """当前进程看到的熔断状态"""
+        return self._state
+    
+    def allow(self):
+        """
+        发送前检查熔断状态
+        
+        Returns:
+            object: 放行的是半开探测请求时返回探测令牌，否则返回 None；
+                探测请求没有通过 record() 记录结果时，调用方需要用 release_probe() 归还
+        
+        Raises:
+            CircuitOpenError: 渠道处于熔断中，或半开状态下探测请求尚未返回
+        """
+        self.flush()
+        now = time.time()
+        
+        with self._lock:
+            if self._probing is not None and now >= self._open_until:
+                # 探测超过 CIRCUIT_OPEN_SECONDS 仍没有结果（例如发送线程卡住），放弃这次探测
+                self._probing = None
+                self._state = OPEN
+            if self._probing is None and now - self._checked_at >= get_setting("CIRCUIT_CHECK_INTERVAL"):
+                self._refresh(now)
+            
+            if self._state == CLOSED:
+                return None
+            if self._state == OPEN and now >= self._open_until and self._claim_probe(now):
+                # 由当前进程发出探测请求
+                self._state = HALF_OPEN
+                self._probing = object()
+                return self._probing
+            
+            raise CircuitOpenError(
+                f"渠道暂时不可用（熔断中），{max(0.0, self._open_until - now):.0f} 秒后重试",
+                retry_after=max(0.0, self._open_until - now),
+            )
+    
+    def record(self, success: bool, elapsed: float):
+        """
+        记录一次请求的结果（只修改进程内状态，可在任意线程调用）
+        
+        Args:
+            success: 服务商是否正常响应（永久性失败如 4xx 也算正常响应）
+            elapsed: 请求耗时（秒）
+        """
+        bad = not success or elapsed >= get_setting("CIRCUIT_SLOW_CALL")
+        now = time.time()
+        
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = None
+                if bad:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            if self._state == OPEN:
+                return
+            
+            window = get_setting("CIRCUIT_WINDOW")
+            self._calls.append((now, bad))
+            while self._calls and self._calls[0][0] < now - window:
+                self._calls.popleft()
+            
+            total = len(self._calls)
+            failures = sum(1 for _, failed in self._calls if failed)
+            if total >= get_setting("CIRCUIT_MIN_REQUESTS") and failures / total >= get_setting("CIRCUIT_ERROR_RATE"):
+                self._open(now)
+    
+    def release_probe(self, probe):
+        """
+        归还没有发出（或没有记录结果）的探测请求
+        
+        探测资格在 PROBE_RELEASE_DELAY 秒后重新开放；探测已经记录结果或已被放弃时不做任何事。
+        
+        Args:
+            probe: allow() 返回的探测令牌
+        """
+        if probe is None:
+            return
+        with self._lock:
+            if self._probing is not probe:
+                return
+            self._probing = None
+            self._state = OPEN
+            self._open_until = time.time() + PROBE_RELEASE_DELAY
+            self._pending = (OPEN, self._open_until)
+    
+    def flush(self):
+        """将进程内的状态变化写入共享状态"""
+        from chewy_notification.models import NotificationChannelState
+        
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            NotificationChannelState.objects.update_or_create(
+                channel_id=self.channel_id,
+                defaults={"circuit_state": pending[0], "circuit_open_until": pending[1]},
+            )
+    
+    def _open(self, now: float):
+        """熔断"""
+        self._state = OPEN
+        self._open_until = now + get_setting("CIRCUIT_OPEN_SECONDS")
+        self._calls.clear()
+        self._pending = (OPEN, self._open_until)
+    
+    def _close(self):
+        """恢复"""
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._calls.clear()
+        self._pending = (CLOSED, 0.0)
+    
+    def _refresh(self, now: float):
+        """读取其它进程写入的共享状态"""
+        from chewy_notification.models import NotificationChannelState
+        
+        self._checked_at = now
+        shared = (
+            NotificationChannelState.objects.filter(channel_id=self.channel_id)
+            .values_list("circuit_state", "circuit_open_until")
+            .first()
+        )
+        if shared is None or shared[0] == CLOSED:
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._calls.clear()
+            return
+        
+        # 其它进程的半开探测尚未结束时同样视为熔断
+        self._state = OPEN
+        self._open_until = shared[1]
+    
+    def _claim_probe(self, now: float) -> bool:
+        """
+        争取半开探测的资格
+        
+        通过条件 UPDATE 把熔断截止时间向后推，只有一个进程能成功，
+        其它进程在探测结果出来之前继续拒绝发送。
+        """
+        from chewy_notification.models import NotificationChannelState
+        
+        open_until = now + get_setting("CIRCUIT_OPEN_SECONDS")
+        claimed = NotificationChannelState.objects.filter(
+            channel_id=self.channel_id,
+            circuit_state__in=[OPEN, HALF_OPEN],
+            circuit_open_until=self._open_until,
+        ).update(circuit_state=HALF_OPEN, circuit_open_until=open_until)
+        
+        self._open_until = open_until
+        if not claimed:
+            # 已被其它进程领取，重新读取共享状态
+            self._checked_at = 0.0
+        return bool(claimed)
@@ -0,0 +1,196 @@
+"""
+批量发送调度
+
+- run_batch_jobs: 在线程池中并发执行发送任务，限制并发数和总耗时
+- send_many_async: 在一个事件循环中并发执行大量发送，并限制同时进行的请求数
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from chewy_notification.conf import get_setting
+from .exceptions import NotificationDeferred
+
+logger = logging.getLogger(__name__)
+
+
+def failed_outcomes(targets: Sequence[str], error: str, retryable: bool = False) -> List[Dict[str, Any]]:
+    """为一组目标生成失败结果"""
+    return [
+        {"target": target, "success": False, "error": error, "retryable": retryable}
+        for target in targets
+    ]
+
+
+def error_outcomes(targets: Sequence[str], error: Exception) -> List[Dict[str, Any]]:
+    """根据异常为一组目标生成失败结果，保留是否可重试及服务端建议的重试时间"""
+    outcomes = failed_outcomes(targets, str(error), retryable=getattr(error, "retryable", False))
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        for outcome in outcomes:
+            outcome["retry_after"] = retry_after
+    return outcomes
+
+
+def deferred_outcomes(targets: Sequence[str], error: NotificationDeferred) -> List[Dict[str, Any]]:
+    """为一组目标生成延后发送的结果"""
+    return [
+        {
+            "target": target,
+            "success": False,
+            "deferred": True,
+            "retry_after": error.retry_after,
+            "error": str(error),
+        }
+        for target in targets
+    ]
+
+
+def _run_job(targets: Sequence[str], func: Callable) -> List[Dict[str, Any]]:
+    """执行单个任务，异常转换为该任务所有目标的失败结果"""
+    try:
+        return func()
+    except NotificationDeferred as e:
+        return deferred_outcomes(targets, e)
+    except Exception as e:
+        return error_outcomes(targets, e)
+
+
+def run_batch_jobs(
+    jobs: Sequence[Tuple[Sequence[str], Callable]],
+    concurrency: int = 1,
+    deadline: Optional[float] = None,
+    limiter=None,
+    breaker=None
+) -> List[Dict[str, Any]]:
+    """
+    并发执行一组发送任务
+    
+    每个任务负责若干目标（单目标发送为 1 个，渠道批量接口为多个），
+    返回这些目标的结果列表。
+    
+    每个任务提交前在调用线程中获取限流令牌并检查熔断状态；
+    渠道熔断或令牌等待时间超出上限后，剩余任务的目标都标记为延后发送（deferred）。
+    半开探测任务结束（或被取消）后没有记录结果时归还探测资格。
+    
+    Args:
+        jobs: (targets, func) 列表，func() 返回与 targets 对应的结果列表
+        concurrency: 同时执行的任务数上限
+        deadline: 总耗时上限（秒），到时尚未开始的任务被取消并记为可重试的超时；
+            已经在发送中的任务可能仍会送达，记为不可重试的失败，避免重试时重复发送
+        limiter: 可选的 TokenBucket
+        breaker: 可选的 CircuitBreaker
+    
+    Returns:
+        list: 按任务顺序展开的结果列表
+    """
+    expires_at = time.monotonic() + deadline if deadline is not None else None
+    deferred = None
+    
+    probes = [None] * len(jobs)
+    
+    def admit(index):
+        """获取令牌并检查熔断，返回 False 表示该任务需要延后"""
+        nonlocal deferred
+        if deferred is not None:
+            return False
+        try:
+            if limiter is not None:
+                max_wait = get_setting("RATE_LIMIT_MAX_WAIT")
+                if expires_at is not None:
+                    max_wait = max(0.0, min(max_wait, expires_at - time.monotonic()))
+                limiter.acquire(max_wait=max_wait)
+            if breaker is not None:
+                probes[index] = breaker.allow()
+        except NotificationDeferred as e:
+            deferred = e
+        return deferred is None
+    
+    if concurrency <= 1 and deadline is None:
+        outcomes = []
+        for index, (targets, func) in enumerate(jobs):
+            if admit(index):
+                outcomes.extend(_run_job(targets, func))
+                if breaker is not None:
+                    breaker.release_probe(probes[index])
+            else:
+                outcomes.extend(deferred_outcomes(targets, deferred))
+        return outcomes
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(jobs))))
+    futures = []
+    try:
+        for index, (targets, func) in enumerate(jobs):
+            futures.append(executor.submit(_run_job, targets, func) if admit(index) else None)
+        remaining = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+        _, not_done = wait([future for future in futures if future is not None], timeout=remaining)
+        # 未开始的任务直接取消；取消失败说明任务已经在发送中
+        for future in not_done:
+            future.cancel()
+    finally:
+        # 不等待超时的请求
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if not_done:
+        logger.warning(f"批量发送超时: {len(not_done)}/{len(futures)} 个任务未在 {deadline} 秒内完成")
+    
+    if breaker is not None:
+        # 已结束或被取消的探测任务没有记录结果时归还探测资格；仍在发送中的探测由其结果处理
+        for probe, future in zip(probes, futures):
+            if future is not None and future.done():
+                breaker.release_probe(probe)
+    
+    outcomes = []
+    for (targets, _), future in zip(jobs, futures):
+        if future is None:
+            outcomes.extend(deferred_outcomes(targets, deferred))
+        elif future in not_done and future.cancelled():
+            outcomes.extend(failed_outcomes(targets, f"发送超时（超过 {deadline} 秒）", retryable=True))
+        elif future in not_done:
+            # 请求已发出，服务商可能仍会送达，不能重试
+            outcomes.extend(failed_outcomes(
+                targets, f"发送超时（超过 {deadline} 秒），结果未知，不再重试", retryable=False
+            ))
+        else:
+            outcomes.extend(future.result())
+    return outcomes
+
+
+async def send_many_async(
+    jobs: Iterable[Tuple],
+    concurrency: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    并发执行多个异步发送
+    
+    Args:
+        jobs: (service, target, title, content[, params]) 元组的可迭代对象，
+            params 为传给 send_async() 的可选参数字典
+        concurrency: 最大并发数，默认使用 ASYNC_CONCURRENCY 配置
+    
+    Returns:
+        list: 与 jobs 顺序一致的结果列表，每项为
+            {"target": ..., "success": True, "response": {...}} 或
+            {"target": ..., "success": False, "error": "..."}
+    
+    Example:
+        >>> outcomes = await send_many_async(
+        ...     [(service, token, "标题", "内容") for token in tokens],
+        ...     concurrency=50,
+        ... )
+    """
+    semaphore = asyncio.Semaphore(concurrency or get_setting("ASYNC_CONCURRENCY"))
+    
+    async def run(service, target, title, content, params=None):
+        async with semaphore:
+            try:
+                result = await service.send_async(target, title, content, **(params or {}))
+                return {"target": target, "success": True, "response": result}
+            except NotificationDeferred as e:
+                return deferred_outcomes([target], e)[0]
+            except Exception as e:
+                return error_outcomes([target], e)[0]
+    
+    return list(await asyncio.gather(*(run(*job) for job in jobs)))
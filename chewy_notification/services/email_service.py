@@ -1,11 +1,47 @@
 from django.core.mail import EmailMessage
 from django.conf import settings
 import logging
+import smtplib
+import socket
+import time
 from .base_service import BaseNotificationService
+from .dispatch import deferred_outcomes
+from .exceptions import NotificationDeferred, NotificationSendError
+
+# 尝试导入 aiosmtplib（异步发送）
+try:
+    import aiosmtplib
+    AIOSMTPLIB_AVAILABLE = True
+except ImportError:
+    AIOSMTPLIB_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+def _is_transient_smtp_error(error):
+    """判断 SMTP 错误是否是暂时性的（连接问题、超时或 4xx 响应码）"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                          socket.timeout, ConnectionError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if AIOSMTPLIB_AVAILABLE and isinstance(error, aiosmtplib.SMTPException):
+        code = getattr(error, "code", None)
+        if code is None:
+            return isinstance(error, (aiosmtplib.SMTPConnectError, aiosmtplib.SMTPServerDisconnected,
+                                      aiosmtplib.SMTPTimeoutError))
+        return 400 <= code < 500
+    return False
+
+
+def _send_error(error):
+    """将 SMTP 异常转换为 NotificationSendError"""
+    return NotificationSendError(f"邮件发送失败: {str(error)}", retryable=_is_transient_smtp_error(error))
+
+
 class EmailService(BaseNotificationService):
     """邮件通知服务"""
     
@@ -23,43 +59,173 @@ class EmailService(BaseNotificationService):
         
         Args:
             payload: 参数字典
-            
+        
         Returns:
             dict: 发送结果
         """
-        to_email = payload["target"]
-        title = payload["title"]
-        content = payload["content"]
-        
-        # 如果有 subtitle，添加到内容中
-        if "subtitle" in payload:
-            content = f"{payload['subtitle']}\n\n{content}"
-        
-        # 如果有 URL，添加到内容末尾
-        if "url" in payload:
-            content = f"{content}\n\n🔗 {payload['url']}"
-        
         try:
             # 创建邮件
-            email = EmailMessage(
-                subject=title,
-                body=content,
-                from_email=self.config.get("from_email"),
-                to=[to_email],
-                connection=self._get_connection()
-            )
+            email = self._build_message(payload, connection=self._get_connection())
             
             # 发送
             email.send(fail_silently=False)
             
             return {
                 "success": True,
-                "to": to_email,
-                "subject": title
+                "to": payload["target"],
+                "subject": payload["title"]
             }
         
         except Exception as e:
-            raise Exception(f"邮件发送失败: {str(e)}")
+            raise _send_error(e)
+    
+    async def _send_implementation_async(self, payload):
+        """
+        邮件的异步发送实现
+        
+        已安装 aiosmtplib 时直接异步投递，否则在线程中执行同步发送。
+        """
+        if not AIOSMTPLIB_AVAILABLE:
+            return await super()._send_implementation_async(payload)
+        
+        try:
+            message = self._build_message(payload, connection=None)
+            await aiosmtplib.send(
+                message.message(),
+                sender=message.from_email,
+                recipients=message.recipients(),
+                hostname=self.config.get("host"),
+                port=self.config.get("port", 587),
+                username=self.config.get("username"),
+                password=self.config.get("password"),
+                start_tls=self.config.get("use_tls", True),
+                timeout=self.timeout,
+            )
+            
+            return {
+                "success": True,
+                "to": payload["target"],
+                "subject": payload["title"]
+            }
+        
+        except Exception as e:
+            raise _send_error(e)
+    
+    def send_many(self, messages, concurrency=None, deadline=None):
+        """
+        批量发送邮件
+        
+        整批邮件共用一个 SMTP 会话（只进行一次连接、STARTTLS 和登录），
+        逐封通过 send_messages 投递以获得每个收件人的结果。
+        服务器中途断开连接时会重新连接并重试当前邮件一次。
+        同一会话只能串行投递，concurrency 参数不生效。
+        渠道熔断或限流超出等待上限后，剩余收件人标记为延后发送。
+        
+        Args:
+            messages: 消息列表，格式同 BaseNotificationService.send_many()
+            concurrency: 忽略
+            deadline: 整批发送的时间上限（秒），超时后剩余收件人记为失败
+        
+        Returns:
+            list: 与 messages 顺序一致的结果列表
+        """
+        connection = self._get_connection()
+        outcomes = []
+        expires_at = time.monotonic() + deadline if deadline is not None else None
+        deferred = None
+        
+        try:
+            for message in messages:
+                target = message["target"]
+                if expires_at is not None and time.monotonic() > expires_at:
+                    outcomes.append({
+                        "target": target,
+                        "success": False,
+                        "error": f"发送超时（超过 {deadline} 秒）",
+                        "retryable": True,
+                    })
+                    continue
+                
+                probe = None
+                if deferred is None:
+                    try:
+                        probe = self._admit()
+                    except NotificationDeferred as e:
+                        deferred = e
+                if deferred is not None:
+                    outcomes.extend(deferred_outcomes([target], deferred))
+                    continue
+                
+                payload = self._build_payload(
+                    target, message["title"], message["content"], message.get("params") or {}
+                )
+                try:
+                    self._observe(self._deliver_in_session, connection, self._build_message(payload, connection))
+                    outcomes.append({
+                        "target": target,
+                        "success": True,
+                        "response": {"success": True, "to": target, "subject": payload["title"]},
+                    })
+                except NotificationSendError as e:
+                    logger.error(f"邮件发送到 {target} 失败: {str(e)}")
+                    outcomes.append({
+                        "target": target,
+                        "success": False,
+                        "error": str(e),
+                        "retryable": e.retryable,
+                    })
+                finally:
+                    if probe is not None:
+                        self.circuit_breaker.release_probe(probe)
+        finally:
+            connection.close()
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.flush()
+        
+        succeeded = sum(1 for outcome in outcomes if outcome["success"])
+        logger.info(f"EmailService 批量发送完成: 成功 {succeeded}/{len(outcomes)}")
+        return outcomes
+    
+    def _deliver_in_session(self, connection, message):
+        """在已有会话中发送一封邮件，异常转换为 NotificationSendError"""
+        try:
+            self._send_in_session(connection, message)
+        except Exception as e:
+            raise _send_error(e)
+    
+    def _send_in_session(self, connection, message):
+        """在已有会话中发送一封邮件，会话被服务器断开时重连一次"""
+        if connection.connection is None:
+            # 显式打开会话：send_messages 遇到未打开的连接会自行连接并在发送后关闭，
+            # 导致每封邮件都重新连接、STARTTLS 和登录
+            connection.open()
+        try:
+            connection.send_messages([message])
+        except smtplib.SMTPServerDisconnected:
+            logger.warning("SMTP 连接已断开，正在重新连接")
+            connection.close()
+            connection.open()
+            connection.send_messages([message])
+    
+    def _build_message(self, payload, connection):
+        """根据参数字典构建邮件"""
+        content = payload["content"]
+        
+        # 如果有 subtitle，添加到内容中
+        if "subtitle" in payload:
+            content = f"{payload['subtitle']}\n\n{content}"
+        
+        # 如果有 URL，添加到内容末尾
+        if "url" in payload:
+            content = f"{content}\n\n🔗 {payload['url']}"
+        
+        return EmailMessage(
+            subject=payload["title"],
+            body=content,
+            from_email=self.config.get("from_email"),
+            to=[payload["target"]],
+            connection=connection
+        )
     
     def _get_connection(self):
         """获取邮件连接"""
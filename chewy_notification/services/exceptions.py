@@ -0,0 +1,39 @@
+"""通知服务异常"""
+from typing import Optional
+
+
+class NotificationSendError(Exception):
+    """
+    通知发送失败
+    
+    retryable 表示失败是否是暂时性的（超时、连接失败、429、5xx 等），
+    暂时性失败的记录会按退避策略重试，其它失败直接记为发送失败。
+    """
+    
+    def __init__(
+        self,
+        message: str,
+        retryable: bool = False,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class NotificationDeferred(Exception):
+    """通知暂时不能发送，应在 retry_after 秒后重新尝试（不计为发送失败）"""
+    
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(NotificationDeferred):
+    """渠道发送速率超出限制"""
+
+
+class CircuitOpenError(NotificationDeferred):
+    """渠道处于熔断状态，暂停发送"""
@@ -1,6 +1,7 @@
-import requests
 import logging
 from .base_service import BaseNotificationService
+from .exceptions import NotificationSendError
+from .http_pool import HTTP_ERRORS, to_send_error
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,24 @@ class FeishuService(BaseNotificationService):
         Returns:
             dict: 发送结果
         """
+        try:
+            response = self._http_post(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"飞书发送失败: {str(e)}", e)
+    
+    async def _send_implementation_async(self, payload):
+        """飞书的异步发送实现"""
+        try:
+            response = await self._http_post_async(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"飞书发送失败: {str(e)}", e)
+    
+    def _build_request(self, payload):
+        """构建飞书机器人请求参数"""
         url = payload.get("target") or self.webhook_url
         
         if not url:
@@ -73,19 +92,22 @@ class FeishuService(BaseNotificationService):
             }
         }
         
-        try:
-            response = requests.post(url, json=feishu_payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if result.get("code") == 0:
-                return {
-                    "success": True,
-                    "response": result
-                }
-            else:
-                raise Exception(f"飞书返回错误: {result.get('msg')}")
+        return {"url": url, "json": feishu_payload}
+    
+    def _parse_response(self, response):
+        """解析飞书响应"""
+        response.raise_for_status()
+        
+        result = response.json()
         
-        except requests.RequestException as e:
-            raise Exception(f"飞书发送失败: {str(e)}")
+        if result.get("code") == 0:
+            return {
+                "success": True,
+                "response": result
+            }
+        else:
+            # 9499: 请求过于频繁，稍后可重试
+            raise NotificationSendError(
+                f"飞书返回错误: {result.get('msg')}",
+                retryable=result.get("code") == 9499,
+            )
@@ -0,0 +1,189 @@
+"""
+HTTP 连接池
+
+按服务器地址（scheme + host）在进程内共享 ``requests.Session``，
+同一服务器的多次推送复用已建立的 TCP/TLS 连接，避免每次发送都重新握手。
+
+异步发送使用 ``httpx.AsyncClient``（可选依赖），每个事件循环一个客户端。
+"""
+import asyncio
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from chewy_notification.conf import get_setting
+from .exceptions import NotificationSendError
+
+# 尝试导入 httpx（异步发送）
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# 同步与异步请求可能抛出的网络异常
+HTTP_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if HTTPX_AVAILABLE else ())
+
+# 可以重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+_sessions: Dict[str, Tuple[requests.Session, float]] = {}
+_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _pool_key(url: str) -> str:
+    """连接池的键：scheme://host[:port]"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _build_session() -> requests.Session:
+    """创建带连接池和重试策略的 Session"""
+    max_retries = get_setting("HTTP_MAX_RETRIES")
+    # 只重试建连失败：推送接口不是幂等的，读超时或 5xx 重发可能导致重复通知
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=0,
+        backoff_factor=get_setting("HTTP_RETRY_BACKOFF"),
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=get_setting("HTTP_POOL_CONNECTIONS"),
+        pool_maxsize=get_setting("HTTP_POOL_MAXSIZE"),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    获取目标服务器对应的共享 Session
+    
+    空闲超过 ``HTTP_POOL_KEEPALIVE`` 秒的 Session 会被关闭并重建，
+    避免复用已被服务端断开的连接。
+    
+    Args:
+        url: 请求地址
+    
+    Returns:
+        requests.Session
+    """
+    key = _pool_key(url)
+    keepalive = get_setting("HTTP_POOL_KEEPALIVE")
+    now = time.monotonic()
+    
+    with _lock:
+        entry = _sessions.get(key)
+        if entry is not None:
+            session, last_used = entry
+            if keepalive and now - last_used > keepalive:
+                session.close()
+                entry = None
+        if entry is None:
+            session = _build_session()
+        _sessions[key] = (session, now)
+        return session
+
+
+def close_sessions():
+    """关闭并清空所有共享 Session（用于测试或进程退出）"""
+    with _lock:
+        for session, _ in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+
+def get_async_client():
+    """
+    获取当前事件循环共享的 httpx.AsyncClient
+    
+    Returns:
+        httpx.AsyncClient
+    
+    Raises:
+        RuntimeError: 未安装 httpx
+    """
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("异步 HTTP 发送需要安装 httpx")
+    
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(
+            max_keepalive_connections=get_setting("HTTP_POOL_MAXSIZE"),
+            keepalive_expiry=get_setting("HTTP_POOL_KEEPALIVE"),
+        )
+        # 与同步连接池一致：只重试建连失败
+        transport = httpx.AsyncHTTPTransport(
+            limits=limits,
+            retries=get_setting("HTTP_MAX_RETRIES"),
+        )
+        client = httpx.AsyncClient(transport=transport)
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """关闭当前事件循环的 httpx.AsyncClient"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def to_send_error(message: str, exc: Exception) -> NotificationSendError:
+    """
+    将 requests / httpx 的异常转换为 NotificationSendError 并判断能否重试
+    
+    超时和连接失败、429 以及 5xx 响应视为暂时性失败，其余（如 4xx）视为永久失败。
+    
+    Args:
+        message: 错误信息
+        exc: 原始异常
+    
+    Returns:
+        NotificationSendError
+    """
+    response = getattr(exc, "response", None)
+    if response is not None:
+        status_code = response.status_code
+        return NotificationSendError(
+            message,
+            retryable=status_code in RETRYABLE_STATUS_CODES or status_code >= 500,
+            status_code=status_code,
+            retry_after=_parse_retry_after(response.headers.get("Retry-After")),
+        )
+    
+    transient = (requests.Timeout, requests.ConnectionError)
+    if HTTPX_AVAILABLE:
+        transient += (httpx.TransportError,)
+    return NotificationSendError(message, retryable=isinstance(exc, transient))
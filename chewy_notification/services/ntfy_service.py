@@ -1,6 +1,6 @@
-import requests
 import logging
 from .base_service import BaseNotificationService
+from .http_pool import HTTP_ERRORS, to_send_error
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,24 @@ class NtfyService(BaseNotificationService):
         Returns:
             dict: 发送结果
         """
+        try:
+            response = self._http_post(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"Ntfy发送失败: {str(e)}", e)
+    
+    async def _send_implementation_async(self, payload):
+        """Ntfy 的异步发送实现"""
+        try:
+            response = await self._http_post_async(**self._build_request(payload))
+            return self._parse_response(response)
+        
+        except HTTP_ERRORS as e:
+            raise to_send_error(f"Ntfy发送失败: {str(e)}", e)
+    
+    def _build_request(self, payload):
+        """构建 Ntfy 推送请求参数"""
         topic = payload["target"]
         url = f"{self.server_url}/{topic}"
         
@@ -64,20 +82,18 @@ class NtfyService(BaseNotificationService):
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
         
-        try:
-            response = requests.post(
-                url,
-                data=payload["content"].encode("utf-8"),
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            return {
-                "success": True,
-                "status_code": response.status_code,
-                "response": response.json() if response.text else {}
-            }
+        return {
+            "url": url,
+            "data": payload["content"].encode("utf-8"),
+            "headers": headers,
+        }
+    
+    def _parse_response(self, response):
+        """解析 Ntfy 响应"""
+        response.raise_for_status()
         
-        except requests.RequestException as e:
-            raise Exception(f"Ntfy发送失败: {str(e)}")
+        return {
+            "success": True,
+            "status_code": response.status_code,
+            "response": response.json() if response.text else {}
+        }
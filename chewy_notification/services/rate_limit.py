@@ -0,0 +1,91 @@
+"""
+渠道限流
+
+基于 GCRA（令牌桶的等价形式）的按渠道限流。桶状态保存在
+NotificationChannelState 表中，由单条 UPDATE 原子推进，
+因此多个 gunicorn worker / Celery worker 共享同一个速率。
+
+为减少数据库往返，每次从共享桶中预留一小批令牌（租约）在进程内消耗，
+租约在 RATE_LIMIT_LEASE_WINDOW 秒后失效，避免积压的令牌造成突发。
+"""
+import math
+import threading
+import time
+from typing import Optional
+
+from chewy_notification.conf import get_setting
+from .exceptions import RateLimitExceeded
+
+
+class TokenBucket:
+    """跨进程共享的渠道令牌桶"""
+    
+    def __init__(self, channel_id: int, rate: float, burst: int = 1):
+        """
+        Args:
+            channel_id: 渠道ID
+            rate: 每秒允许的请求数
+            burst: 允许瞬时连续发送的请求数
+        """
+        self.channel_id = channel_id
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._leased = 0
+        self._lease_expires_at = 0.0
+    
+    def acquire(self, max_wait: Optional[float] = None):
+        """
+        获取一个令牌，必要时等待
+        
+        Args:
+            max_wait: 最长等待秒数，默认使用 RATE_LIMIT_MAX_WAIT 配置
+        
+        Raises:
+            RateLimitExceeded: 需要等待的时间超过 max_wait
+        """
+        if max_wait is None:
+            max_wait = get_setting("RATE_LIMIT_MAX_WAIT")
+        
+        with self._lock:
+            now = time.time()
+            if self._leased > 0 and now < self._lease_expires_at:
+                self._leased -= 1
+                return
+            
+            lease = max(1, min(self.burst, int(self.rate * get_setting("RATE_LIMIT_LEASE_WINDOW"))))
+            wait = self._reserve(lease, now, max_wait)
+            if wait > 0:
+                time.sleep(wait)
+            self._leased = lease - 1
+            self._lease_expires_at = time.time() + get_setting("RATE_LIMIT_LEASE_WINDOW")
+    
+    def _reserve(self, tokens: int, now: float, max_wait: float) -> float:
+        """
+        在共享桶中预留令牌
+        
+        Returns:
+            float: 需要等待的秒数
+        """
+        from django.db import transaction
+        from django.db.models import F, Value
+        from django.db.models.functions import Greatest
+        from chewy_notification.models import NotificationChannelState
+        
+        NotificationChannelState.objects.get_or_create(channel_id=self.channel_id)
+        
+        with transaction.atomic():
+            states = NotificationChannelState.objects.filter(channel_id=self.channel_id)
+            states.update(rate_tat=Greatest(F("rate_tat"), Value(now)) + tokens * self.interval)
+            tat = states.values_list("rate_tat", flat=True).get()
+            
+            wait = tat - now - self.burst * self.interval
+            if wait > max_wait:
+                # 抛出异常使事务回滚，不占用共享桶中的令牌
+                raise RateLimitExceeded(
+                    f"渠道发送速率超出限制，需等待 {math.ceil(wait)} 秒",
+                    retry_after=wait,
+                )
+        
+        return max(0.0, wait)
@@ -0,0 +1,124 @@
+"""
+发送统计
+
+每次写入发送结果时，按 (渠道, 小时, 状态) 累加发送次数和耗时，
+统计接口只读取预先汇总的行，不再对发送记录表做 COUNT。
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from chewy_notification.models import NotificationRecord, NotificationStat
+
+logger = logging.getLogger(__name__)
+
+# 计入统计的状态（延后发送的记录保持待发送状态，不计入）
+COUNTED_STATUSES = (
+    NotificationRecord.Status.SUCCESS,
+    NotificationRecord.Status.FAILED,
+    NotificationRecord.Status.RETRY,
+)
+
+
+def truncate_hour(value):
+    """取时间所在小时的开始时间"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def record_stats(records: List[NotificationRecord]):
+    """
+    按发送结果累加统计（每个渠道、小时、状态一条语句）
+    
+    统计写入失败不影响发送结果。
+    
+    Args:
+        records: 已调用 apply_outcome 并保存的记录
+    """
+    groups = defaultdict(lambda: [0, 0.0])
+    for record in records:
+        if record.channel_id is None or record.send_time is None or record.status not in COUNTED_STATUSES:
+            continue
+        group = groups[(record.channel_id, truncate_hour(record.send_time), record.status)]
+        group[0] += 1
+        group[1] += max(0.0, (record.send_time - record.create_time).total_seconds())
+    
+    for (channel_id, hour, status), (count, latency) in groups.items():
+        try:
+            with transaction.atomic():
+                _increment(channel_id, hour, status, count, latency)
+        except Exception as e:
+            logger.error(f"更新发送统计失败: {str(e)}")
+
+
+def _increment(channel_id: int, hour, status: str, count: int, latency: float):
+    """累加一行统计，不存在时创建"""
+    lookup = {"channel_id": channel_id, "hour": hour, "status": status}
+    increments = {
+        "count": F("count") + count,
+        "latency_sum": F("latency_sum") + latency,
+        "update_time": timezone.now(),
+    }
+    if NotificationStat.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            NotificationStat.objects.create(count=count, latency_sum=latency, **lookup)
+    except IntegrityError:
+        # 其它进程刚刚创建了这一行
+        NotificationStat.objects.filter(**lookup).update(**increments)
+
+
+def query_stats(
+    since=None,
+    until=None,
+    channel_id: Optional[int] = None,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    查询时间范围内的统计
+    
+    Args:
+        since: 开始时间，默认 24 小时前
+        until: 结束时间，默认当前时间
+        channel_id: 只统计该渠道
+        status: 只统计该状态
+    
+    Returns:
+        dict: totals 为按渠道和状态的合计，hours 为逐小时明细
+    """
+    until = until or timezone.now()
+    since = since or until - timedelta(hours=24)
+    queryset = NotificationStat.objects.filter(hour__gte=truncate_hour(since), hour__lte=until)
+    if channel_id is not None:
+        queryset = queryset.filter(channel_id=channel_id)
+    if status:
+        queryset = queryset.filter(status=status)
+    
+    hours = [
+        _with_average(row)
+        for row in queryset.order_by("hour", "channel_id", "status").values(
+            "channel_id", "hour", "status", "count", "latency_sum"
+        )
+    ]
+    totals = [
+        _with_average({
+            "channel_id": row["channel_id"],
+            "status": row["status"],
+            "count": row["total_count"],
+            "latency_sum": row["total_latency"],
+        })
+        for row in queryset.order_by().values("channel_id", "status").annotate(
+            total_count=Sum("count"), total_latency=Sum("latency_sum")
+        ).order_by("channel_id", "status")
+    ]
+    return {"since": since, "until": until, "totals": totals, "hours": hours}
+
+
+def _with_average(row: Dict[str, Any]) -> Dict[str, Any]:
+    """添加平均耗时（秒）"""
+    return {**row, "avg_latency": row["latency_sum"] / row["count"] if row["count"] else None}
@@ -0,0 +1,161 @@
+"""
+通知目标批量导入
+
+按流读取 CSV 或 NDJSON，逐行校验后按块 bulk_create(ignore_conflicts=True) 写入，
+(target_type, target_value) 已存在的目标计为重复。内存占用只与块大小有关，与文件大小无关。
+
+CSV 需要表头，列名为 target_value、target_type（可选）、alias（可选）；
+NDJSON 每行一个包含同名字段的 JSON 对象。
+"""
+import codecs
+import csv
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.db import transaction
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationTarget
+from chewy_notification.serializers.target import validate_target_value
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+
+# 汇总中最多保留的错误行数
+MAX_ERRORS = 100
+
+
+def detect_format(name: str = "", content_type: str = "") -> Optional[str]:
+    """根据文件名或内容类型判断格式，无法判断时返回 None"""
+    name = (name or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return CSV
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return NDJSON
+    return None
+
+
+def iter_rows(stream, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    逐行解析文件
+    
+    Args:
+        stream: 二进制文件流（逐块读取，不会整体载入内存）
+        file_format: csv 或 ndjson
+    
+    Yields:
+        (行号, 行数据)：行数据为 dict，解析失败时为错误信息字符串
+    """
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    if file_format == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, "不是有效的 JSON"
+            continue
+        yield line_number, row if isinstance(row, dict) else "每行必须是 JSON 对象"
+
+
+def clean_row(row: Any, default_type: Optional[str] = None) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    校验一行数据
+    
+    Returns:
+        (目标字段, 错误信息)
+    """
+    if isinstance(row, str):
+        return None, row
+    
+    target_value = str(row.get("target_value") or "").strip()
+    target_type = str(row.get("target_type") or default_type or "").strip()
+    alias = str(row.get("alias") or "").strip() or target_value
+    if not target_value:
+        return None, "缺少 target_value"
+    if target_type not in NotificationTarget.TargetType.values:
+        return None, f"无效的目标类型: {target_type}"
+    if len(target_value) > 500:
+        return None, "target_value 超过 500 个字符"
+    
+    error = validate_target_value(target_type, target_value)
+    if error:
+        return None, error
+    return {"alias": alias[:100], "target_type": target_type, "target_value": target_value}, None
+
+
+def import_targets(
+    rows: Iterable[Tuple[int, Any]],
+    default_type: Optional[str] = None,
+    batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    分块导入目标
+    
+    Args:
+        rows: iter_rows() 返回的 (行号, 行数据)
+        default_type: 行中没有 target_type 时使用的目标类型
+        batch_size: 每块写入的行数，默认使用 DB_BATCH_SIZE
+    
+    Returns:
+        dict: total / inserted / duplicates / invalid 计数，errors 为前 MAX_ERRORS 个错误行
+    """
+    batch_size = batch_size or get_setting("DB_BATCH_SIZE")
+    summary = {"total": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    chunk = {}
+    
+    for line_number, row in rows:
+        summary["total"] += 1
+        fields, error = clean_row(row, default_type)
+        if error:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < MAX_ERRORS:
+                summary["errors"].append({"line": line_number, "error": error})
+            continue
+        
+        key = (fields["target_type"], fields["target_value"])
+        if key in chunk:
+            # 文件内的重复行
+            summary["duplicates"] += 1
+            continue
+        chunk[key] = fields
+        if len(chunk) >= batch_size:
+            _write_chunk(chunk, summary)
+            chunk = {}
+    
+    if chunk:
+        _write_chunk(chunk, summary)
+    logger.info(
+        f"导入目标完成: 共 {summary['total']} 行，新增 {summary['inserted']}，"
+        f"重复 {summary['duplicates']}，无效 {summary['invalid']}"
+    )
+    return summary
+
+
+def _write_chunk(chunk: Dict[Tuple[str, str], Dict[str, str]], summary: Dict[str, Any]):
+    """写入一块目标，已存在的目标计为重复"""
+    existing = set()
+    for target_type in {target_type for target_type, _ in chunk}:
+        values = [value for chunk_type, value in chunk if chunk_type == target_type]
+        existing.update(
+            NotificationTarget.objects.filter(target_type=target_type, target_value__in=values)
+            .values_list("target_type", "target_value")
+        )
+    
+    new_targets = [NotificationTarget(**fields) for key, fields in chunk.items() if key not in existing]
+    # 每块一个短事务，与并发导入冲突的行由唯一约束忽略
+    with transaction.atomic():
+        NotificationTarget.objects.bulk_create(new_targets, ignore_conflicts=True)
+    summary["inserted"] += len(new_targets)
+    summary["duplicates"] += len(existing)
@@ -1,5 +1,9 @@
-from django.utils import timezone
+import heapq
+import itertools
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -9,11 +13,82 @@ try:
     CELERY_AVAILABLE = True
 except ImportError:
     CELERY_AVAILABLE = False
-    # 如果没有 Celery，创建一个装饰器占位符
+    # 如果没有 Celery，创建一个装饰器占位符：delay() 在进程内的后台线程池中执行任务
     def shared_task(func):
+        def delay(*args, **kwargs):
+            return get_background_runner().submit(func, args, kwargs)
+        
+        def apply_async(args=(), kwargs=None, countdown=None, **options):
+            return get_background_runner().submit(func, tuple(args), kwargs or {}, countdown)
+        
+        func.delay = delay
+        func.apply_async = apply_async
         return func
 
 
+class BackgroundRunner:
+    """
+    未使用 Celery 时在进程内执行任务的有界线程池
+    
+    任务在固定数量的工作线程中执行；延迟执行的任务由一个调度线程在到期后再提交，
+    等待期间不占用工作线程。进程退出时未执行的任务会丢失，记录保持待发送状态，
+    生产环境应使用 Celery 或数据库发送进程。
+    """
+    
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chewy-task")
+        self.delayed = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        threading.Thread(target=self._schedule_loop, name="chewy-task-scheduler", daemon=True).start()
+    
+    def submit(self, func, args, kwargs, countdown=None):
+        """提交任务，countdown 秒后执行"""
+        if not countdown:
+            return self.executor.submit(_run_in_thread, func, args, kwargs)
+        with self.condition:
+            heapq.heappush(self.delayed, (time.monotonic() + countdown, next(self.sequence), func, args, kwargs))
+            self.condition.notify()
+        return None
+    
+    def _schedule_loop(self):
+        """将到期的延迟任务提交到线程池"""
+        while True:
+            with self.condition:
+                while not self.delayed or self.delayed[0][0] > time.monotonic():
+                    timeout = self.delayed[0][0] - time.monotonic() if self.delayed else None
+                    self.condition.wait(timeout)
+                _, _, func, args, kwargs = heapq.heappop(self.delayed)
+            self.executor.submit(_run_in_thread, func, args, kwargs)
+
+
+_background_runner = None
+_background_runner_lock = threading.Lock()
+
+
+def get_background_runner() -> BackgroundRunner:
+    """进程内共享的后台线程池，线程数见 THREAD_BACKEND_WORKERS"""
+    global _background_runner
+    from chewy_notification.conf import get_setting
+    
+    with _background_runner_lock:
+        if _background_runner is None:
+            _background_runner = BackgroundRunner(get_setting("THREAD_BACKEND_WORKERS"))
+        return _background_runner
+
+
+def _run_in_thread(func, args, kwargs):
+    """在后台线程中执行任务，结束后关闭该线程的数据库连接"""
+    from django.db import connection
+    
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"后台任务 {func.__name__} 执行失败: {str(e)}")
+    finally:
+        connection.close()
+
+
 @shared_task
 def send_notification_task(record_id, context=None):
     """
@@ -23,29 +98,30 @@ def send_notification_task(record_id, context=None):
         record_id: 通知记录ID
         context: 模板变量上下文
     """
+    from chewy_notification.delivery import apply_outcome, resolve_message
     from chewy_notification.models import NotificationRecord
-    from chewy_notification.services import get_service_for_channel
-    
-    context = context or {}
+    from chewy_notification.services.dispatch import error_outcomes
+    from chewy_notification.services import get_service_for_channel, NotificationDeferred
+    from chewy_notification.stats import record_stats
     
     try:
         record = NotificationRecord.objects.select_related(
-            "template", "channel", "target"
+            "template", "message", "channel", "target"
         ).get(id=record_id)
         
-        # 渲染模板
-        title = _render_template(record.template.title, context)
-        content = _render_template(record.template.content, context)
+        # 未传入上下文时使用记录中保存的上下文
+        if context:
+            record.context = context
+        message = resolve_message(record)
         
         # 获取服务并发送
         service = get_service_for_channel(record.channel)
-        result = service.send(record.target.target_value, title, content)
+        result = service.send(message["target"], message["title"], message["content"], **message["params"])
         
         # 更新记录状态
-        record.status = NotificationRecord.Status.SUCCESS
-        record.response = result
-        record.send_time = timezone.now()
+        apply_outcome(record, {"success": True, "response": result})
         record.save()
+        record_stats([record])
         
         logger.info(f"通知发送成功: record_id={record_id}")
         return {"success": True, "record_id": record_id}
@@ -54,23 +130,167 @@ def send_notification_task(record_id, context=None):
         logger.error(f"通知记录不存在: record_id={record_id}")
         return {"success": False, "error": "记录不存在"}
     
+    except NotificationDeferred as e:
+        # 渠道限流或熔断：记录保持待发送状态，稍后重新入队
+        logger.info(f"通知发送被延后: record_id={record_id}, {e.retry_after:.1f} 秒后重试")
+        enqueue_records([record_id], countdown=e.retry_after)
+        return {"success": False, "deferred": True, "retry_after": e.retry_after}
+    
     except Exception as e:
         logger.error(f"通知发送失败: record_id={record_id}, error={str(e)}")
         
         try:
+            # 暂时性失败进入重试状态，其它失败记为发送失败
             record = NotificationRecord.objects.get(id=record_id)
-            record.status = NotificationRecord.Status.FAILED
-            record.error_message = str(e)
-            record.send_time = timezone.now()
+            apply_outcome(record, error_outcomes([None], e)[0])
             record.save()
+            record_stats([record])
         except Exception:
             pass
         
         return {"success": False, "error": str(e)}
 
 
-def _render_template(template_str, context):
-    """简单的模板变量替换"""
-    for key, value in context.items():
-        template_str = template_str.replace(f"{{{{{key}}}}}", str(value))
-    return template_str
+@shared_task
+def send_notification_batch_task(record_ids):
+    """
+    批量发送通知任务
+    
+    一次查询加载全部记录，按渠道分组并复用服务实例（及其连接）发送，
+    结果批量回写。模板记录使用记录中保存的上下文渲染。
+    被渠道限流或熔断延后的记录会在建议的等待时间后重新入队。
+    
+    Args:
+        record_ids: 通知记录ID列表
+    """
+    from chewy_notification.delivery import deliver_pending_records
+    
+    summary = deliver_pending_records(record_ids)
+    logger.info(f"批量发送完成: 成功 {summary['succeeded']}/{summary['total']}")
+    if summary["deferred"]:
+        logger.info(f"{len(summary['deferred'])} 条记录被延后，{summary['retry_after']:.1f} 秒后重新入队")
+        enqueue_records(summary["deferred"], countdown=summary["retry_after"])
+    return {"success": True, **summary}
+
+
+@shared_task
+def retry_due_notifications_task(limit=None):
+    """
+    重新发送到期的重试记录
+    
+    需要定期执行（例如通过 Celery beat 每分钟一次）。领取到期记录后
+    恢复为待发送状态，再按批次加入发送队列。
+    
+    Args:
+        limit: 单次最多领取的记录数，默认使用 RETRY_BATCH_LIMIT
+    """
+    from chewy_notification.retry import claim_due_retries
+    
+    record_ids = claim_due_retries(limit)
+    if record_ids:
+        logger.info(f"重新发送 {len(record_ids)} 条到期的重试记录")
+        enqueue_records(record_ids)
+    return {"success": True, "total": len(record_ids)}
+
+
+@shared_task
+def dispatch_scheduled_notifications_task():
+    """
+    将到期的定时记录加入发送队列
+    
+    需要定期执行（例如通过 Celery beat 每分钟一次），
+    同一批到期的记录在 SCHEDULE_SPREAD_SECONDS 内错开入队。
+    """
+    from chewy_notification.scheduling import dispatch_scheduled
+    
+    return {"success": True, "total": dispatch_scheduled()}
+
+
+@shared_task
+def purge_notification_records_task():
+    """
+    归档并删除超过保留期的记录，同时清理过期的幂等键
+    
+    需要定期执行（例如通过 Celery beat 每天一次），保留天数见 RETENTION_DAYS。
+    """
+    from chewy_notification.idempotency import purge_expired_keys
+    from chewy_notification.retention import purge_records
+    
+    summary = purge_records()
+    summary["idempotency_keys"] = purge_expired_keys()
+    return {"success": True, **summary}
+
+
+def get_delivery_backend():
+    """
+    当前使用的异步发送方式
+    
+    Returns:
+        str: celery / thread / database
+    """
+    from chewy_notification.conf import get_setting
+    
+    backend = get_setting("DELIVERY_BACKEND")
+    if backend == "auto" or (backend == "celery" and not CELERY_AVAILABLE):
+        # 未安装 Celery 时使用数据库队列，进程重启后待发送记录仍会被发送进程领取
+        return "celery" if CELERY_AVAILABLE else "database"
+    return backend
+
+
+def enqueue_records(record_ids, countdown=None):
+    """
+    将待发送记录按批次加入发送队列
+    
+    使用数据库发送进程时记录本身就是队列，这里只记录延迟发送的时间，
+    由 run_notification_worker 领取。配置了 PRIORITY_QUEUES 时按优先级分组，
+    不同优先级的记录不会放在同一个批量任务中，并投递到各自的 Celery 队列。
+    
+    Args:
+        record_ids: 通知记录ID列表
+        countdown: 延迟执行的秒数（可选）
+    
+    Returns:
+        int: 加入队列的批次数
+    """
+    from chewy_notification.conf import get_setting
+    
+    backend = get_delivery_backend()
+    if backend == "database":
+        if countdown:
+            from datetime import timedelta
+            from django.utils import timezone
+            from chewy_notification.models import NotificationRecord
+            
+            NotificationRecord.objects.filter(
+                id__in=record_ids, status=NotificationRecord.Status.PENDING
+            ).update(next_attempt_at=timezone.now() + timedelta(seconds=countdown))
+        return 0
+    
+    from chewy_notification.priority import group_by_priority, priority_queue
+    
+    if get_setting("PRIORITY_QUEUES"):
+        lanes = [(priority_queue(priority), ids) for priority, ids in group_by_priority(record_ids)]
+    else:
+        lanes = [(None, record_ids)]
+    
+    batch_size = get_setting("TASK_BATCH_SIZE")
+    chunks = [
+        (queue, ids[start:start + batch_size])
+        for queue, ids in lanes
+        for start in range(0, len(ids), batch_size)
+    ]
+    for queue, chunk in chunks:
+        options = {}
+        if countdown:
+            options["countdown"] = countdown
+        if queue:
+            options["queue"] = queue
+        
+        if backend == "thread" and CELERY_AVAILABLE:
+            # 已安装 Celery 但指定在后台线程中发送
+            get_background_runner().submit(send_notification_batch_task, (chunk,), {}, countdown)
+        elif options:
+            send_notification_batch_task.apply_async(args=(chunk,), **options)
+        else:
+            send_notification_batch_task.delay(chunk)
+    return len(chunks)
@@ -1,13 +1,54 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import smtplib
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+import requests
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
 from django.utils import timezone
 from chewy_notification.models import (
     NotificationChannel,
     NotificationTemplate,
     NotificationTarget,
     NotificationRecord,
+    NotificationMessage,
+    NotificationChannelState,
+    NotificationIdempotencyKey,
+    NotificationStat,
+    NotificationTargetGroup,
 )
-from chewy_notification.services import get_service_for_channel
+from chewy_notification.services import get_service_for_channel, clear_service_cache
+from chewy_notification.services import RateLimitExceeded, TokenBucket, CircuitBreaker, CircuitOpenError
+from chewy_notification.services.exceptions import NotificationSendError
+from chewy_notification.services import BarkService, EmailService, NtfyService
+from chewy_notification.services.dispatch import run_batch_jobs, send_many_async
+from chewy_notification.services.http_pool import get_session, close_sessions, to_send_error
 from chewy_notification.utils import render_notification_content
+from chewy_notification.tasks import send_notification_batch_task, retry_due_notifications_task, enqueue_records
+from chewy_notification.tasks import BackgroundRunner, get_delivery_backend
+from chewy_notification.priority import promote_waiting_records
+from chewy_notification.worker import claim_records
+from chewy_notification.retry import claim_due_retries, compute_backoff
+from chewy_notification.retention import purge_records
+from chewy_notification.scheduling import dispatch_scheduled
+from chewy_notification.delivery import create_pending_records
+from chewy_notification.rendering import get_compiled_template, render_template, clear_template_cache
 
 
 class NotificationChannelTestCase(TestCase):
@@ -65,6 +106,17 @@ class NotificationTemplateTestCase(TestCase):
         
         self.assertEqual(title, "欢迎 张三")
         self.assertIn("你好，张三", content)
+    
+    def test_compiled_template_cache(self):
+        """测试编译结果按模板缓存，模板更新后重新编译"""
+        clear_template_cache()
+        compiled = get_compiled_template(self.template)
+        self.assertIs(compiled, get_compiled_template(NotificationTemplate.objects.get(id=self.template.id)))
+        
+        self.template.title = "你好 {{name}}"
+        self.template.save()
+        title, _ = render_template(self.template, {"name": "李四"})
+        self.assertEqual(title, "你好 李四")
 
 
 class NotificationTargetTestCase(TestCase):
@@ -145,6 +197,9 @@ class NotificationRecordTestCase(TestCase):
 class ServiceTestCase(TestCase):
     """服务层测试"""
     
+    def tearDown(self):
+        clear_service_cache()
+    
     def test_get_service_for_bark(self):
         """测试获取Bark服务"""
         channel = NotificationChannel.objects.create(
@@ -157,6 +212,25 @@ class ServiceTestCase(TestCase):
         service = get_service_for_channel(channel)
         self.assertIsNotNone(service)
     
+    def test_service_instance_cached(self):
+        """测试服务实例按渠道缓存，渠道更新后重建"""
+        channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app"},
+            enabled=True
+        )
+        
+        first = get_service_for_channel(channel)
+        again = get_service_for_channel(NotificationChannel.objects.get(id=channel.id))
+        self.assertIs(first, again)
+        
+        channel.config = {"server_url": "https://bark.example.com"}
+        channel.save()
+        updated = get_service_for_channel(channel)
+        self.assertIsNot(first, updated)
+        self.assertEqual(updated.server_url, "https://bark.example.com")
+    
     def test_get_service_for_invalid_type(self):
         """测试获取无效类型的服务"""
         # 创建一个渠道但设置无效类型（仅用于测试）
@@ -187,3 +261,1519 @@ class UtilsTestCase(TestCase):
         result = render_notification_content(template, context)
         # 未提供的变量保持原样
         self.assertIn("{{count}}", result)
+    
+    def test_render_is_single_pass(self):
+        """测试变量值中的占位符不会被再次替换"""
+        result = render_notification_content("{{a}} {{b}}", {"a": "{{b}}", "b": "x"})
+        self.assertEqual(result, "{{b}} x")
+
+
+class HttpPoolTestCase(TestCase):
+    """HTTP 连接池测试"""
+    
+    def tearDown(self):
+        close_sessions()
+    
+    def test_session_shared_per_host(self):
+        """测试同一服务器复用 Session"""
+        first = get_session("https://api.day.app/push")
+        second = get_session("https://API.day.app/other")
+        other = get_session("https://ntfy.sh/topic")
+        
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+    
+    @override_settings(CHEWY_NOTIFICATION={"HTTP_POOL_MAXSIZE": 3})
+    def test_pool_size_from_settings(self):
+        """测试连接池大小可配置"""
+        session = get_session("https://api.day.app/push")
+        adapter = session.get_adapter("https://api.day.app/push")
+        self.assertEqual(adapter._pool_maxsize, 3)
+    
+    def test_bark_uses_shared_session(self):
+        """测试 Bark 服务通过共享 Session 发送"""
+        channel = NotificationChannel(
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app"},
+        )
+        service = get_service_for_channel(channel)
+        session = get_session("https://api.day.app")
+        response = mock.Mock(status_code=200, text="{}")
+        response.json.return_value = {}
+        
+        with mock.patch.object(session, "post", return_value=response) as post:
+            service.send("token", "标题", "内容")
+            service.send("token", "标题", "内容")
+        
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args.kwargs["timeout"], 10)
+
+
+class EmailBatchTestCase(TestCase):
+    """邮件批量发送测试"""
+    
+    def setUp(self):
+        self.service = EmailService({
+            "host": "smtp.example.com",
+            "from_email": "noreply@example.com",
+        })
+        self.connection = mock.Mock()
+    
+    def test_batch_uses_single_connection(self):
+        """测试整批邮件只进行一次连接、STARTTLS 和登录"""
+        self.service.config.update({"username": "user", "password": "secret"})
+        recipients = ["a@example.com", "b@example.com", "c@example.com"]
+        with mock.patch("smtplib.SMTP") as smtp:
+            outcomes = self.service.send_batch(recipients, "标题", "内容")
+        
+        smtp.assert_called_once()
+        session = smtp.return_value
+        session.starttls.assert_called_once()
+        session.login.assert_called_once_with("user", "secret")
+        self.assertEqual(session.sendmail.call_count, 3)
+        session.quit.assert_called_once()
+        self.assertTrue(all(outcome["success"] for outcome in outcomes))
+    
+    def test_batch_reconnects_after_disconnect(self):
+        """测试服务器断开后重新连接"""
+        self.connection.send_messages.side_effect = [smtplib.SMTPServerDisconnected(), 1, 1]
+        
+        with mock.patch.object(self.service, "_get_connection", return_value=self.connection):
+            outcomes = self.service.send_batch(["a@example.com", "b@example.com"], "标题", "内容")
+        
+        self.connection.open.assert_called_once()
+        self.assertEqual([outcome["success"] for outcome in outcomes], [True, True])
+    
+    def test_batch_reports_per_recipient_failure(self):
+        """测试单个收件人失败不影响其它收件人"""
+        self.connection.send_messages.side_effect = [
+            smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"rejected")}),
+            1,
+        ]
+        
+        with mock.patch.object(self.service, "_get_connection", return_value=self.connection):
+            outcomes = self.service.send_batch(["a@example.com", "b@example.com"], "标题", "内容")
+        
+        self.assertFalse(outcomes[0]["success"])
+        self.assertIn("邮件发送失败", outcomes[0]["error"])
+        self.assertTrue(outcomes[1]["success"])
+
+
+class AsyncSendTestCase(TestCase):
+    """异步发送测试"""
+    
+    def test_send_async(self):
+        """测试异步发送返回与同步发送相同的结果"""
+        service = BarkService({"server_url": "https://api.day.app"})
+        result = {"success": True}
+        
+        with mock.patch.object(service, "_send_implementation_async", return_value=result) as impl:
+            self.assertEqual(asyncio.run(service.send_async("token", "标题", "内容", badge=1)), result)
+        
+        payload = impl.call_args.args[0]
+        self.assertEqual(payload["target"], "token")
+        self.assertEqual(payload["badge"], 1)
+    
+    def test_send_many_async_respects_concurrency(self):
+        """测试并发发送不超过并发上限"""
+        service = BarkService({"server_url": "https://api.day.app"})
+        in_flight = 0
+        peak = 0
+        
+        async def fake_send(payload):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if payload["target"] == "bad":
+                raise Exception("Bark发送失败")
+            return {"success": True}
+        
+        jobs = [(service, f"token{i}", "标题", "内容") for i in range(10)]
+        jobs.append((service, "bad", "标题", "内容"))
+        
+        with mock.patch.object(service, "_send_implementation_async", side_effect=fake_send):
+            outcomes = asyncio.run(send_many_async(jobs, concurrency=3))
+        
+        self.assertLessEqual(peak, 3)
+        self.assertEqual(len(outcomes), 11)
+        self.assertTrue(all(outcome["success"] for outcome in outcomes[:10]))
+        self.assertFalse(outcomes[10]["success"])
+
+
+class BatchDispatchTestCase(TestCase):
+    """并发批量发送测试"""
+    
+    def test_run_batch_jobs_concurrency(self):
+        """测试并发数上限且结果顺序与任务一致"""
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+        
+        def job(target):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return [{"target": target, "success": True, "response": {}}]
+        
+        jobs = [([f"t{i}"], lambda i=i: job(f"t{i}")) for i in range(8)]
+        outcomes = run_batch_jobs(jobs, concurrency=4)
+        
+        self.assertLessEqual(peak, 4)
+        self.assertGreater(peak, 1)
+        self.assertEqual([outcome["target"] for outcome in outcomes], [f"t{i}" for i in range(8)])
+    
+    def test_run_batch_jobs_deadline(self):
+        """测试超过总耗时上限时，发送中的任务不可重试，未开始的任务被取消并可重试"""
+        started = []
+        
+        def slow(target):
+            started.append(target)
+            time.sleep(0.3)
+            return [{"target": target, "success": True, "response": {}}]
+        
+        jobs = [
+            (["fast"], lambda: [{"target": "fast", "success": True, "response": {}}]),
+            (["slow"], lambda: slow("slow")),
+            (["queued"], lambda: slow("queued")),
+        ]
+        outcomes = run_batch_jobs(jobs, concurrency=1, deadline=0.1)
+        
+        self.assertTrue(outcomes[0]["success"])
+        self.assertFalse(outcomes[1]["success"])
+        self.assertIn("发送超时", outcomes[1]["error"])
+        self.assertFalse(outcomes[1]["retryable"])
+        self.assertFalse(outcomes[2]["success"])
+        self.assertTrue(outcomes[2]["retryable"])
+        self.assertEqual(started, ["slow"])
+
+
+class BackgroundRunnerTestCase(TestCase):
+    """进程内后台线程池测试"""
+    
+    def test_delayed_tasks_do_not_hold_workers(self):
+        """测试延迟执行的任务等待期间不占用工作线程"""
+        runner = BackgroundRunner(max_workers=1)
+        ran = []
+        done = threading.Event()
+        
+        with mock.patch("django.db.connection.close"):
+            runner.submit(lambda: ran.append("delayed") or done.set(), (), {}, countdown=0.2)
+            runner.submit(lambda: ran.append("now"), (), {}).result(timeout=1)
+            self.assertEqual(ran, ["now"])
+            self.assertTrue(done.wait(timeout=2))
+        self.assertEqual(ran, ["now", "delayed"])
+        self.assertEqual(runner.executor._max_workers, 1)
+    
+    def test_auto_backend_without_celery_uses_database(self):
+        """测试未安装 Celery 时默认使用数据库队列"""
+        with mock.patch("chewy_notification.tasks.CELERY_AVAILABLE", False):
+            self.assertEqual(get_delivery_backend(), "database")
+
+
+class QuickSendTestCase(TestCase):
+    """快速发送接口测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "max_concurrency": 5, "batch_size": 1},
+            enabled=True
+        )
+        self.targets = [
+            NotificationTarget.objects.create(
+                alias=f"设备{i}",
+                target_type=NotificationTarget.TargetType.BARK_TOKEN,
+                target_value=f"token{i}"
+            )
+            for i in range(5)
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def test_quick_send_partial_failure(self):
+        """测试部分失败时返回 207 且每个目标都有结果"""
+        def fake_send(payload):
+            if payload["target"] == "token3":
+                raise Exception("Bark发送失败")
+            return {"success": True}
+        
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=fake_send):
+            response = self.client.post(
+                reverse("notification-quick-send"),
+                {"channel_id": self.channel.id, "title": "标题", "content": "内容"},
+                format="json",
+            )
+        
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["total"], 5)
+        statuses = {result["target_id"]: result["status"] for result in response.data["results"]}
+        self.assertEqual(statuses[self.targets[3].id], "failed")
+        self.assertEqual(
+            NotificationRecord.objects.filter(status=NotificationRecord.Status.SUCCESS).count(), 4
+        )
+    
+    def test_quick_send_query_count_independent_of_targets(self):
+        """测试广播的数据库语句数量不随目标数量增长"""
+        def broadcast():
+            # 每次从冷启动的服务实例开始，熔断器读取共享状态的次数保持一致
+            clear_service_cache()
+            with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.post(
+                        reverse("notification-quick-send"),
+                        {"channel_id": self.channel.id, "title": "标题", "content": "内容"},
+                        format="json",
+                    )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+        
+        # 首次发送会创建本小时的统计行，之后只累加
+        broadcast()
+        small = broadcast()
+        for i in range(5, 20):
+            NotificationTarget.objects.create(
+                alias=f"设备{i}",
+                target_type=NotificationTarget.TargetType.BARK_TOKEN,
+                target_value=f"token{i}"
+            )
+        self.assertEqual(broadcast(), small)
+    
+    @override_settings(CHEWY_NOTIFICATION={"TASK_BATCH_SIZE": 2, "DELIVERY_BACKEND": "thread"})
+    def test_quick_send_async_enqueues_chunks(self):
+        """测试异步广播按批次入队并由任务发送"""
+        with mock.patch.object(send_notification_batch_task, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("notification-quick-send"),
+                    {
+                        "channel_id": self.channel.id,
+                        "title": "标题",
+                        "content": "内容",
+                        "level": "critical",
+                        "async_send": True,
+                    },
+                    format="json",
+                )
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(delay.call_count, 3)
+        record_ids = [record_id for call in delay.call_args_list for record_id in call.args[0]]
+        self.assertEqual(len(record_ids), 5)
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as impl:
+            for call in delay.call_args_list:
+                send_notification_batch_task(*call.args)
+        
+        self.assertEqual(impl.call_count, 5)
+        self.assertEqual(impl.call_args.args[0]["level"], "critical")
+        self.assertEqual(
+            NotificationRecord.objects.filter(id__in=record_ids, status=NotificationRecord.Status.SUCCESS).count(), 5
+        )
+
+
+class BarkBatchTestCase(TestCase):
+    """Bark 多设备批量推送测试"""
+    
+    def setUp(self):
+        self.service = BarkService({"server_url": "https://api.day.app", "batch_size": 2})
+    
+    def _response(self, data):
+        response = mock.Mock(status_code=200, text="{}")
+        response.json.return_value = data
+        return response
+    
+    def test_chunks_device_keys(self):
+        """测试按 batch_size 合并设备"""
+        with mock.patch.object(self.service, "_http_post", return_value=self._response({"code": 200})) as post:
+            outcomes = self.service.send_batch(["a", "b", "c"], "标题", "内容", badge=1)
+        
+        self.assertEqual(post.call_count, 2)
+        sent = sorted(call.kwargs["json"]["device_keys"] for call in post.call_args_list)
+        self.assertEqual(sent, [["a", "b"], ["c"]])
+        self.assertNotIn("device_key", post.call_args.kwargs["json"])
+        self.assertEqual(post.call_args.kwargs["json"]["badge"], 1)
+        self.assertEqual([outcome["target"] for outcome in outcomes], ["a", "b", "c"])
+        self.assertTrue(all(outcome["success"] for outcome in outcomes))
+    
+    def test_per_device_result(self):
+        """测试按设备解析推送结果"""
+        data = {
+            "code": 200,
+            "data": [
+                {"code": 200, "device_key": "a", "message": "success"},
+                {"code": 400, "device_key": "b", "message": "failed to get device token"},
+            ],
+        }
+        with mock.patch.object(self.service, "_http_post", return_value=self._response(data)):
+            outcomes = self.service.send_batch(["a", "b"], "标题", "内容")
+        
+        self.assertTrue(outcomes[0]["success"])
+        self.assertFalse(outcomes[1]["success"])
+        self.assertIn("failed to get device token", outcomes[1]["error"])
+
+
+class BatchTaskTestCase(TestCase):
+    """批量发送任务测试"""
+    
+    def setUp(self):
+        self.bark = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.ntfy = NotificationChannel.objects.create(
+            name="Ntfy渠道",
+            type=NotificationChannel.ChannelType.NTFY,
+            config={"server_url": "https://ntfy.sh"},
+        )
+        self.template = NotificationTemplate.objects.create(
+            name="欢迎模板",
+            title="欢迎 {{name}}",
+            content="你好 {{name}}",
+            channel=self.bark,
+        )
+        self.message = NotificationMessage.objects.create(title="广播", content="内容")
+        token = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        topic = NotificationTarget.objects.create(
+            alias="主题", target_type=NotificationTarget.TargetType.NTFY_TOPIC, target_value="topic"
+        )
+        self.records = [
+            NotificationRecord.objects.create(
+                template=self.template, channel=self.bark, target=token, context={"name": "张三"}
+            ),
+            NotificationRecord.objects.create(message=self.message, channel=self.bark, target=token),
+            NotificationRecord.objects.create(message=self.message, channel=self.ntfy, target=topic),
+            NotificationRecord.objects.create(message=self.message, channel=None, target=topic),
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def test_batch_task_groups_by_channel(self):
+        """测试批量任务一次加载记录、按渠道发送并回写结果"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as bark, \
+                mock.patch.object(NtfyService, "_send_implementation", return_value={"success": True}) as ntfy:
+            result = send_notification_batch_task([record.id for record in self.records])
+        
+        self.assertEqual(result["total"], 4)
+        self.assertEqual(result["succeeded"], 3)
+        titles = sorted(call.args[0]["title"] for call in bark.call_args_list)
+        self.assertEqual(titles, ["广播", "欢迎 张三"])
+        ntfy.assert_called_once()
+        
+        statuses = [NotificationRecord.objects.get(id=record.id).status for record in self.records]
+        self.assertEqual(statuses, ["success", "success", "success", "failed"])
+    
+    def test_batch_task_skips_processed_records(self):
+        """测试已处理的记录不会重复发送"""
+        NotificationRecord.objects.filter(id=self.records[1].id).update(status=NotificationRecord.Status.SUCCESS)
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as bark:
+            result = send_notification_batch_task([self.records[1].id])
+        
+        self.assertEqual(result["total"], 0)
+        bark.assert_not_called()
+
+
+class RateLimitTestCase(TestCase):
+    """渠道限流测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+            rate_limit=1,
+            rate_burst=2,
+        )
+        token = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        message = NotificationMessage.objects.create(title="广播", content="内容")
+        self.records = [
+            NotificationRecord.objects.create(message=message, channel=self.channel, target=token)
+            for _ in range(3)
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def test_bucket_shared_between_instances(self):
+        """测试多个令牌桶实例（模拟多个进程）共享同一渠道的速率"""
+        first = TokenBucket(self.channel.id, rate=1, burst=2)
+        second = TokenBucket(self.channel.id, rate=1, burst=2)
+        
+        first.acquire(max_wait=0)
+        second.acquire(max_wait=0)
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            second.acquire(max_wait=0)
+        
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertEqual(NotificationChannelState.objects.filter(channel=self.channel).count(), 1)
+    
+    def test_service_uses_channel_rate_limit(self):
+        """测试渠道配置速率限制后服务附加令牌桶"""
+        service = get_service_for_channel(self.channel)
+        
+        self.assertIsInstance(service.rate_limiter, TokenBucket)
+        self.assertEqual(service.rate_limiter.burst, 2)
+    
+    @override_settings(CHEWY_NOTIFICATION={"RATE_LIMIT_MAX_WAIT": 0, "DELIVERY_BACKEND": "thread"})
+    def test_batch_task_defers_over_limit(self):
+        """测试超出速率的记录保持待发送并延后重新入队"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as bark, \
+                mock.patch.object(send_notification_batch_task, "apply_async") as apply_async:
+            result = send_notification_batch_task([record.id for record in self.records])
+        
+        self.assertEqual(bark.call_count, 2)
+        self.assertEqual(result["succeeded"], 2)
+        self.assertEqual(result["deferred"], [self.records[2].id])
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs["args"], ([self.records[2].id],))
+        self.assertGreater(apply_async.call_args.kwargs["countdown"], 0)
+        
+        record = NotificationRecord.objects.get(id=self.records[2].id)
+        self.assertEqual(record.status, NotificationRecord.Status.PENDING)
+
+
+class RetryTestCase(TestCase):
+    """失败重试测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        self.message = NotificationMessage.objects.create(title="广播", content="内容")
+        self.record = NotificationRecord.objects.create(
+            message=self.message, channel=self.channel, target=self.target
+        )
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _http_error(self, status_code, headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        return requests.HTTPError(response=response)
+    
+    def test_classify_http_errors(self):
+        """测试超时、429、5xx 可以重试，4xx 不重试"""
+        self.assertTrue(to_send_error("失败", requests.Timeout()).retryable)
+        self.assertTrue(to_send_error("失败", self._http_error(503)).retryable)
+        self.assertFalse(to_send_error("失败", self._http_error(400)).retryable)
+        
+        error = to_send_error("失败", self._http_error(429, {"Retry-After": "120"}))
+        self.assertTrue(error.retryable)
+        self.assertEqual(error.retry_after, 120)
+    
+    @override_settings(CHEWY_NOTIFICATION={"RETRY_BACKOFF_BASE": 10, "RETRY_BACKOFF_MAX": 60})
+    def test_backoff_grows_with_jitter(self):
+        """测试退避时间指数增长、带抖动且有上限"""
+        self.assertTrue(5 <= compute_backoff(1) <= 10)
+        self.assertTrue(20 <= compute_backoff(3) <= 40)
+        self.assertTrue(30 <= compute_backoff(10) <= 60)
+        self.assertEqual(compute_backoff(1, retry_after=300), 300)
+    
+    def test_transient_failure_scheduled_for_retry(self):
+        """测试暂时性失败进入重试状态，永久失败直接记为失败"""
+        other = NotificationRecord.objects.create(message=self.message, channel=self.channel, target=self.target)
+        errors = [
+            NotificationSendError("Bark发送失败: 503", retryable=True),
+            NotificationSendError("Bark发送失败: 400"),
+        ]
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=errors):
+            send_notification_batch_task([self.record.id, other.id])
+        
+        self.record.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.record.status, NotificationRecord.Status.RETRY)
+        self.assertEqual(self.record.attempts, 1)
+        self.assertGreater(self.record.next_attempt_at, timezone.now())
+        self.assertEqual(other.status, NotificationRecord.Status.FAILED)
+    
+    @override_settings(CHEWY_NOTIFICATION={"RETRY_MAX_ATTEMPTS": 2})
+    def test_retry_gives_up_after_max_attempts(self):
+        """测试超过最大尝试次数后记为失败"""
+        NotificationRecord.objects.filter(id=self.record.id).update(attempts=1)
+        error = NotificationSendError("Bark发送失败: 503", retryable=True)
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=error):
+            send_notification_batch_task([self.record.id])
+        
+        self.record.refresh_from_db()
+        self.assertEqual(self.record.status, NotificationRecord.Status.FAILED)
+        self.assertEqual(self.record.attempts, 2)
+    
+    @override_settings(CHEWY_NOTIFICATION={"DELIVERY_BACKEND": "thread"})
+    def test_due_retries_requeued(self):
+        """测试只重新发送已到期的重试记录"""
+        now = timezone.now()
+        NotificationRecord.objects.filter(id=self.record.id).update(
+            status=NotificationRecord.Status.RETRY, next_attempt_at=now - timedelta(seconds=1)
+        )
+        later = NotificationRecord.objects.create(
+            message=self.message,
+            channel=self.channel,
+            target=self.target,
+            status=NotificationRecord.Status.RETRY,
+            next_attempt_at=now + timedelta(minutes=5),
+        )
+        
+        with mock.patch.object(send_notification_batch_task, "delay") as delay:
+            result = retry_due_notifications_task()
+        
+        self.assertEqual(result["total"], 1)
+        delay.assert_called_once_with([self.record.id])
+        self.record.refresh_from_db()
+        self.assertEqual(self.record.status, NotificationRecord.Status.PENDING)
+        self.assertEqual(NotificationRecord.objects.get(id=later.id).status, NotificationRecord.Status.RETRY)
+    
+    def test_claim_due_retries_skips_rows_claimed_concurrently(self):
+        """测试不支持行锁时，查询后被其它进程领取的记录不会被再次领取"""
+        other = NotificationRecord.objects.create(
+            message=self.message,
+            channel=self.channel,
+            target=self.target,
+            status=NotificationRecord.Status.RETRY,
+            next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+        NotificationRecord.objects.filter(id=self.record.id).update(
+            status=NotificationRecord.Status.RETRY, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        values_list = QuerySet.values_list
+        calls = []
+        
+        def claim_concurrently(queryset, *args, **kwargs):
+            if calls:
+                return values_list(queryset, *args, **kwargs)
+            # 模拟另一个进程在查询之后、更新之前领取了 other
+            calls.append(True)
+            rows = list(values_list(queryset, *args, **kwargs))
+            NotificationRecord.objects.filter(id=other.id).update(status=NotificationRecord.Status.PENDING)
+            return rows
+        
+        with mock.patch.object(connection.features, "has_select_for_update_skip_locked", False), \
+                mock.patch.object(QuerySet, "values_list", autospec=True, side_effect=claim_concurrently):
+            self.assertEqual(claim_due_retries(), [self.record.id])
+
+
+@override_settings(CHEWY_NOTIFICATION={"CIRCUIT_MIN_REQUESTS": 3, "CIRCUIT_CHECK_INTERVAL": 0})
+class CircuitBreakerTestCase(TestCase):
+    """渠道熔断测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app"},
+        )
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def test_opens_after_transient_failures(self):
+        """测试连续暂时性失败后熔断，熔断期间不再请求服务商"""
+        service = get_service_for_channel(self.channel)
+        error = NotificationSendError("Bark发送失败: 503", retryable=True)
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=error) as send:
+            for _ in range(3):
+                with self.assertRaises(NotificationSendError):
+                    service.send("token", "标题", "内容")
+            with self.assertRaises(CircuitOpenError):
+                service.send("token", "标题", "内容")
+        
+        self.assertEqual(send.call_count, 3)
+        state = NotificationChannelState.objects.get(channel=self.channel)
+        self.assertEqual(state.circuit_state, "open")
+        
+        # 其它进程共享熔断状态
+        with self.assertRaises(CircuitOpenError):
+            CircuitBreaker(self.channel.id).allow()
+    
+    def test_async_send_flushes_breaker(self):
+        """测试异步发送后将熔断器的状态变化写入共享状态"""
+        service = get_service_for_channel(self.channel)
+        error = NotificationSendError("Bark发送失败: 503", retryable=True)
+        
+        async def send_all():
+            for _ in range(3):
+                with self.assertRaises(NotificationSendError):
+                    await service.send_async("token", "标题", "内容")
+        
+        with mock.patch.object(BarkService, "_send_implementation_async", side_effect=error), \
+                mock.patch.object(service.circuit_breaker, "allow"), \
+                mock.patch.object(service.circuit_breaker, "flush") as flush:
+            asyncio.run(send_all())
+        
+        self.assertEqual(service.circuit_breaker.state, "open")
+        self.assertEqual(flush.call_count, 3)
+    
+    def test_permanent_failures_do_not_open(self):
+        """测试 4xx 等永久性失败不会触发熔断"""
+        service = get_service_for_channel(self.channel)
+        error = NotificationSendError("Bark发送失败: 400")
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=error) as send:
+            for _ in range(4):
+                with self.assertRaises(NotificationSendError):
+                    service.send("token", "标题", "内容")
+        
+        self.assertEqual(send.call_count, 4)
+        self.assertEqual(service.circuit_breaker.state, "closed")
+    
+    def test_half_open_single_probe(self):
+        """测试熔断到期后只放行一个探测请求，探测成功后恢复"""
+        NotificationChannelState.objects.create(
+            channel=self.channel, circuit_state="open", circuit_open_until=time.time() - 1
+        )
+        probe = CircuitBreaker(self.channel.id)
+        other = CircuitBreaker(self.channel.id)
+        
+        probe.allow()
+        with self.assertRaises(CircuitOpenError):
+            other.allow()
+        
+        probe.record(True, 0.1)
+        probe.flush()
+        other.allow()
+        self.assertEqual(NotificationChannelState.objects.get(channel=self.channel).circuit_state, "closed")
+    
+    def _expired_circuit(self):
+        NotificationChannelState.objects.create(
+            channel=self.channel, circuit_state="open", circuit_open_until=time.time() - 1
+        )
+    
+    def test_rate_limited_send_does_not_take_probe(self):
+        """测试限流拒绝的发送不会占用半开探测资格"""
+        self._expired_circuit()
+        service = get_service_for_channel(self.channel)
+        service.rate_limiter = mock.Mock(**{"acquire.side_effect": RateLimitExceeded("限流", retry_after=1)})
+        with self.assertRaises(RateLimitExceeded):
+            service.send("token", "标题", "内容")
+        
+        service.rate_limiter = None
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"code": 200}):
+            service.send("token", "标题", "内容")
+        self.assertEqual(service.circuit_breaker.state, "closed")
+    
+    def test_cancelled_probe_job_is_released(self):
+        """测试批量发送超时取消的探测任务归还探测资格"""
+        started = threading.Event()
+        release = threading.Event()
+        breaker = mock.Mock(**{"allow.side_effect": [None, "probe"]})
+        
+        def block():
+            started.set()
+            release.wait(1)
+            return [{"target": "a", "success": True}]
+        
+        jobs = [(["a"], block), (["b"], lambda: [{"target": "b", "success": True}])]
+        try:
+            outcomes = run_batch_jobs(jobs, concurrency=1, deadline=0.1, breaker=breaker)
+        finally:
+            release.set()
+        
+        self.assertTrue(outcomes[1]["retryable"])
+        breaker.release_probe.assert_called_once_with("probe")
+    
+    def test_cancelled_async_probe_is_released(self):
+        """测试异步探测请求被取消后归还探测资格"""
+        self._expired_circuit()
+        service = get_service_for_channel(self.channel)
+        breaker = service.circuit_breaker
+        probe = breaker.allow()
+        self.assertIsNotNone(probe)
+        
+        async def hang(payload):
+            await asyncio.sleep(10)
+        
+        async def send():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(service.send_async("token", "标题", "内容"), 0.05)
+        
+        with mock.patch.object(BarkService, "_send_implementation_async", side_effect=hang), \
+                mock.patch.object(breaker, "allow", return_value=probe), \
+                mock.patch.object(breaker, "flush"), \
+                mock.patch("chewy_notification.services.circuit_breaker.PROBE_RELEASE_DELAY", 0):
+            asyncio.run(send())
+        
+        breaker.flush()
+        self.assertIsNotNone(CircuitBreaker(self.channel.id).allow())
+    
+    @override_settings(CHEWY_NOTIFICATION={"CIRCUIT_OPEN_SECONDS": 0, "CIRCUIT_CHECK_INTERVAL": 0})
+    def test_lost_probe_expires(self):
+        """测试一直没有结果的探测超过熔断时间后被放弃，重新探测"""
+        self._expired_circuit()
+        breaker = CircuitBreaker(self.channel.id)
+        first = breaker.allow()
+        second = breaker.allow()
+        self.assertIsNotNone(second)
+        self.assertIsNot(first, second)
+
+
+@override_settings(CHEWY_NOTIFICATION={"DELIVERY_BACKEND": "database"})
+class DatabaseWorkerTestCase(TestCase):
+    """数据库发送进程测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        self.message = NotificationMessage.objects.create(title="广播", content="内容")
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _record(self, **fields):
+        return NotificationRecord.objects.create(
+            message=self.message, channel=self.channel, target=self.target, **fields
+        )
+    
+    def test_claim_due_records_once(self):
+        """测试只领取待发送和到期重试的记录，且不会被其它进程重复领取"""
+        now = timezone.now()
+        pending = self._record()
+        due = self._record(status=NotificationRecord.Status.RETRY, next_attempt_at=now - timedelta(seconds=1))
+        self._record(status=NotificationRecord.Status.RETRY, next_attempt_at=now + timedelta(minutes=5))
+        self._record(status=NotificationRecord.Status.SUCCESS)
+        
+        self.assertEqual(claim_records("worker-a"), [pending.id, due.id])
+        self.assertEqual(claim_records("worker-b"), [])
+        due.refresh_from_db()
+        self.assertEqual(due.status, NotificationRecord.Status.PENDING)
+        self.assertEqual(due.locked_by, "worker-a")
+    
+    def test_sync_send_not_claimed_while_in_flight(self):
+        """测试同步发送期间发送进程不会领取同一条记录，发送后释放租约"""
+        from chewy_notification.views import quick_send
+        
+        claimed = []
+        deliver_records = quick_send.deliver_records
+        
+        def claim_and_deliver(*args, **kwargs):
+            # 记录已创建、尚未发送时发送进程尝试领取
+            claimed.extend(claim_records("worker-a"))
+            return deliver_records(*args, **kwargs)
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send, \
+                mock.patch.object(quick_send, "deliver_records", side_effect=claim_and_deliver):
+            response = APIClient().post(
+                reverse("notification-quick-send"),
+                {"channel_id": self.channel.id, "target_ids": [self.target.id], "title": "标题", "content": "内容"},
+                format="json",
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(claimed, [])
+        send.assert_called_once()
+        record = NotificationRecord.objects.get(id=response.json()["results"][0]["record_id"])
+        self.assertEqual(record.status, NotificationRecord.Status.SUCCESS)
+        self.assertEqual(record.locked_by, "")
+    
+    def test_enqueue_defers_in_database(self):
+        """测试使用数据库发送时入队不调用任务，延迟发送写入下次发送时间"""
+        record = self._record()
+        with mock.patch.object(send_notification_batch_task, "delay") as delay:
+            enqueue_records([record.id])
+            enqueue_records([record.id], countdown=60)
+        
+        delay.assert_not_called()
+        self.assertEqual(claim_records("worker-a"), [])
+    
+    def test_worker_command_sends_records(self):
+        """测试发送进程命令领取并发送记录，发送后释放领取"""
+        records = [self._record() for _ in range(3)]
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            call_command("run_notification_worker", "--once", stdout=mock.MagicMock())
+        
+        for record in records:
+            record.refresh_from_db()
+            self.assertEqual(record.status, NotificationRecord.Status.SUCCESS)
+            self.assertEqual(record.locked_by, "")
+    
+    @override_settings(CHEWY_NOTIFICATION={"DELIVERY_BACKEND": "thread"})
+    def test_worker_command_requires_database_backend(self):
+        """测试其它发送方式下发送进程拒绝启动，避免与任务队列重复发送"""
+        record = self._record()
+        with self.assertRaises(CommandError):
+            call_command("run_notification_worker", "--once", stdout=mock.MagicMock())
+        
+        record.refresh_from_db()
+        self.assertEqual(record.status, NotificationRecord.Status.PENDING)
+
+
+class IdempotencyTestCase(TestCase):
+    """发送接口幂等测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        self.payload = {"channel_id": self.channel.id, "target_ids": [self.target.id], "title": "标题", "content": "内容"}
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _post(self, payload, key="key-1"):
+        return self.client.post(
+            reverse("notification-quick-send"), payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+    
+    def test_repeated_key_replays_response(self):
+        """测试相同幂等键的重复请求返回首次响应且不再发送"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            first = self._post(self.payload)
+            second = self._post(self.payload)
+        
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(NotificationRecord.objects.count(), 1)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.json()["results"][0]["record_id"], first.json()["results"][0]["record_id"])
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+    
+    def test_key_reused_with_different_body(self):
+        """测试幂等键用于不同内容的请求时报错"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post(self.payload)
+            response = self._post({**self.payload, "content": "其它内容"})
+        
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(NotificationRecord.objects.count(), 1)
+    
+    def test_concurrent_duplicate_rejected(self):
+        """测试首次请求仍在处理时，并发的重复请求不会再次发送"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post(self.payload)
+        NotificationIdempotencyKey.objects.update(status_code=None, response=None)
+        
+        response = self._post(self.payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(NotificationRecord.objects.count(), 1)
+    
+    def test_stale_placeholder_taken_over(self):
+        """测试首次请求的进程异常退出后，租约过期的占位行由重试请求接手"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post(self.payload)
+        NotificationIdempotencyKey.objects.update(
+            status_code=None, response=None, update_time=timezone.now() - timedelta(minutes=10)
+        )
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            response = self._post(self.payload)
+        
+        self.assertEqual(response.status_code, 200)
+        send.assert_called_once()
+        self.assertEqual(NotificationIdempotencyKey.objects.get().status_code, 200)
+
+
+class CoalescingTestCase(TestCase):
+    """重复通知合并测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+            coalesce_window=60,
+        )
+        self.target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        self.payload = {"channel_id": self.channel.id, "target_ids": [self.target.id], "title": "告警", "content": "磁盘已满"}
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _post(self):
+        return self.client.post(reverse("notification-quick-send"), self.payload, format="json")
+    
+    def test_duplicates_merged_within_window(self):
+        """测试窗口内的重复通知只发送一次，其余合并到一条延后记录"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            first = self._post()
+            second = self._post()
+            third = self._post()
+        
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(first.json()["results"][0]["status"], "success")
+        self.assertEqual(second.json()["results"][0]["status"], "scheduled")
+        self.assertEqual(third.json()["results"][0]["status"], "coalesced")
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(NotificationRecord.objects.count(), 2)
+        
+        delayed = NotificationRecord.objects.get(id=second.json()["results"][0]["record_id"])
+        self.assertEqual(third.json()["results"][0]["record_id"], delayed.id)
+        self.assertEqual(delayed.coalesced_count, 2)
+        self.assertIsNotNone(delayed.next_attempt_at)
+    
+    def test_template_duplicates_counted(self):
+        """测试模板发送的重复通知同样累加合并次数"""
+        template = NotificationTemplate.objects.create(
+            name="告警模板", title="告警 {{host}}", content="{{host}} 磁盘已满", channel=self.channel
+        )
+        payload = {"template_id": template.id, "target_id": self.target.id, "context": {"host": "db1"}}
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            statuses = [
+                self.client.post(reverse("notification-send"), payload, format="json").json()["status"]
+                for _ in range(4)
+            ]
+        
+        self.assertEqual(statuses, ["success", "scheduled", "coalesced", "coalesced"])
+        delayed = NotificationRecord.objects.get(status=NotificationRecord.Status.PENDING)
+        self.assertEqual(delayed.coalesced_count, 3)
+    
+    def test_leased_record_not_merged(self):
+        """测试正在发送（带有租约）的记录不接受合并，重复通知改为延后发送"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post()
+            delayed_id = self._post().json()["results"][0]["record_id"]
+        # 发送进程已领取延后记录
+        NotificationRecord.objects.filter(id=delayed_id).update(
+            locked_by="worker", locked_until=timezone.now() + timedelta(minutes=5)
+        )
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            result = self._post().json()["results"][0]
+        
+        send.assert_not_called()
+        self.assertEqual(result["status"], "scheduled")
+        self.assertNotEqual(result["record_id"], delayed_id)
+        self.assertEqual(NotificationRecord.objects.get(id=delayed_id).coalesced_count, 1)
+    
+    def test_finished_record_not_merged(self):
+        """测试合并前目标记录已发送完成时改为延后发送"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post()
+            delayed_id = self._post().json()["results"][0]["record_id"]
+        
+        values_list = QuerySet.values_list
+        
+        def finish_concurrently(queryset, *args, **kwargs):
+            rows = list(values_list(queryset, *args, **kwargs))
+            if args == ("id", "target_id", "status", "locked_until", "create_time", "send_time"):
+                # 模拟发送进程在查询之后完成了延后记录的发送
+                NotificationRecord.objects.filter(id=delayed_id).update(status=NotificationRecord.Status.SUCCESS)
+            return rows
+        
+        with mock.patch.object(QuerySet, "values_list", autospec=True, side_effect=finish_concurrently):
+            result = self._post().json()["results"][0]
+        
+        self.assertEqual(result["status"], "scheduled")
+        self.assertNotEqual(result["record_id"], delayed_id)
+    
+    def test_merged_record_sends_count(self):
+        """测试合并记录发送时通过 Bark 角标显示合并次数"""
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self._post()
+            record_id = self._post().json()["results"][0]["record_id"]
+            self._post()
+        
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            send_notification_batch_task([record_id])
+        
+        self.assertEqual(send.call_args[0][0]["badge"], 2)
+        self.assertEqual(NotificationRecord.objects.get(id=record_id).status, NotificationRecord.Status.SUCCESS)
+
+
+class RetentionTestCase(TestCase):
+    """记录保留与归档测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道", type=NotificationChannel.ChannelType.BARK, config={"server_url": "https://api.day.app"}
+        )
+        self.target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+    
+    def _record(self, status, days_ago):
+        message = NotificationMessage.objects.create(title="标题", content="内容")
+        record = NotificationRecord.objects.create(
+            channel=self.channel, target=self.target, message=message, status=status
+        )
+        created = timezone.now() - timedelta(days=days_ago)
+        NotificationRecord.objects.filter(id=record.id).update(create_time=created)
+        NotificationMessage.objects.filter(id=message.id).update(create_time=created)
+        return record
+    
+    def test_purge_by_status_with_archive(self):
+        """测试按状态的保留天数分批归档并删除记录"""
+        old_success = [self._record(NotificationRecord.Status.SUCCESS, 40) for _ in range(3)]
+        recent_success = self._record(NotificationRecord.Status.SUCCESS, 10)
+        old_failed = self._record(NotificationRecord.Status.FAILED, 40)
+        pending = self._record(NotificationRecord.Status.PENDING, 400)
+        
+        with tempfile.TemporaryDirectory() as archive_dir:
+            summary = purge_records({"success": 30, "failed": 90}, archive_dir=archive_dir, batch_size=2)
+            with gzip.open(summary["archive"], "rt", encoding="utf-8") as archive:
+                rows = [json.loads(line) for line in archive]
+        
+        self.assertEqual(summary["success"], 3)
+        self.assertEqual(summary["failed"], 0)
+        self.assertEqual(summary["messages"], 3)
+        self.assertEqual(sorted(row["id"] for row in rows), [record.id for record in old_success])
+        self.assertEqual(rows[0]["message__title"], "标题")
+        self.assertEqual(
+            set(NotificationRecord.objects.values_list("id", flat=True)),
+            {recent_success.id, old_failed.id, pending.id},
+        )
+    
+    def test_purge_command(self):
+        """测试清理命令的保留天数参数和幂等键清理"""
+        self._record(NotificationRecord.Status.FAILED, 10)
+        NotificationIdempotencyKey.objects.create(
+            endpoint="send", key="old", request_hash="", expire_time=timezone.now() - timedelta(seconds=1)
+        )
+        
+        call_command("purge_notification_records", "--days", "failed=7", "--no-archive", stdout=mock.MagicMock())
+        
+        self.assertFalse(NotificationRecord.objects.exists())
+        self.assertFalse(NotificationIdempotencyKey.objects.exists())
+
+
+class RecordCursorPaginationTestCase(TestCase):
+    """记录列表游标分页测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        channel = NotificationChannel.objects.create(
+            name="Bark渠道", type=NotificationChannel.ChannelType.BARK, config={"server_url": "https://api.day.app"}
+        )
+        target = NotificationTarget.objects.create(
+            alias="设备", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value="token"
+        )
+        self.records = [
+            NotificationRecord.objects.create(channel=channel, target=target, status=NotificationRecord.Status.SUCCESS)
+            for _ in range(5)
+        ]
+        # 创建时间相同的记录按 id 排序，不会重复或遗漏
+        NotificationRecord.objects.filter(id__in=[r.id for r in self.records[1:4]]).update(
+            create_time=self.records[1].create_time
+        )
+    
+    def test_walk_all_pages(self):
+        """测试按游标逐页读取全部记录"""
+        url = reverse("record-list") + "?pagination=cursor&page_size=2"
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn("count", data)
+            ids.extend(item["id"] for item in data["results"])
+            url = data["next"]
+        
+        self.assertEqual(ids, [r.id for r in reversed(self.records)])
+    
+    def test_invalid_cursor(self):
+        """测试无效游标返回 404"""
+        response = self.client.get(reverse("record-list"), {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 404)
+    
+    def test_export_streams_filtered_records(self):
+        """测试按列表筛选条件以流的形式导出 CSV 和 NDJSON"""
+        NotificationRecord.objects.filter(id=self.records[0].id).update(
+            status=NotificationRecord.Status.FAILED, error_message="错误, 含逗号"
+        )
+        
+        response = self.client.get(reverse("record-export"), {"status": "failed"})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual([row["id"] for row in rows], [str(self.records[0].id)])
+        self.assertEqual(rows[0]["error_message"], "错误, 含逗号")
+        self.assertEqual(rows[0]["target__target_value"], "token")
+        
+        response = self.client.get(reverse("record-export"), {"output_format": "ndjson", "ordering": "create_time"})
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[-1])["id"], self.records[4].id)
+
+
+class DeliveryStatsTestCase(TestCase):
+    """发送统计测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        for i in range(3):
+            NotificationTarget.objects.create(
+                alias=f"设备{i}", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value=f"token{i}"
+            )
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def test_send_results_rolled_up(self):
+        """测试发送结果按渠道、状态和小时累加，并通过统计接口返回"""
+        results = [{"success": True}, NotificationSendError("Bark发送失败: 400"), {"success": True}]
+        with mock.patch.object(BarkService, "_send_implementation", side_effect=results):
+            self.client.post(
+                reverse("notification-quick-send"),
+                {"channel_id": self.channel.id, "title": "标题", "content": "内容"},
+                format="json",
+            )
+        
+        counts = dict(NotificationStat.objects.values_list("status", "count"))
+        self.assertEqual(counts, {"success": 2, "failed": 1})
+        
+        data = self.client.get(reverse("notification-stats"), {"channel": self.channel.id}).json()
+        totals = {row["status"]: row["count"] for row in data["totals"]}
+        self.assertEqual(totals, {"success": 2, "failed": 1})
+        self.assertEqual(len(data["hours"]), 2)
+        
+        # 再次发送只累加已有的行
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}):
+            self.client.post(
+                reverse("notification-quick-send"),
+                {"channel_id": self.channel.id, "title": "标题", "content": "内容"},
+                format="json",
+            )
+        self.assertEqual(NotificationStat.objects.get(status="success").count, 5)
+
+
+class GroupSendTestCase(TestCase):
+    """按分组广播测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.devices = [
+            NotificationTarget.objects.create(
+                alias=f"设备{i}", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value=f"token{i}"
+            )
+            for i in range(5)
+        ]
+        email = NotificationTarget.objects.create(
+            alias="邮箱", target_type=NotificationTarget.TargetType.EMAIL, target_value="a@example.com"
+        )
+        self.vip = NotificationTargetGroup.objects.create(name="vip")
+        self.beta = NotificationTargetGroup.objects.create(name="beta")
+        self.client.post(
+            reverse("group-members", args=[self.vip.id]),
+            {"target_ids": [t.id for t in self.devices[:3]] + [email.id]},
+            format="json",
+        )
+        self.client.post(
+            reverse("group-members", args=[self.beta.id]),
+            {"target_ids": [self.devices[2].id, self.devices[3].id]},
+            format="json",
+        )
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    @override_settings(CHEWY_NOTIFICATION={"TASK_BATCH_SIZE": 2, "DELIVERY_BACKEND": "thread"})
+    def test_send_to_groups_in_chunks(self):
+        """测试分组成员去重、按渠道类型过滤并分块入队"""
+        with mock.patch.object(send_notification_batch_task, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("notification-group-send"),
+                    {"channel_id": self.channel.id, "groups": ["vip", "beta"], "title": "标题", "content": "内容"},
+                    format="json",
+                )
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["total"], 4)
+        self.assertEqual(
+            set(NotificationRecord.objects.values_list("target_id", flat=True)),
+            {t.id for t in self.devices[:4]},
+        )
+        self.assertEqual([len(c.args[0]) for c in delay.call_args_list], [2, 2])
+    
+    def test_unknown_group(self):
+        """测试分组不存在时返回 404"""
+        response = self.client.post(
+            reverse("notification-group-send"),
+            {"channel_id": self.channel.id, "groups": ["vip", "missing"], "title": "标题", "content": "内容"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(NotificationRecord.objects.exists())
+
+
+class TargetImportTestCase(TestCase):
+    """通知目标批量导入测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        NotificationTarget.objects.create(
+            alias="已有", target_type=NotificationTarget.TargetType.EMAIL, target_value="old@example.com"
+        )
+    
+    @override_settings(CHEWY_NOTIFICATION={"DB_BATCH_SIZE": 2})
+    def test_import_csv_file(self):
+        """测试上传 CSV 分块导入并统计新增、重复和无效行"""
+        body = (
+            "alias,target_type,target_value\n"
+            "甲,email,a@example.com\n"
+            "乙,email,old@example.com\n"
+            "丙,email,not-an-email\n"
+            "丁,email,a@example.com\n"
+            ",bark_token,token1\n"
+        )
+        response = self.client.post(
+            reverse("target-bulk-import"),
+            {"file": SimpleUploadedFile("targets.csv", body.encode("utf-8"), content_type="text/csv")},
+            format="multipart",
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual(
+            {key: summary[key] for key in ("total", "inserted", "duplicates", "invalid")},
+            {"total": 5, "inserted": 2, "duplicates": 2, "invalid": 1},
+        )
+        self.assertEqual(summary["errors"], [{"line": 4, "error": "邮箱格式不正确"}])
+        self.assertEqual(NotificationTarget.objects.get(target_value="token1").alias, "token1")
+    
+    def test_import_ndjson_body(self):
+        """测试以 NDJSON 请求体导入并使用默认目标类型"""
+        body = '{"target_value": "token1"}\n\nnot json\n{"target_value": "token2", "alias": "设备"}\n'
+        response = self.client.post(
+            reverse("target-bulk-import") + "?target_type=bark_token",
+            data=body.encode("utf-8"),
+            content_type="application/x-ndjson",
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["inserted"], 2)
+        self.assertEqual(response.json()["invalid"], 1)
+        self.assertEqual(
+            NotificationTarget.objects.filter(target_type=NotificationTarget.TargetType.BARK_TOKEN).count(), 2
+        )
+
+
+class BatchSendTestCase(TestCase):
+    """批量模板发送测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.template = NotificationTemplate.objects.create(
+            name="欢迎模板", title="欢迎 {{name}}", content="你好 {{name}}", channel=channel
+        )
+        self.targets = [
+            NotificationTarget.objects.create(
+                alias=f"设备{i}", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value=f"token{i}"
+            )
+            for i in range(2)
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _results(self, response):
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+    
+    @override_settings(CHEWY_NOTIFICATION={"TASK_BATCH_SIZE": 2})
+    def test_sync_batch_streams_results(self):
+        """测试同步批量发送按条目顺序逐条返回结果，并用保存的上下文渲染"""
+        items = [
+            {"template_id": self.template.id, "target_id": self.targets[0].id, "context": {"name": "张三"}},
+            {"template_id": self.template.id, "target_id": 999},
+            {"template_id": self.template.id, "target_id": self.targets[1].id, "context": {"name": "李四"}},
+        ]
+        with mock.patch.object(BarkService, "_send_implementation", return_value={"success": True}) as send:
+            response = self.client.post(reverse("notification-batch-send"), {"items": items}, format="json")
+            results = self._results(response)
+        
+        self.assertEqual([r["index"] for r in results], [0, 1, 2])
+        self.assertEqual([r["status"] for r in results], ["success", "error", "success"])
+        self.assertEqual(results[1]["error"], "目标不存在")
+        self.assertEqual(sorted(c.args[0]["title"] for c in send.call_args_list), ["欢迎 张三", "欢迎 李四"])
+        self.assertEqual(NotificationRecord.objects.count(), 2)
+    
+    @override_settings(CHEWY_NOTIFICATION={"DELIVERY_BACKEND": "thread"})
+    def test_async_ndjson_batch(self):
+        """测试 NDJSON 请求体异步批量发送"""
+        body = "\n".join([
+            json.dumps({"template_id": self.template.id, "target_id": target.id}) for target in self.targets
+        ] + ["not json"])
+        with mock.patch.object(send_notification_batch_task, "delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("notification-batch-send") + "?async_send=true",
+                    data=body.encode("utf-8"),
+                    content_type="application/x-ndjson",
+                )
+                results = self._results(response)
+        
+        self.assertEqual([r["status"] for r in results], ["queued", "queued", "error"])
+        delay.assert_called_once_with([r["record_id"] for r in results[:2]])
+
+
+class ScheduledSendTestCase(TestCase):
+    """定时发送测试"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.targets = [
+            NotificationTarget.objects.create(
+                alias=f"设备{i}", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value=f"token{i}"
+            )
+            for i in range(4)
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _schedule(self, scheduled_at):
+        return self.client.post(
+            reverse("notification-quick-send"),
+            {
+                "channel_id": self.channel.id,
+                "title": "早报",
+                "content": "内容",
+                "scheduled_at": scheduled_at,
+            },
+            format="json",
+        )
+    
+    def test_quick_send_creates_scheduled_records(self):
+        """测试传入将来的时间只创建定时记录，不发送；时间格式错误返回 400"""
+        scheduled_at = timezone.now() + timedelta(hours=1)
+        with mock.patch.object(BarkService, "_send_implementation") as send:
+            response = self._schedule(scheduled_at.isoformat())
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual({r["status"] for r in response.json()["results"]}, {"scheduled"})
+        send.assert_not_called()
+        self.assertEqual(
+            NotificationRecord.objects.filter(status=NotificationRecord.Status.SCHEDULED).count(), 4
+        )
+        self.assertEqual(dispatch_scheduled(), 0)
+        self.assertEqual(self._schedule("明天早上").status_code, 400)
+    
+    @override_settings(CHEWY_NOTIFICATION={"SCHEDULE_BATCH_LIMIT": 3, "DELIVERY_BACKEND": "thread"})
+    def test_dispatch_due_records_spread(self):
+        """测试到期记录分批领取并在错开窗口内入队，且只领取一次"""
+        self._schedule((timezone.now() + timedelta(hours=1)).isoformat())
+        NotificationRecord.objects.update(scheduled_at=timezone.now() - timedelta(seconds=1))
+        
+        with mock.patch.object(send_notification_batch_task, "delay") as delay, \
+                mock.patch.object(send_notification_batch_task, "apply_async") as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(dispatch_scheduled(spread=60), 4)
+            self.assertEqual(dispatch_scheduled(spread=60), 0)
+        
+        self.assertEqual(len(delay.call_args_list), 1)
+        self.assertEqual(
+            sorted(c.kwargs["countdown"] for c in apply_async.call_args_list), [15, 30, 45]
+        )
+        self.assertEqual(
+            NotificationRecord.objects.filter(status=NotificationRecord.Status.PENDING).count(), 4
+        )
+
+
+class PriorityLaneTestCase(TestCase):
+    """优先级分道测试"""
+    
+    def setUp(self):
+        self.channel = NotificationChannel.objects.create(
+            name="Bark渠道",
+            type=NotificationChannel.ChannelType.BARK,
+            config={"server_url": "https://api.day.app", "batch_size": 1},
+        )
+        self.targets = [
+            NotificationTarget.objects.create(
+                alias=f"设备{i}", target_type=NotificationTarget.TargetType.BARK_TOKEN, target_value=f"token{i}"
+            )
+            for i in range(2)
+        ]
+    
+    def tearDown(self):
+        clear_service_cache()
+    
+    def _records(self, level=None):
+        params = {"level": level} if level else {}
+        message = NotificationMessage.objects.create(title="标题", content="内容", params=params)
+        return create_pending_records(self.channel, self.targets, message=message)
+    
+    @override_settings(CHEWY_NOTIFICATION={
+        "PRIORITY_QUEUES": {"critical": "notify-critical", "passive": "notify-bulk"},
+        "DELIVERY_BACKEND": "thread",
+    })
+    def test_enqueue_routes_lanes_to_queues(self):
+        """测试按 level 确定优先级，入队时按优先级分批投递到各自的队列，紧急的在前"""
+        bulk = self._records("passive")
+        normal = self._records()
+        critical = self._records("critical")
+        self.assertEqual({r.priority for r in critical}, {NotificationRecord.Priority.CRITICAL})
+        self.assertEqual({r.priority for r in normal}, {NotificationRecord.Priority.ACTIVE})
+        
+        record_ids = [r.id for r in bulk + normal + critical]
+        with mock.patch.object(send_notification_batch_task, "delay") as delay, \
+                mock.patch.object(send_notification_batch_task, "apply_async") as apply_async:
+            enqueue_records(record_ids)
+        
+        self.assertEqual(
+            [(c.kwargs["queue"], c.kwargs["args"][0]) for c in apply_async.call_args_list],
+            [("notify-critical", [r.id for r in critical]), ("notify-bulk", [r.id for r in bulk])],
+        )
+        delay.assert_called_once_with([r.id for r in normal])
+    
+    @override_settings(CHEWY_NOTIFICATION={"PRIORITY_AGING_SECONDS": 60})
+    def test_worker_claims_by_priority_with_aging(self):
+        """测试数据库发送进程按优先级领取，等待较久的记录逐级提升，预留线程只领取 critical"""
+        aged = self._records("passive")
+        bulk = self._records("passive")
+        normal = self._records()
+        critical = self._records("critical")
+        # 超过提升周期的 passive 记录每次提升一级，排在同优先级的较新记录之前
+        NotificationRecord.objects.filter(id__in=[r.id for r in aged]).update(
+            update_time=timezone.now() - timedelta(seconds=150)
+        )
+        self.assertEqual(promote_waiting_records(), 2)
+        self.assertEqual(promote_waiting_records(), 0)
+        
+        # 批次不混合优先级：critical 记录单独领取
+        self.assertEqual(
+            claim_records("worker-a", limit=3), [r.id for r in critical]
+        )
+        self.assertEqual(claim_records("worker-critical", priorities=[NotificationRecord.Priority.CRITICAL]), [])
+        self.assertEqual(claim_records("worker-a", limit=2), [r.id for r in aged])
+        self.assertEqual(claim_records("worker-b", limit=2), [r.id for r in normal])
+        self.assertEqual(claim_records("worker-c", limit=2), [r.id for r in bulk])
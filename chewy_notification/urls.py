@@ -7,6 +7,10 @@ from chewy_notification.views import (
     NotificationRecordViewSet,
     NotificationSendView,
     QuickSendView,
+    NotificationStatsView,
+    NotificationTargetGroupViewSet,
+    GroupSendView,
+    BatchSendView,
 )
 
 # 创建路由器
@@ -17,6 +21,7 @@ router.register(r"channels", NotificationChannelViewSet, basename="channel")
 router.register(r"templates", NotificationTemplateViewSet, basename="template")
 router.register(r"targets", NotificationTargetViewSet, basename="target")
 router.register(r"records", NotificationRecordViewSet, basename="record")
+router.register(r"groups", NotificationTargetGroupViewSet, basename="group")
 
 # URL 配置
 urlpatterns = [
@@ -26,6 +31,15 @@ urlpatterns = [
     # 手动发送接口（基于模板）
     path("api/notifications/send/", NotificationSendView.as_view(), name="notification-send"),
     
+    # 批量模板发送接口
+    path("api/notifications/batch-send/", BatchSendView.as_view(), name="notification-batch-send"),
+    
     # 快速发送接口（无需模板）
     path("api/notifications/quick-send/", QuickSendView.as_view(), name="notification-quick-send"),
+    
+    # 按分组广播接口
+    path("api/notifications/group-send/", GroupSendView.as_view(), name="notification-group-send"),
+    
+    # 发送统计接口
+    path("api/notifications/stats/", NotificationStatsView.as_view(), name="notification-stats"),
 ]
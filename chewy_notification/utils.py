@@ -1,6 +1,8 @@
 """工具函数模块"""
 from typing import Dict, Any
 
+from chewy_notification.rendering import compile_template
+
 
 def render_notification_content(template: str, context: Dict[str, Any]) -> str:
     """
@@ -17,10 +19,7 @@ def render_notification_content(template: str, context: Dict[str, Any]) -> str:
         >>> render_notification_content("Hello {{name}}!", {"name": "World"})
         'Hello World!'
     """
-    result = template
-    for key, value in context.items():
-        result = result.replace(f"{{{{{key}}}}}", str(value))
-    return result
+    return compile_template(template).render(context)
 
 
 def validate_channel_config(channel_type: str, config: Dict[str, Any]) -> tuple[bool, str]:
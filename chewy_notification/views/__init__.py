@@ -4,6 +4,10 @@ from .target import NotificationTargetViewSet
 from .record import NotificationRecordViewSet
 from .send import NotificationSendView
 from .quick_send import QuickSendView
+from .stats import NotificationStatsView
+from .group import NotificationTargetGroupViewSet
+from .group_send import GroupSendView
+from .batch_send import BatchSendView
 
 __all__ = [
     "NotificationChannelViewSet",
@@ -12,4 +16,8 @@ __all__ = [
     "NotificationRecordViewSet",
     "NotificationSendView",
     "QuickSendView",
+    "NotificationStatsView",
+    "NotificationTargetGroupViewSet",
+    "GroupSendView",
+    "BatchSendView",
 ]
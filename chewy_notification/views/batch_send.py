@@ -0,0 +1,53 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from chewy_notification.batch_send import iter_ndjson_items, send_items
+
+
+class BatchSendView(APIView):
+    """批量模板发送接口"""
+    
+    def post(self, request):
+        """
+        批量发送基于模板的个性化通知，结果以 NDJSON 逐条返回
+        
+        请求体为 JSON：
+        {
+            "items": [
+                {"template_id": 1, "target_id": 2, "context": {"username": "张三"}},
+                ...
+            ],
+            "async_send": false
+        }
+        
+        或 Content-Type 为 application/x-ndjson，每行一个条目，
+        此时通过查询参数 async_send=true 指定异步发送。
+        
+        每行结果包含条目序号 index，以及 record_id 和 status
+        （queued / success / retry / failed / deferred / error）。
+        """
+        if "ndjson" in (request.content_type or ""):
+            if request.stream is None:
+                return Response(
+                    {"error": "请求体为空"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            items = iter_ndjson_items(request.stream)
+            async_send = request.query_params.get("async_send") in ("1", "true")
+        else:
+            items = request.data.get("items") if hasattr(request.data, "get") else None
+            if not isinstance(items, list) or not items:
+                return Response(
+                    {"error": "items 必须是非空列表"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            async_send = bool(request.data.get("async_send", False))
+        
+        lines = (
+            json.dumps(result, ensure_ascii=False, cls=DjangoJSONEncoder) + "\n"
+            for result in send_items(items, async_send)
+        )
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson; charset=utf-8")
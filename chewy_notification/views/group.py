@@ -0,0 +1,60 @@
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from chewy_notification.models import NotificationTarget, NotificationTargetGroup, NotificationTargetGroupMember
+from chewy_notification.serializers import (
+    NotificationTargetGroupSerializer,
+    NotificationTargetSerializer,
+    GroupMembersSerializer,
+)
+
+
+class NotificationTargetGroupViewSet(viewsets.ModelViewSet):
+    """目标分组视图集"""
+    
+    queryset = NotificationTargetGroup.objects.all()
+    serializer_class = NotificationTargetGroupSerializer
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ["name", "description"]
+    ordering_fields = ["name", "create_time"]
+    ordering = ["name"]
+    
+    @action(detail=True, methods=["get", "post", "delete"])
+    def members(self, request, pk=None):
+        """
+        分组成员
+        
+        - GET: 分页列出成员
+        - POST: 添加成员 {"target_ids": [1, 2]}，已是成员的目标忽略
+        - DELETE: 移除成员 {"target_ids": [1, 2]}
+        """
+        group = self.get_object()
+        
+        if request.method == "GET":
+            targets = NotificationTarget.objects.filter(group_members__group=group).order_by("id")
+            page = self.paginate_queryset(targets)
+            if page is not None:
+                return self.get_paginated_response(NotificationTargetSerializer(page, many=True).data)
+            return Response(NotificationTargetSerializer(targets, many=True).data)
+        
+        serializer = GroupMembersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target_ids = set(serializer.validated_data["target_ids"])
+        
+        if request.method == "DELETE":
+            removed, _ = NotificationTargetGroupMember.objects.filter(group=group, target_id__in=target_ids).delete()
+            return Response({"removed": removed})
+        
+        existing = set(
+            NotificationTargetGroupMember.objects.filter(group=group, target_id__in=target_ids)
+            .values_list("target_id", flat=True)
+        )
+        valid = set(NotificationTarget.objects.filter(id__in=target_ids - existing).values_list("id", flat=True))
+        NotificationTargetGroupMember.objects.bulk_create(
+            [NotificationTargetGroupMember(group=group, target_id=target_id) for target_id in sorted(valid)],
+            ignore_conflicts=True,
+        )
+        return Response(
+            {"added": len(valid), "existing": len(existing), "not_found": sorted(target_ids - existing - valid)},
+            status=status.HTTP_200_OK
+        )
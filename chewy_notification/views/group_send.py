@@ -0,0 +1,139 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.db import transaction
+from chewy_notification.models import NotificationChannel, NotificationMessage, NotificationRecord
+from chewy_notification.coalescing import content_hash, plan_coalescing
+from chewy_notification.delivery import create_pending_records
+from chewy_notification.scheduling import parse_scheduled_at
+from chewy_notification.groups import group_targets, iter_target_chunks, missing_groups
+from chewy_notification.tasks import enqueue_records
+from chewy_notification.idempotency import idempotent
+from chewy_notification.views.quick_send import get_extra_params
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GroupSendView(APIView):
+    """按目标分组广播接口（异步发送）"""
+    
+    @idempotent("group_send")
+    def post(self, request):
+        """
+        发送通知到一个或多个分组的全部目标
+        
+        分组成员在服务端解析，按块创建记录并加入发送队列，接口只返回汇总数量。
+        
+        请求参数：
+        - channel_id: 渠道ID（必填）
+        - groups: 分组名称列表（必填）
+        - title: 通知标题（必填）
+        - content: 通知内容（必填）
+        - scheduled_at: 定时发送时间（可选，ISO 8601，不晚于当前时间时立即发送）
+        - idempotency_key: 幂等键（可选，也可通过 Idempotency-Key 请求头传入）
+        - 其它参数同快速发送的 Bark 扩展参数
+        
+        示例：
+        {
+            "channel_id": 1,
+            "groups": ["vip", "beta"],
+            "title": "新版本发布",
+            "content": "点击查看更新内容"
+        }
+        """
+        channel_id = request.data.get("channel_id")
+        groups = request.data.get("groups")
+        title = request.data.get("title")
+        content = request.data.get("content")
+        extra_params = get_extra_params(request.data)
+        
+        # 验证必填参数
+        if not channel_id or not title or not content:
+            return Response(
+                {"error": "channel_id、title 和 content 为必填项"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(groups, list) or not groups or not all(isinstance(name, str) for name in groups):
+            return Response(
+                {"error": "groups 必须是分组名称列表"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            scheduled_at = parse_scheduled_at(request.data.get("scheduled_at"))
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            channel = NotificationChannel.objects.get(id=channel_id)
+        except NotificationChannel.DoesNotExist:
+            return Response(
+                {"error": "渠道不存在"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not channel.enabled:
+            return Response(
+                {"error": "渠道未启用"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        missing = missing_groups(groups)
+        if missing:
+            return Response(
+                {"error": f"分组不存在: {', '.join(missing)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        message = NotificationMessage.objects.create(
+            title=title,
+            content=content,
+            params=extra_params
+        )
+        digest = content_hash(title, content, extra_params)
+        
+        # 按块创建记录，每块在事务提交后加入发送队列
+        counts = {"queued": 0, "scheduled": 0, "coalesced": 0}
+        for targets in iter_target_chunks(group_targets(groups, channel.target_type)):
+            if scheduled_at:
+                # 定时发送：到期后由定时任务加入发送队列
+                create_pending_records(
+                    channel,
+                    targets,
+                    message=message,
+                    content_hash=digest,
+                    status=NotificationRecord.Status.SCHEDULED,
+                    scheduled_at=scheduled_at,
+                )
+                counts["scheduled"] += len(targets)
+                continue
+            
+            plan = plan_coalescing(channel, targets, digest)
+            records = create_pending_records(channel, plan.new_targets, message=message, content_hash=digest)
+            for countdown, delayed_ids in plan.apply(records).items():
+                transaction.on_commit(
+                    lambda delayed_ids=delayed_ids, countdown=countdown: enqueue_records(delayed_ids, countdown=countdown)
+                )
+            
+            record_ids = [record.id for record in records[:len(plan.immediate)]]
+            if record_ids:
+                transaction.on_commit(lambda record_ids=record_ids: enqueue_records(record_ids))
+            
+            counts["queued"] += len(plan.immediate)
+            counts["scheduled"] += len(plan.delayed)
+            counts["coalesced"] += len(plan.merged)
+        
+        total = sum(counts.values())
+        logger.info(f"分组 {', '.join(groups)} 广播: {total} 个目标")
+        return Response(
+            {
+                "message": f"已将 {total} 个目标加入发送队列",
+                "message_id": message.id,
+                "scheduled_at": scheduled_at,
+                "total": total,
+                **counts
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
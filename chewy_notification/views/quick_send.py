@@ -1,22 +1,42 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
+from django.db import transaction
 from chewy_notification.models import (
     NotificationChannel,
     NotificationTarget,
+    NotificationMessage,
     NotificationRecord,
 )
-from chewy_notification.services import get_service_for_channel
-from chewy_notification.tasks import send_notification_task
+from chewy_notification.coalescing import content_hash, plan_coalescing
+from chewy_notification.conf import get_setting
+from chewy_notification.delivery import create_pending_records, deliver_records, release_sync_lease, sync_lease
+from chewy_notification.scheduling import parse_scheduled_at
+from chewy_notification.tasks import enqueue_records
+from chewy_notification.idempotency import idempotent
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 快速发送支持的 Bark 扩展参数
+BARK_PARAMS = [
+    "subtitle", "level", "badge", "sound", "icon", "group", "url",
+    "copy", "auto_copy", "call", "is_archive"
+]
+
+
+def get_extra_params(data):
+    """从请求数据中提取 Bark 扩展参数"""
+    return {param: data[param] for param in BARK_PARAMS if param in data}
+
 
 class QuickSendView(APIView):
     """快速发送通知接口（无需模板）"""
     
+    # 视为成功的目标状态（合并或延后的通知会在合并窗口结束时发送）
+    OK_STATUSES = ("success", "coalesced", "scheduled")
+    
+    @idempotent("quick_send")
     def post(self, request):
         """
         快速发送通知
@@ -27,6 +47,8 @@ class QuickSendView(APIView):
         - title: 通知标题（必填）
         - content: 通知内容（必填）
         - async_send: 是否异步发送（可选，默认False）
+        - scheduled_at: 定时发送时间（可选，ISO 8601，不晚于当前时间时立即发送）
+        - idempotency_key: 幂等键（可选，也可通过 Idempotency-Key 请求头传入）
         
         示例：
         {
@@ -44,14 +66,7 @@ class QuickSendView(APIView):
         async_send = request.data.get("async_send", False)
         
         # 提取 Bark 扩展参数
-        extra_params = {}
-        bark_params = [
-            "subtitle", "level", "badge", "sound", "icon", "group", "url",
-            "copy", "auto_copy", "call", "is_archive"
-        ]
-        for param in bark_params:
-            if param in request.data:
-                extra_params[param] = request.data[param]
+        extra_params = get_extra_params(request.data)
         
         # 验证必填参数
         if not channel_id or not title or not content:
@@ -59,6 +74,13 @@ class QuickSendView(APIView):
                 {"error": "channel_id、title 和 content 为必填项"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            scheduled_at = parse_scheduled_at(request.data.get("scheduled_at"))
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # 获取渠道
         try:
@@ -95,27 +117,65 @@ class QuickSendView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # 批量发送
-        results = []
-        for target in targets:
-            if async_send:
-                # 异步发送
-                record = NotificationRecord.objects.create(
-                    channel=channel,
-                    target=target,
-                    status=NotificationRecord.Status.PENDING
-                )
-                # 这里需要修改 task 以支持直接传入 title/content
-                results.append({
+        targets = list(targets)
+        if scheduled_at:
+            return self._schedule(channel, targets, title, content, extra_params, scheduled_at)
+        
+        # 合并窗口内的重复通知，保存消息内容，批量创建发送记录
+        plan = plan_coalescing(channel, targets, content_hash(title, content, extra_params))
+        message = NotificationMessage.objects.create(
+            title=title,
+            content=content,
+            params=extra_params
+        )
+        # 同步发送的记录带有租约，发送期间不会被发送进程领取
+        records = create_pending_records(
+            channel,
+            plan.new_targets,
+            message=message,
+            content_hash=plan.digest,
+            **({} if async_send else sync_lease())
+        )
+        for countdown, delayed_ids in plan.apply(records).items():
+            transaction.on_commit(
+                lambda delayed_ids=delayed_ids, countdown=countdown: enqueue_records(delayed_ids, countdown=countdown)
+            )
+        
+        immediate_targets = plan.immediate
+        immediate_records = records[:len(immediate_targets)]
+        coalesced = self._coalesced_results(plan, records[len(immediate_targets):])
+        
+        if async_send:
+            # 异步发送：事务提交后按批次加入队列，立即返回
+            record_ids = [record.id for record in immediate_records]
+            transaction.on_commit(lambda: enqueue_records(record_ids))
+            
+            queued = {
+                target.id: {
                     "target_id": target.id,
                     "target_alias": target.alias,
                     "record_id": record.id,
                     "status": "queued"
-                })
-            else:
-                # 同步发送
-                result = self._send_to_target(channel, target, title, content, extra_params)
-                results.append(result)
+                }
+                for target, record in zip(immediate_targets, immediate_records)
+            }
+            return Response(
+                {
+                    "message": f"已将 {len(targets)} 个目标加入发送队列",
+                    "total": len(targets),
+                    "message_id": message.id,
+                    "results": [{**queued, **coalesced}[target.id] for target in targets]
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        # 同步发送
+        try:
+            sent = self._send_to_targets(channel, immediate_targets, immediate_records, title, content, extra_params)
+        finally:
+            release_sync_lease([record.id for record in records])
+        sent = {result["target_id"]: result for result in sent}
+        results = [{**sent, **coalesced}[target.id] for target in targets]
         
         return Response(
             {
@@ -123,71 +183,119 @@ class QuickSendView(APIView):
                 "total": len(results),
                 "results": results
             },
-            status=status.HTTP_200_OK if all(r.get("status") == "success" for r in results) else status.HTTP_207_MULTI_STATUS
+            status=status.HTTP_200_OK if all(r.get("status") in self.OK_STATUSES for r in results) else status.HTTP_207_MULTI_STATUS
+        )
+    
+    def _schedule(self, channel, targets, title, content, extra_params, scheduled_at):
+        """创建定时发送记录，到期后由定时任务加入发送队列"""
+        message = NotificationMessage.objects.create(
+            title=title,
+            content=content,
+            params=extra_params
+        )
+        records = create_pending_records(
+            channel,
+            targets,
+            message=message,
+            content_hash=content_hash(title, content, extra_params),
+            status=NotificationRecord.Status.SCHEDULED,
+            scheduled_at=scheduled_at,
+        )
+        return Response(
+            {
+                "message": f"已为 {len(targets)} 个目标创建定时通知",
+                "total": len(targets),
+                "message_id": message.id,
+                "scheduled_at": scheduled_at,
+                "results": [
+                    {
+                        "target_id": target.id,
+                        "target_alias": target.alias,
+                        "record_id": record.id,
+                        "status": "scheduled",
+                        "send_at": scheduled_at,
+                    }
+                    for target, record in zip(targets, records)
+                ]
+            },
+            status=status.HTTP_202_ACCEPTED
         )
     
+    def _coalesced_results(self, plan, delayed_records):
+        """被合并或延后到合并窗口结束发送的目标的结果，按目标ID索引"""
+        results = {}
+        for (target, send_at), record in zip(plan.delayed, delayed_records):
+            results[target.id] = {
+                "target_id": target.id,
+                "target_alias": target.alias,
+                "record_id": record.id,
+                "status": "scheduled",
+                "send_at": send_at,
+            }
+        for target in plan.merged_targets:
+            results[target.id] = {
+                "target_id": target.id,
+                "target_alias": target.alias,
+                "record_id": plan.merged[target.id],
+                "status": "coalesced",
+            }
+        return results
+    
     def _get_targets_for_channel(self, channel):
         """根据渠道类型获取匹配的目标"""
-        # 渠道类型与目标类型的映射
-        channel_target_map = {
-            "bark": "bark_token",
-            "email": "email",
-            "ntfy": "ntfy_topic",
-            "feishu": "feishu_webhook",
-        }
-        
-        target_type = channel_target_map.get(channel.type)
-        if target_type:
-            return NotificationTarget.objects.filter(target_type=target_type)
+        if channel.target_type:
+            return NotificationTarget.objects.filter(target_type=channel.target_type)
         return NotificationTarget.objects.none()
     
-    def _send_to_target(self, channel, target, title, content, extra_params=None):
-        """发送到单个目标"""
-        if extra_params is None:
-            extra_params = {}
-        
-        # 创建发送记录
-        record = NotificationRecord.objects.create(
-            channel=channel,
-            target=target,
-            status=NotificationRecord.Status.PENDING
+    def _send_to_targets(self, channel, targets, records, title, content, extra_params=None):
+        """
+        批量发送到多个目标
+        
+        由渠道服务决定如何复用连接，按渠道配置的 max_concurrency 并发发送，
+        整批耗时不超过 QUICK_SEND_DEADLINE，发送结果批量回写。
+        渠道熔断或超出速率限制时，剩余目标转为异步延后发送。
+        """
+        outcomes = deliver_records(
+            channel,
+            records,
+            title,
+            content,
+            params=extra_params,  # 传递所有扩展参数
+            deadline=get_setting("QUICK_SEND_DEADLINE"),
         )
         
-        try:
-            # 获取服务并发送（使用统一接口）
-            service = get_service_for_channel(channel)
-            result = service.send(
-                target=target.target_value,
-                title=title,
-                content=content,
-                **extra_params  # 传递所有扩展参数
-            )
-            
-            # 更新记录
-            record.status = NotificationRecord.Status.SUCCESS
-            record.response = result
-            record.send_time = timezone.now()
-            record.save()
-            
-            return {
+        results = []
+        deferred_ids = []
+        retry_after = 0.0
+        for target, record, outcome in zip(targets, records, outcomes):
+            result = {
                 "target_id": target.id,
                 "target_alias": target.alias,
                 "record_id": record.id,
-                "status": "success",
-                "response": result
             }
+            if outcome["success"]:
+                result.update({"status": "success", "response": outcome["response"]})
+            elif outcome.get("deferred"):
+                # 渠道限流或熔断，记录保持待发送状态并延后入队
+                result.update({
+                    "status": "deferred",
+                    "error": outcome["error"],
+                    "retry_after": outcome["retry_after"],
+                })
+                deferred_ids.append(record.id)
+                retry_after = max(retry_after, outcome["retry_after"])
+            elif record.status == NotificationRecord.Status.RETRY:
+                # 暂时性失败，由重试任务稍后重新发送
+                result.update({
+                    "status": "retry",
+                    "error": outcome["error"],
+                    "next_attempt_at": record.next_attempt_at,
+                })
+            else:
+                result.update({"status": "failed", "error": outcome["error"]})
+            results.append(result)
         
-        except Exception as e:
-            logger.error(f"发送到 {target.alias} 失败: {str(e)}")
-            record.status = NotificationRecord.Status.FAILED
-            record.error_message = str(e)
-            record.send_time = timezone.now()
-            record.save()
-            
-            return {
-                "target_id": target.id,
-                "target_alias": target.alias,
-                "record_id": record.id,
-                "status": "failed",
-                "error": str(e)
-            }
+        if deferred_ids:
+            transaction.on_commit(lambda: enqueue_records(deferred_ids, countdown=retry_after))
+        
+        return results
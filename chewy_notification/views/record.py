@@ -1,6 +1,10 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from chewy_notification.export import FORMATS, export_records
 from chewy_notification.models import NotificationRecord
+from chewy_notification.pagination import KeysetPagination
 from chewy_notification.serializers import NotificationRecordSerializer
 
 
@@ -16,3 +20,30 @@ class NotificationRecordViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["error_message"]
     ordering_fields = ["create_time", "send_time"]
     ordering = ["-create_time"]
+    
+    @property
+    def paginator(self):
+        """传入 pagination=cursor 或 cursor 参数时使用游标分页，否则使用全局分页配置"""
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if params.get("pagination") == "cursor" or KeysetPagination.cursor_query_param in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+    
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        以流的形式导出记录，支持与列表相同的筛选、搜索和排序参数
+        
+        查询参数：
+        - output_format: csv（默认）或 ndjson
+        """
+        output_format = request.query_params.get("output_format", "csv")
+        if output_format not in FORMATS:
+            return Response(
+                {"error": "output_format 必须是 csv 或 ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_records(self.filter_queryset(self.get_queryset()), output_format)
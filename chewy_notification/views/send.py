@@ -1,14 +1,21 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
+from django.db import transaction
 from chewy_notification.models import (
     NotificationTemplate,
     NotificationTarget,
     NotificationRecord,
 )
-from chewy_notification.services import get_service_for_channel
-from chewy_notification.tasks import send_notification_task
+from chewy_notification.coalescing import content_hash, plan_coalescing
+from chewy_notification.delivery import apply_outcome, release_sync_lease, sync_lease
+from chewy_notification.rendering import render_template
+from chewy_notification.scheduling import parse_scheduled_at
+from chewy_notification.services import get_service_for_channel, NotificationDeferred
+from chewy_notification.stats import record_stats
+from chewy_notification.services.dispatch import error_outcomes
+from chewy_notification.tasks import enqueue_records
+from chewy_notification.idempotency import idempotent
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +24,7 @@ logger = logging.getLogger(__name__)
 class NotificationSendView(APIView):
     """手动发送通知接口"""
     
+    @idempotent("send")
     def post(self, request):
         """
         发送通知
@@ -26,6 +34,8 @@ class NotificationSendView(APIView):
         - target_id: 目标ID
         - context: 变量上下文（可选）
         - async_send: 是否异步发送（可选，默认False）
+        - scheduled_at: 定时发送时间（可选，ISO 8601，不晚于当前时间时立即发送）
+        - idempotency_key: 幂等键（可选，也可通过 Idempotency-Key 请求头传入）
         """
         template_id = request.data.get("template_id")
         target_id = request.data.get("target_id")
@@ -38,6 +48,13 @@ class NotificationSendView(APIView):
                 {"error": "template_id和target_id为必填项"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            scheduled_at = parse_scheduled_at(request.data.get("scheduled_at"))
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             template = NotificationTemplate.objects.select_related("channel").get(id=template_id)
@@ -60,18 +77,69 @@ class NotificationSendView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 创建发送记录
+        if scheduled_at:
+            # 定时发送：到期后由定时任务加入发送队列
+            record = NotificationRecord.objects.create(
+                template=template,
+                channel=template.channel,
+                target=target,
+                status=NotificationRecord.Status.SCHEDULED,
+                scheduled_at=scheduled_at,
+                context=context
+            )
+            return Response(
+                {
+                    "message": "通知将在指定时间发送",
+                    "record_id": record.id,
+                    "status": "scheduled",
+                    "scheduled_at": scheduled_at
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        # 合并窗口内相同模板和上下文的通知
+        plan = plan_coalescing(template.channel, [target], content_hash(f"template:{template.id}", "", context))
+        if plan.merged:
+            return Response(
+                {
+                    "message": "已合并到待发送的相同通知",
+                    "record_id": plan.merged[target.id],
+                    "status": "coalesced"
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        # 创建发送记录（同步发送的记录带有租约，发送期间不会被发送进程领取）
         record = NotificationRecord.objects.create(
             template=template,
             channel=template.channel,
             target=target,
-            status=NotificationRecord.Status.PENDING
+            status=NotificationRecord.Status.PENDING,
+            context=context,
+            content_hash=plan.digest,
+            **({} if async_send or plan.delayed else sync_lease())
         )
         
+        if plan.delayed:
+            # 合并窗口内已发送过相同通知，延后到窗口结束时发送
+            for countdown, record_ids in plan.apply([record]).items():
+                transaction.on_commit(
+                    lambda record_ids=record_ids, countdown=countdown: enqueue_records(record_ids, countdown=countdown)
+                )
+            return Response(
+                {
+                    "message": "合并窗口内已发送过相同通知，将在窗口结束时发送",
+                    "record_id": record.id,
+                    "status": "scheduled",
+                    "send_at": record.next_attempt_at
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
         # 异步或同步发送
         if async_send:
-            # 使用 Celery 异步任务
-            send_notification_task.delay(record.id, context)
+            # 事务提交后加入发送队列
+            transaction.on_commit(lambda: enqueue_records([record.id]))
             return Response(
                 {
                     "message": "通知已加入发送队列",
@@ -83,49 +151,62 @@ class NotificationSendView(APIView):
         else:
             # 同步发送
             try:
-                # 渲染模板
-                title = self._render_template(template.title, context)
-                content = self._render_template(template.content, context)
-                
-                # 获取服务并发送
-                service = get_service_for_channel(template.channel)
-                result = service.send(target.target_value, title, content)
-                
-                # 更新记录
-                record.status = NotificationRecord.Status.SUCCESS
-                record.response = result
-                record.send_time = timezone.now()
-                record.save()
-                
-                return Response(
-                    {
-                        "message": "发送成功",
-                        "record_id": record.id,
-                        "status": "success",
-                        "response": result
-                    },
-                    status=status.HTTP_200_OK
-                )
-            
-            except Exception as e:
-                logger.error(f"发送通知失败: {str(e)}")
-                record.status = NotificationRecord.Status.FAILED
-                record.error_message = str(e)
-                record.send_time = timezone.now()
-                record.save()
-                
-                return Response(
-                    {
-                        "message": "发送失败",
-                        "record_id": record.id,
-                        "status": "failed",
-                        "error": str(e)
-                    },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+                return self._send_now(template, target, record, context)
+            finally:
+                release_sync_lease([record.id])
     
-    def _render_template(self, template_str, context):
-        """简单的模板变量替换"""
-        for key, value in context.items():
-            template_str = template_str.replace(f"{{{{{key}}}}}", str(value))
-        return template_str
+    def _send_now(self, template, target, record, context):
+        """同步发送记录并返回响应"""
+        try:
+            # 渲染模板
+            title, content = render_template(template, context)
+            
+            # 获取服务并发送
+            service = get_service_for_channel(template.channel)
+            result = service.send(target.target_value, title, content)
+            
+            # 更新记录
+            apply_outcome(record, {"success": True, "response": result})
+            record.save()
+            record_stats([record])
+            
+            return Response(
+                {
+                    "message": "发送成功",
+                    "record_id": record.id,
+                    "status": "success",
+                    "response": result
+                },
+                status=status.HTTP_200_OK
+            )
+        
+        except NotificationDeferred as e:
+            # 渠道限流或熔断：记录保持待发送状态，等待后加入发送队列
+            retry_after = e.retry_after
+            transaction.on_commit(lambda: enqueue_records([record.id], countdown=retry_after))
+            return Response(
+                {
+                    "message": str(e),
+                    "record_id": record.id,
+                    "status": "deferred",
+                    "retry_after": retry_after
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        
+        except Exception as e:
+            logger.error(f"发送通知失败: {str(e)}")
+            # 暂时性失败进入重试状态，由重试任务稍后重新发送
+            apply_outcome(record, error_outcomes([target.target_value], e)[0])
+            record.save()
+            record_stats([record])
+            
+            data = {
+                "message": "发送失败",
+                "record_id": record.id,
+                "status": record.status,
+                "error": str(e)
+            }
+            if record.status == NotificationRecord.Status.RETRY:
+                data["next_attempt_at"] = record.next_attempt_at
+            return Response(data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,46 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from chewy_notification.stats import query_stats
+
+
+class NotificationStatsView(APIView):
+    """发送统计接口"""
+    
+    def get(self, request):
+        """
+        查询按渠道、状态和小时汇总的发送统计
+        
+        请求参数：
+        - since: 开始时间（ISO 8601，可选，默认 24 小时前）
+        - until: 结束时间（ISO 8601，可选，默认当前时间）
+        - channel: 渠道ID（可选）
+        - status: 发送状态（可选）
+        """
+        times = {}
+        for name in ("since", "until"):
+            value = request.query_params.get(name)
+            if value:
+                times[name] = parse_datetime(value)
+                if times[name] is None:
+                    return Response(
+                        {"error": f"{name} 不是有效的时间"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if timezone.is_naive(times[name]):
+                    times[name] = timezone.make_aware(times[name])
+        
+        channel_id = request.query_params.get("channel")
+        if channel_id is not None and not channel_id.isdigit():
+            return Response(
+                {"error": "channel 必须是渠道ID"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(query_stats(
+            channel_id=int(channel_id) if channel_id else None,
+            status=request.query_params.get("status"),
+            **times
+        ))
@@ -1,7 +1,10 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from chewy_notification.models import NotificationTarget
 from chewy_notification.serializers import NotificationTargetSerializer
+from chewy_notification.target_import import FORMATS, detect_format, import_targets, iter_rows
 
 
 class NotificationTargetViewSet(viewsets.ModelViewSet):
@@ -14,3 +17,51 @@ class NotificationTargetViewSet(viewsets.ModelViewSet):
     search_fields = ["alias", "target_value"]
     ordering_fields = ["create_time", "update_time"]
     ordering = ["-create_time"]
+    
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request):
+        """
+        批量导入目标
+        
+        上传 CSV / NDJSON 文件（multipart 的 file 字段），或直接以 text/csv、
+        application/x-ndjson 作为请求体。文件按流解析、分块写入。
+        
+        查询参数：
+        - input_format: csv 或 ndjson（可选，默认根据文件名或 Content-Type 判断）
+        - target_type: 行中没有 target_type 时使用的目标类型（可选）
+        """
+        content_type = request.content_type or ""
+        if content_type.startswith("multipart/form-data"):
+            upload = request.FILES.get("file")
+            if upload is None:
+                return Response(
+                    {"error": "缺少上传文件 file"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            stream, file_format = upload, detect_format(upload.name, upload.content_type)
+        else:
+            stream, file_format = request.stream, detect_format(content_type=content_type)
+        
+        file_format = request.query_params.get("input_format") or file_format
+        if file_format not in FORMATS:
+            return Response(
+                {"error": "无法判断文件格式，请通过 input_format 指定 csv 或 ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if stream is None:
+            return Response(
+                {"error": "请求体为空"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            summary = import_targets(
+                iter_rows(stream, file_format),
+                default_type=request.query_params.get("target_type"),
+            )
+        except (UnicodeDecodeError, ValueError) as e:
+            return Response(
+                {"error": f"文件解析失败: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(summary, status=status.HTTP_200_OK)
@@ -0,0 +1,257 @@
+"""
+数据库发送进程
+
+不依赖 Celery 的异步发送：run_notification_worker 命令循环从数据库领取
+待发送、到期重试和到期定时发送的记录并发送。领取通过租约（locked_by / locked_until）实现，
+PostgreSQL 等支持 SKIP LOCKED 的数据库上多个进程领取时互不阻塞，
+SQLite 上退化为按领取标识条件更新，同样不会重复领取。
+进程异常退出时，记录在租约过期后可以被其它进程重新领取。
+
+记录按优先级逐个队列领取（等待过久的记录定期提升优先级），另有 WORKER_CRITICAL_CONCURRENCY 个线程
+只领取 critical 记录，大批量广播积压时告警仍能立即发送。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import List, Optional
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from chewy_notification.conf import get_setting
+from chewy_notification.models import NotificationRecord
+from chewy_notification.priority import promote_waiting_records
+
+logger = logging.getLogger(__name__)
+
+
+def make_worker_id() -> str:
+    """生成发送进程（线程）标识：主机名-进程号-随机串"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"[-64:]
+
+
+def claimable_records(now=None):
+    """
+    可领取的记录：待发送或重试已到期，且未被其它进程持有（或租约已过期）
+    
+    Args:
+        now: 当前时间
+    
+    Returns:
+        QuerySet
+    """
+    now = now or timezone.now()
+    due = Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+    ready = (
+        Q(status=NotificationRecord.Status.PENDING) & due
+        | Q(status=NotificationRecord.Status.RETRY, next_attempt_at__lte=now)
+    )
+    unlocked = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    return NotificationRecord.objects.filter(ready & unlocked)
+
+
+def claim_records(
+    worker_id: str,
+    limit: Optional[int] = None,
+    lease: Optional[float] = None,
+    priorities: Optional[List[int]] = None
+) -> List[int]:
+    """
+    按优先级领取一批记录
+    
+    从最高优先级开始逐个查询，只领取第一个有可领取记录的优先级，
+    每个查询都按 (priority, id) 索引顺序读取，不需要对积压的记录排序；
+    同一批次中不会混入低优先级记录。
+    
+    Args:
+        worker_id: 发送进程标识
+        limit: 最多领取的记录数，默认使用 WORKER_BATCH_SIZE
+        lease: 租约时长（秒），默认使用 WORKER_LEASE_SECONDS
+        priorities: 只领取这些优先级的记录，默认不限
+    
+    Returns:
+        list: 领取到的记录ID（记录已恢复为待发送状态）
+    """
+    limit = limit or get_setting("WORKER_BATCH_SIZE")
+    lease = lease or get_setting("WORKER_LEASE_SECONDS")
+    now = timezone.now()
+    
+    lanes = sorted(priorities) if priorities is not None else NotificationRecord.Priority.values
+    
+    with transaction.atomic():
+        candidate_ids = []
+        for priority in lanes:
+            candidates = claimable_records(now).filter(priority=priority).order_by("id")
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            candidate_ids = list(candidates.values_list("id", flat=True)[:limit])
+            if candidate_ids:
+                break
+        if not candidate_ids:
+            return []
+        
+        # 条件更新：不支持行锁的数据库上，其它进程已领取的记录不会被再次领取
+        claimable_records(now).filter(id__in=candidate_ids).update(
+            status=NotificationRecord.Status.PENDING,
+            next_attempt_at=None,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease),
+            update_time=now,
+        )
+    
+    return list(
+        NotificationRecord.objects.filter(id__in=candidate_ids, locked_by=worker_id)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def release_records(worker_id: str, record_ids: List[int]):
+    """
+    释放领取的记录（发送后仍处于待发送状态的记录可以立即被重新领取）
+    
+    Args:
+        worker_id: 发送进程标识
+        record_ids: 记录ID列表
+    """
+    NotificationRecord.objects.filter(id__in=record_ids, locked_by=worker_id).update(
+        locked_by="", locked_until=None
+    )
+
+
+_promoted_at = 0.0
+_promotion_lock = threading.Lock()
+
+
+def promote_if_due():
+    """按间隔提升等待过久的记录的优先级（进程内各线程共享同一个间隔）"""
+    global _promoted_at
+    aging = get_setting("PRIORITY_AGING_SECONDS")
+    if not aging:
+        return
+    with _promotion_lock:
+        if time.monotonic() - _promoted_at < min(aging, 60):
+            return
+        _promoted_at = time.monotonic()
+    promote_waiting_records()
+
+
+def process_batch(worker_id: str, limit: Optional[int] = None, priorities: Optional[List[int]] = None) -> int:
+    """
+    领取并发送一批记录（先将到期的定时记录恢复为待发送）
+    
+    Args:
+        worker_id: 发送进程标识
+        limit: 最多领取的记录数
+        priorities: 只领取这些优先级的记录，默认不限
+    
+    Returns:
+        int: 处理的记录数
+    """
+    from chewy_notification.scheduling import dispatch_scheduled
+    from chewy_notification.tasks import send_notification_batch_task
+    
+    dispatch_scheduled()
+    promote_if_due()
+    record_ids = claim_records(worker_id, limit, priorities=priorities)
+    if not record_ids:
+        return 0
+    
+    try:
+        send_notification_batch_task(record_ids)
+    finally:
+        release_records(worker_id, record_ids)
+    return len(record_ids)
+
+
+class NotificationWorker:
+    """数据库发送进程，按 concurrency 启动多个领取-发送循环"""
+    
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        critical_concurrency: Optional[int] = None
+    ):
+        """
+        Args:
+            concurrency: 并发线程数，默认使用 WORKER_CONCURRENCY
+            batch_size: 每次领取的记录数，默认使用 WORKER_BATCH_SIZE
+            poll_interval: 没有记录时的轮询间隔（秒），默认使用 WORKER_POLL_INTERVAL
+            critical_concurrency: 只领取 critical 记录的线程数，默认使用 WORKER_CRITICAL_CONCURRENCY
+        """
+        self.concurrency = concurrency or get_setting("WORKER_CONCURRENCY")
+        self.critical_concurrency = (
+            critical_concurrency if critical_concurrency is not None
+            else get_setting("WORKER_CRITICAL_CONCURRENCY")
+        )
+        self.batch_size = batch_size or get_setting("WORKER_BATCH_SIZE")
+        self.poll_interval = poll_interval if poll_interval is not None else get_setting("WORKER_POLL_INTERVAL")
+        self.stop_event = threading.Event()
+    
+    def run_once(self) -> int:
+        """
+        在当前线程处理一批记录（用于定时任务或测试）
+        
+        Returns:
+            int: 处理的记录数
+        """
+        return process_batch(make_worker_id(), self.batch_size)
+    
+    def run(self):
+        """启动并阻塞，直到调用 stop()"""
+        threads = [
+            threading.Thread(target=self._loop, name=f"chewy-worker-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ] + [
+            # 预留给 critical 通知的线程
+            threading.Thread(
+                target=self._loop,
+                args=([NotificationRecord.Priority.CRITICAL],),
+                name=f"chewy-worker-critical-{index}",
+                daemon=True
+            )
+            for index in range(self.critical_concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(
+            f"通知发送进程已启动: {self.concurrency} 个线程，"
+            f"另有 {self.critical_concurrency} 个线程只发送 critical 通知"
+        )
+        
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        logger.info("通知发送进程已退出")
+    
+    def stop(self):
+        """通知所有线程在处理完当前批次后退出"""
+        self.stop_event.set()
+    
+    def _loop(self, priorities: Optional[List[int]] = None):
+        """单个线程的领取-发送循环，priorities 为只领取的优先级"""
+        worker_id = make_worker_id()
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    processed = process_batch(worker_id, self.batch_size, priorities)
+                except Exception as e:
+                    logger.error(f"通知发送进程 {worker_id} 处理失败: {str(e)}")
+                    processed = 0
+                if not processed:
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            connection.close()